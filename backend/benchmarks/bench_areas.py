@@ -0,0 +1,140 @@
+# Copyright © 2025 Aaro Koinsaari
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Time and peak memory of reading places mapped as ways and relations with each
+node location index, against the node-only read. Every measurement runs in a
+fresh process so peak RSS is not carried over from the one before.
+
+    python benchmarks/bench_areas.py --pbf data/finland-latest.osm.pbf
+    python benchmarks/bench_areas.py --nodes 5000000
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import subprocess
+import threading
+from typing import Dict, List
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, "src"))
+sys.path.insert(0, BENCH_DIR)
+
+from place import LOCATION_INDEXES, iter_place_batches, location_index  # noqa: E402
+from generate_pbf import generate_pbf  # noqa: E402
+
+# shares used for the generated file, roughly what Finland and Switzerland look like
+WAY_SHARE = 0.35
+RELATION_SHARE = 0.02
+BUILDING_SHARE = 0.15
+
+
+def area_pbf(nodes: int) -> str:
+    """Return a generated PBF with places mapped as ways and relations, cached in data/."""
+    pbf = os.path.join(BACKEND_DIR, "data", f"bench-areas-{nodes}.osm.pbf")
+    if not os.path.exists(pbf):
+        print(f"Generating {pbf}...")
+        generate_pbf(pbf, nodes, way_share=WAY_SHARE, relation_share=RELATION_SHARE, building_share=BUILDING_SHARE)
+    return pbf
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss survives exec on Linux and would report the parent's peak, VmHWM does not
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def read(pbf: str, index: str, batch_size: int) -> Dict:
+    """Read pbf once, index "nodes" meaning without areas. Runs in the child process."""
+    index_file = location_index(pbf, index).partition(",")[2]
+    index_size = 0
+
+    def watch_index_file():
+        # the index file is removed when reading ends, so sample its size while it exists
+        nonlocal index_size
+        while not done.is_set():
+            if index_file and os.path.exists(index_file):
+                index_size = max(index_size, os.path.getsize(index_file))
+            done.wait(0.05)
+
+    done = threading.Event()
+    watcher = threading.Thread(target=watch_index_file, daemon=True)
+    watcher.start()
+    start = time.perf_counter()
+    places = 0
+    areas = index != "nodes"
+    for batch in iter_place_batches(pbf, "bench", batch_size, areas=areas, location_index=index if areas else "auto"):
+        places += len(batch)
+    seconds = time.perf_counter() - start
+    done.set()
+    watcher.join()
+    return {
+        "index": index,
+        "places": places,
+        "seconds": seconds,
+        "max_rss_mb": peak_rss_mb(),
+        "index_file_mb": index_size / 1024 / 1024,
+    }
+
+
+def measure(pbf: str, index: str, batch_size: int) -> Dict:
+    """Run read() in a fresh interpreter and return its result."""
+    out = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", index, "--pbf", pbf,
+         "--batch-size", str(batch_size)],
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def run_all(pbf: str, indexes: List[str], batch_size: int) -> List[Dict]:
+    return [measure(pbf, index, batch_size) for index in ["nodes", *indexes]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark way and relation places per location index")
+    parser.add_argument("--pbf", help="Input PBF, generated when not given")
+    parser.add_argument("--nodes", type=int, default=2000000, help="Nodes in the generated PBF (default: 2000000)")
+    parser.add_argument("--index", nargs="+", choices=LOCATION_INDEXES[1:], default=list(LOCATION_INDEXES[1:]),
+                        help="Location indexes to compare (default: all)")
+    parser.add_argument("--batch-size", type=int, default=10000, help="Batch size (default: 10000)")
+    # internal: run one measurement with this index and print it as JSON
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(read(args.pbf, args.child, args.batch_size)))
+        return
+
+    pbf = args.pbf or area_pbf(args.nodes)
+    print(f"{pbf}: {os.path.getsize(pbf) / 1024 / 1024:.1f} MB")
+    print(f"{'index':20s} {'places':>9s} {'seconds':>9s} {'peak RSS MB':>12s} {'index file MB':>14s}")
+    for r in run_all(pbf, args.index, args.batch_size):
+        print(f"{r['index']:20s} {r['places']:9d} {r['seconds']:9.2f} {r['max_rss_mb']:12.1f} "
+              f"{r['index_file_mb']:14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+# Copyright © 2025 Aaro Koinsaari
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Micro-benchmark of parse_accessibility_info with and without the memoized
+value parsers, over a tag-value distribution resembling OSM data.
+
+    python benchmarks/bench_parsers.py --nodes 200000
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+import parsers  # noqa: E402
+
+# (value, weight) per tag. Most values are a handful of common strings, with a
+# long tail of free-form measurements generated in random_value()
+TAG_VALUES = {
+    "wheelchair": [("yes", 45), ("no", 25), ("limited", 25), ("designated", 2), ("Yes", 1), ("unknown", 2)],
+    "wheelchair:turning_circle": [("yes", 6), ("no", 3), ("limited", 1)],
+    "entrance:step_count": [("0", 40), ("1", 30), ("2", 15), ("3", 5), ("2 steps", 5), ("zwei", 1), ("one", 1)],
+    "entrance:kerb:height": [("0", 40), ("2 cm", 20), ("3cm", 10), ("0.05", 10), ("5 cm", 10)],
+    "entrance:ramp": [("yes", 60), ("no", 40)],
+    "door:width": [("80 cm", 25), ("90 cm", 25), ("0.9", 15), ("1", 10), ("100", 10), ("0.8 m", 10)],
+    "toilets:wheelchair:door_width": [("80 cm", 40), ("90 cm", 40), ("0.9", 20)],
+    "toilets:wheelchair:space_front": [("150 cm", 50), ("1.5", 30), ("120 cm", 20)],
+    "toilets:wheelchair:space_side": [("150 cm", 50), ("1.5", 30), ("90 cm", 20)],
+    "entrance:automatic_door": [("yes", 70), ("no", 30)],
+}
+
+# share of nodes that carry each tag at all
+TAG_SHARE = {
+    "wheelchair": 0.45,
+    "wheelchair:turning_circle": 0.02,
+    "entrance:step_count": 0.06,
+    "entrance:kerb:height": 0.03,
+    "entrance:ramp": 0.04,
+    "door:width": 0.05,
+    "toilets:wheelchair:door_width": 0.01,
+    "toilets:wheelchair:space_front": 0.01,
+    "toilets:wheelchair:space_side": 0.01,
+    "entrance:automatic_door": 0.03,
+}
+
+# share of values that are free-form measurements instead of a common value
+LONG_TAIL_SHARE = 0.05
+
+
+def random_value(rng: random.Random, key: str) -> str:
+    if key in ("wheelchair", "wheelchair:turning_circle", "entrance:ramp", "entrance:automatic_door"):
+        values, weights = zip(*TAG_VALUES[key])
+        return rng.choices(values, weights)[0]
+    if rng.random() < LONG_TAIL_SHARE:
+        return rng.choice(["{} cm", "{}cm", "0.{}", "{} mm", "ca. {} cm"]).format(rng.randrange(1, 200))
+    values, weights = zip(*TAG_VALUES[key])
+    return rng.choices(values, weights)[0]
+
+
+def make_tags(count: int, seed: int = 1) -> list:
+    rng = random.Random(seed)
+    nodes = []
+    for _ in range(count):
+        tags = {"amenity": "cafe"}
+        for key, share in TAG_SHARE.items():
+            if rng.random() < share:
+                tags[key] = random_value(rng, key)
+        nodes.append(tags)
+    return nodes
+
+
+@contextmanager
+def uncached():
+    """Temporarily swap the memoized parsers for the plain functions they wrap."""
+    originals = {fn.__name__: fn for fn in parsers.CACHED_PARSERS}
+    for name, fn in originals.items():
+        setattr(parsers, name, fn.__wrapped__)
+    try:
+        yield
+    finally:
+        for name, fn in originals.items():
+            setattr(parsers, name, fn)
+
+
+# parser -> tag whose present values it is timed on
+FUNCTION_TAGS = {
+    "parse_yes_no": "wheelchair",
+    "parse_count": "entrance:step_count",
+    "parse_step_height": "entrance:kerb:height",
+    "parse_width": "door:width",
+    "parse_meters": "door:width",
+    "normalize": "wheelchair",
+}
+
+
+def run_function(name: str, values: list) -> float:
+    fn = getattr(parsers, name)
+    start = time.perf_counter()
+    for value in values:
+        fn(value)
+    return time.perf_counter() - start
+
+
+def to_columns(nodes: list) -> dict:
+    return {key: [tags.get(key) for tags in nodes] for key in parsers.ACCESSIBILITY_TAGS}
+
+
+def run_columns(nodes: list, batch_size: int) -> float:
+    """Time parse_accessibility_columns over nodes in batches; building the columns is not timed."""
+    batches = [(to_columns(nodes[i:i + batch_size]), len(nodes[i:i + batch_size]))
+               for i in range(0, len(nodes), batch_size)]
+    start = time.perf_counter()
+    for columns, count in batches:
+        parsers.parse_accessibility_columns(columns, count)
+    return time.perf_counter() - start
+
+
+def check_columns(nodes: list):
+    """Fail loudly if the batch parser differs from the per-node parser anywhere."""
+    general, entrance, restroom = parsers.parse_accessibility_columns(to_columns(nodes), len(nodes))
+    for i, tags in enumerate(nodes):
+        expected = parsers.parse_accessibility_info(tags)
+        got = tuple({field: values[i] for field, values in part.items()} for part in (general, entrance, restroom))
+        assert got == expected, f"mismatch for {tags}: {got} != {expected}"
+
+
+def run(nodes: list) -> float:
+    start = time.perf_counter()
+    for tags in nodes:
+        parsers.parse_accessibility_info(tags)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark memoized tag-value parsers")
+    parser.add_argument("--nodes", type=int, default=200000, help="Number of tag dicts (default: 200000)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing repetitions, best is reported (default: 3)")
+    parser.add_argument("--batch-size", type=int, default=10000,
+                        help="Nodes per parse_accessibility_columns call (default: 10000)")
+    args = parser.parse_args()
+
+    nodes = make_tags(args.nodes)
+
+    with uncached():
+        plain = min(run(nodes) for _ in range(args.repeat))
+
+    parsers.clear_parse_cache()
+    cold = run(nodes)
+    info = parsers.parse_cache_info()
+    warm = min(run(nodes) for _ in range(args.repeat))
+
+    print("per function, over the values present in the tags:")
+    for name, key in FUNCTION_TAGS.items():
+        values = [tags[key] for tags in nodes if key in tags]
+        with uncached():
+            plain_fn = min(run_function(name, values) for _ in range(args.repeat))
+        warm_fn = min(run_function(name, values) for _ in range(args.repeat))
+        print(f"  {name:18s} {len(values):7d} values  uncached {plain_fn * 1e9 / len(values):6.0f} ns/value"
+              f"  cached {warm_fn * 1e9 / len(values):6.0f} ns/value  ({plain_fn / warm_fn:.1f}x)")
+
+    n = args.nodes
+    print(f"parse_accessibility_info over {n} nodes:")
+    print(f"  uncached      {plain:7.3f} s  {n / plain:10.0f} nodes/s")
+    print(f"  cached, cold  {cold:7.3f} s  {n / cold:10.0f} nodes/s  ({plain / cold:.1f}x)")
+    print(f"  cached, warm  {warm:7.3f} s  {n / warm:10.0f} nodes/s  ({plain / warm:.1f}x)")
+    check_columns(nodes)
+    batch = min(run_columns(nodes, args.batch_size) for _ in range(args.repeat))
+    print(f"  columns       {batch:7.3f} s  {n / batch:10.0f} nodes/s  ({plain / batch:.1f}x, "
+          f"batches of {args.batch_size}, same results as per node)")
+    print("cache after the cold pass:")
+    for name, stats in info.items():
+        print(f"  {name:24s} {stats['hits']:8d} hits {stats['misses']:6d} misses "
+              f"{stats['size']:5d} entries  {stats['hit_rate']:6.1%} hit rate")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+# Copyright © 2025 Aaro Koinsaari
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Compare per-place memory and staging tuple-building time of dict-based
+Place objects against the columnar PlaceBatch.
+
+    python benchmarks/bench_place_batch.py --places 200000
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from parsers import parse_accessibility_info, format_address  # noqa: E402
+from place import Place, PlaceBatch, TAGS  # noqa: E402
+
+
+def random_tags(rng: random.Random) -> dict:
+    key = rng.choice(list(TAGS))
+    tags = {key: rng.choice(TAGS[key]), "name": f"Place {rng.randrange(100000)}"}
+    if rng.random() < 0.4:
+        tags["wheelchair"] = rng.choice(["yes", "no", "limited"])
+    if rng.random() < 0.1:
+        tags["entrance:step_count"] = rng.choice(["0", "1", "2"])
+    if rng.random() < 0.1:
+        tags["door:width"] = rng.choice(["80 cm", "0.9", "70"])
+    if rng.random() < 0.3:
+        tags["addr:street"] = "Main street"
+        tags["addr:housenumber"] = str(rng.randrange(1, 200))
+    if rng.random() < 0.2:
+        tags["phone"] = "+358 40 123 4567"
+    return tags
+
+
+def make_inputs(count: int, seed: int = 1) -> list:
+    """Parsed place fields, produced once so both representations get the same data."""
+    rng = random.Random(seed)
+    inputs = []
+    for osm_id in range(1, count + 1):
+        tags = random_tags(rng)
+        ga, ea, ra = parse_accessibility_info(tags)
+        contact = {"address": format_address(tags), "phone": tags.get("phone"), "email": None, "website": None}
+        cat = tags.get("amenity") or tags.get("shop") or tags.get("tourism")
+        inputs.append((osm_id, tags["name"], cat, 60 + rng.random(), 24 + rng.random(), contact, ga, ea, ra))
+    return inputs
+
+
+def build_places(inputs: list, region: str) -> list:
+    # copy the dicts so each place owns its nested dicts, like the handler does
+    return [
+        Place(osm_id, name, cat, lat, lon, dict(c), dict(ga), dict(ea), dict(ra), region)
+        for osm_id, name, cat, lat, lon, c, ga, ea, ra in inputs
+    ]
+
+
+def build_batch(inputs: list, region: str) -> PlaceBatch:
+    batch = PlaceBatch(region)
+    for args in inputs:
+        batch.append(*args)
+    return batch
+
+
+def place_rows(places: list) -> int:
+    """Row building as seed_places did it before PlaceBatch: walk every dict per table."""
+    valid = {"FULLY_ACCESSIBLE", "PARTIALLY_ACCESSIBLE", "NOT_ACCESSIBLE", None}
+
+    def status(value):
+        return value if value in valid else None
+
+    count = 0
+    for p in places:
+        ga, ea, ra, c = p.general_accessibility, p.entrance_accessibility, p.restroom_accessibility, p.contact
+        rows = (
+            (p.osm_id, p.name, p.category, p.lat, p.lon, p.region),
+            (p.osm_id, status(ga.get("accessibility")), status(ga.get("indoor_accessibility")),
+             ga.get("additional_info")[:1000] if ga.get("additional_info") else None),
+            (p.osm_id, *(status(ea.get(f)) for f in
+                         ("accessibility", "step_count", "step_height", "ramp", "lift", "entrance_width")),
+             ea.get("door_type")),
+            (p.osm_id, *(status(ra.get(f)) for f in
+                         ("accessibility", "door_width", "room_maneuver", "grab_rails", "sink",
+                          "toilet_seat", "emergency_alarm")),
+             ra.get("euro_key")),
+            (p.osm_id, c.get("phone"), c.get("website"), c.get("email"), c.get("address")),
+        )
+        count += len(rows)
+    return count
+
+
+def batch_rows(batch: PlaceBatch) -> int:
+    count = 0
+    for rows in (batch.places_rows, batch.ga_rows, batch.ea_rows, batch.ra_rows, batch.contact_rows):
+        for _ in rows():
+            count += 1
+    return count
+
+
+def measure_memory(build, inputs: list, region: str) -> int:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    obj = build(inputs, region)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del obj
+    return after - before
+
+
+def measure_time(fn, obj, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(obj)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Place objects against PlaceBatch")
+    parser.add_argument("--places", type=int, default=100000, help="Number of places (default: 100000)")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing repetitions, best is reported (default: 5)")
+    args = parser.parse_args()
+
+    inputs = make_inputs(args.places)
+    region = "finland"
+
+    place_mem = measure_memory(build_places, inputs, region)
+    batch_mem = measure_memory(build_batch, inputs, region)
+
+    places = build_places(inputs, region)
+    batch = build_batch(inputs, region)
+    place_time = measure_time(place_rows, places, args.repeat)
+    batch_time = measure_time(batch_rows, batch, args.repeat)
+
+    n = args.places
+    print(f"{n} places")
+    print(f"memory      Place: {place_mem / n:8.1f} B/place   PlaceBatch: {batch_mem / n:8.1f} B/place"
+          f"   ({place_mem / batch_mem:.1f}x)")
+    print(f"rows        Place: {place_time:8.3f} s         PlaceBatch: {batch_time:8.3f} s"
+          f"         ({place_time / batch_time:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
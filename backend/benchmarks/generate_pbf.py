@@ -0,0 +1,186 @@
+# Copyright © 2025 Aaro Koinsaari
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Write a synthetic .osm.pbf with a realistic mix of TAGS categories and
+accessibility tags. The output only depends on the arguments and the seed.
+
+    python benchmarks/generate_pbf.py data/bench.osm.pbf --nodes 1000000 --poi-share 0.05
+"""
+
+import os
+import sys
+import random
+import argparse
+
+import osmium
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from place import TAGS  # noqa: E402
+from bench_parsers import TAG_SHARE, random_value  # noqa: E402
+
+# rough share of each TAGS key among matching places in Finland and Switzerland
+KEY_WEIGHTS = {"amenity": 60, "shop": 35, "tourism": 5}
+
+# tagged nodes that do not match TAGS, so the filter has something to reject
+NEAR_MISSES = [
+    {"amenity": "bench"}, {"amenity": "parking"}, {"amenity": "waste_basket"},
+    {"highway": "bus_stop", "name": "Stop"}, {"shop": "vacant"}, {"tourism": "viewpoint"},
+    {"natural": "tree"}, {"barrier": "gate"},
+]
+
+# share of plain nodes (way vertices) that carry any tags at all
+TAGGED_FILLER_SHARE = 0.05
+
+# default bounding box, roughly southern Finland
+DEFAULT_BBOX = (21.0, 60.0, 30.0, 64.0)
+
+
+def poi_tags(rng: random.Random) -> dict:
+    key = rng.choices(list(KEY_WEIGHTS), list(KEY_WEIGHTS.values()))[0]
+    tags = {key: rng.choice(TAGS[key])}
+    if rng.random() < 0.9:
+        tags["name"] = f"{tags[key].title()} {rng.randrange(10000)}"
+    for acc_key, share in TAG_SHARE.items():
+        if rng.random() < share:
+            tags[acc_key] = random_value(rng, acc_key)
+    if rng.random() < 0.02:
+        tags["centralkey"] = rng.choice(["eurokey", "none"])
+    if rng.random() < 0.02:
+        tags["wheelchair:description"] = "Entrance via the ramp at the back of the building"
+    if rng.random() < 0.4:
+        tags["addr:street"] = rng.choice(["Mannerheimintie", "Bahnhofstrasse", "Hämeenkatu", "Rue du Rhône"])
+        tags["addr:housenumber"] = str(rng.randrange(1, 200))
+        if rng.random() < 0.7:
+            tags["addr:city"] = rng.choice(["Helsinki", "Zürich", "Tampere", "Genève"])
+            tags["addr:postcode"] = str(rng.randrange(1000, 99999))
+    if rng.random() < 0.2:
+        tags["phone"] = f"+358 {rng.randrange(10, 99)} {rng.randrange(1000000, 9999999)}"
+    if rng.random() < 0.2:
+        tags["website"] = f"https://example.com/{rng.randrange(100000)}"
+    if rng.random() < 0.05:
+        tags["email"] = f"info{rng.randrange(10000)}@example.com"
+    return tags
+
+
+def filler_tags(rng: random.Random) -> dict:
+    if rng.random() < TAGGED_FILLER_SHARE:
+        return dict(rng.choice(NEAR_MISSES))
+    return {}
+
+
+# half the side of generated building squares in degrees, roughly 10 m
+BUILDING_SIZE = 0.0001
+
+
+def square(lon: float, lat: float, size: float) -> list:
+    return [(lon - size, lat - size), (lon + size, lat - size), (lon + size, lat + size), (lon - size, lat + size)]
+
+
+def generate_pbf(
+    filename: str,
+    nodes: int,
+    poi_share: float = 0.05,
+    seed: int = 1,
+    bbox: tuple = DEFAULT_BBOX,
+    way_share: float = 0.0,
+    relation_share: float = 0.0,
+    building_share: float = 0.0
+) -> int:
+    """
+    Write nodes nodes to filename, poi_share of them matching TAGS. Returns the POI count.
+    way_share and relation_share of the POIs are drawn as building ways and multipolygon
+    relations instead, and building_share of the untagged filler nodes become plain
+    buildings, so the location index has a realistic amount of way nodes to store.
+    """
+    if os.path.exists(filename):
+        os.remove(filename)
+    rng = random.Random(seed)
+    min_lon, min_lat, max_lon, max_lat = bbox
+    pois = 0
+    node_id = 0
+    ways = []
+    relations = []
+    writer = osmium.SimpleWriter(filename)
+
+    def add_node(location, tags=None) -> int:
+        nonlocal node_id
+        node_id += 1
+        writer.add_node(osmium.osm.mutable.Node(id=node_id, version=1, location=location, tags=tags or {}))
+        return node_id
+
+    def add_way(location, tags, size=BUILDING_SIZE) -> int:
+        refs = [add_node(corner) for corner in square(*location, size)]
+        ways.append((tags, refs + refs[:1]))
+        return len(ways)
+
+    try:
+        for _ in range(nodes):
+            is_poi = rng.random() < poi_share
+            if is_poi:
+                tags = poi_tags(rng)
+                pois += 1
+            else:
+                tags = filler_tags(rng)
+            location = (rng.uniform(min_lon, max_lon), rng.uniform(min_lat, max_lat))
+            # only draw again when areas are asked for, so node-only files stay unchanged
+            kind = rng.random() if way_share or relation_share or building_share else 1.0
+            if is_poi and kind < way_share:
+                add_way(location, dict(tags, building="yes"))
+            elif is_poi and kind < way_share + relation_share:
+                outer = add_way(location, {}, 3 * BUILDING_SIZE)
+                inner = add_way(location, {}, BUILDING_SIZE)
+                relations.append((dict(tags, type="multipolygon"), [("w", outer, "outer"), ("w", inner, "inner")]))
+            elif not is_poi and not tags and kind < building_share:
+                add_way(location, {"building": "yes"})
+            else:
+                add_node(location, tags)
+        for way_id, (tags, refs) in enumerate(ways, start=1):
+            writer.add_way(osmium.osm.mutable.Way(id=way_id, version=1, nodes=refs, tags=tags))
+        for relation_id, (tags, members) in enumerate(relations, start=1):
+            writer.add_relation(osmium.osm.mutable.Relation(id=relation_id, version=1, members=members, tags=tags))
+    finally:
+        writer.close()
+    return pois
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic OSM PBF file for benchmarks")
+    parser.add_argument("output", help="Output .osm.pbf file")
+    parser.add_argument("--nodes", type=int, default=1000000, help="Number of nodes (default: 1000000)")
+    parser.add_argument("--poi-share", type=float, default=0.05,
+                        help="Share of nodes matching TAGS, 1.0 mimics a filtered file (default: 0.05)")
+    parser.add_argument("--way-share", type=float, default=0.0,
+                        help="Share of places drawn as building ways (default: 0.0)")
+    parser.add_argument("--relation-share", type=float, default=0.0,
+                        help="Share of places drawn as multipolygon relations (default: 0.0)")
+    parser.add_argument("--building-share", type=float, default=0.0,
+                        help="Share of other nodes drawn as plain buildings (default: 0.0)")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed (default: 1)")
+    parser.add_argument("--bbox", type=float, nargs=4, default=DEFAULT_BBOX,
+                        metavar=("MIN_LON", "MIN_LAT", "MAX_LON", "MAX_LAT"), help="Bounding box of the nodes")
+    args = parser.parse_args()
+
+    pois = generate_pbf(
+        args.output, args.nodes, args.poi_share, args.seed, tuple(args.bbox),
+        args.way_share, args.relation_share, args.building_share
+    )
+    size = os.path.getsize(args.output)
+    print(f"Wrote {args.nodes} nodes ({pois} places) to {args.output}, {size / 1024 / 1024:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+# Copyright © 2025 Aaro Koinsaari
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Serve a directory like download.geofabrik.de: range requests, ETag and
+Last-Modified with conditional requests, and a generated .md5 file next to
+every file. --drop-after cuts every response after that many bytes, to
+exercise resuming.
+
+    python benchmarks/serve_pbf.py data/mirror --port 8000
+    GEOFABRIK_URL=http://localhost:8000 python src/update_data.py --region finland
+
+The directory is served as-is, so regions are expected under their Geofabrik
+paths, e.g. data/mirror/europe/finland-latest.osm.pbf.
+"""
+
+import os
+import re
+import argparse
+import hashlib
+import functools
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+RANGE = re.compile(r"bytes=(\d*)-(\d*)$")
+
+
+@functools.lru_cache(maxsize=None)
+def file_md5(path: str, mtime: float) -> str:
+    md5 = hashlib.md5()
+    with open(path, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            md5.update(chunk)
+    return md5.hexdigest()
+
+
+class MirrorHandler(SimpleHTTPRequestHandler):
+    drop_after = None
+
+    def do_GET(self):
+        self.respond(send_body=True)
+
+    def do_HEAD(self):
+        self.respond(send_body=False)
+
+    def respond(self, send_body: bool):
+        path = self.translate_path(self.path)
+        if path.endswith(".md5") and os.path.isfile(path[:-4]):
+            source = path[:-4]
+            body = f"{file_md5(source, os.path.getmtime(source))}  {os.path.basename(source)}\n".encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if send_body:
+                self.wfile.write(body)
+            return
+        if not os.path.isfile(path):
+            self.send_error(404)
+            return
+
+        stat = os.stat(path)
+        etag = f'"{stat.st_size:x}-{int(stat.st_mtime):x}"'
+        last_modified = formatdate(stat.st_mtime, usegmt=True)
+
+        if self.not_modified(etag, stat.st_mtime):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        start, end = 0, stat.st_size - 1
+        status = 200
+        match = RANGE.match(self.headers.get("Range", ""))
+        if_range = self.headers.get("If-Range")
+        if match and (if_range is None or if_range in (etag, last_modified)):
+            first, last = match.groups()
+            if first:
+                start, end = int(first), min(int(last), end) if last else end
+            else:
+                start = max(stat.st_size - int(last), 0)
+            if start > end:
+                self.send_error(416)
+                return
+            status = 206
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", last_modified)
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{stat.st_size}")
+        self.end_headers()
+        if not send_body:
+            return
+
+        remaining = end - start + 1
+        if self.drop_after is not None:
+            remaining = min(remaining, self.drop_after)
+        with open(path, "rb") as f:
+            f.seek(start)
+            while remaining > 0:
+                chunk = f.read(min(remaining, 64 * 1024))
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+                remaining -= len(chunk)
+        # a short body makes the client see a dropped connection
+        self.close_connection = True
+
+    def not_modified(self, etag: str, mtime: float) -> bool:
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None:
+            return etag in [tag.strip() for tag in if_none_match.split(",")]
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since:
+            try:
+                return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a directory as a local Geofabrik stand-in")
+    parser.add_argument("directory", help="Directory to serve")
+    parser.add_argument("--port", type=int, default=8000, help="Port (default: 8000)")
+    parser.add_argument("--drop-after", type=int, help="Cut every response after this many bytes")
+    args = parser.parse_args()
+
+    MirrorHandler.drop_after = args.drop_after
+    handler = functools.partial(MirrorHandler, directory=args.directory)
+    with ThreadingHTTPServer(("", args.port), handler) as server:
+        print(f"Serving {os.path.abspath(args.directory)} on http://localhost:{args.port}")
+        server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
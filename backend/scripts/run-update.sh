@@ -8,6 +8,8 @@ mkdir -p ./backend/data
 
 TIMESTAMP=$(date +"%Y-%m-%d_%H-%M-%S")
 LOG_FILE="./backend/data/update_${TIMESTAMP}.log"
+# JSON run reports are written next to the log, from inside the container
+REPORT_PREFIX="data/update_${TIMESTAMP}"
 
 echo "===== Starting Map Data Update: $(date) =====" > "$LOG_FILE"
 echo "Running update with:" >> "$LOG_FILE"
@@ -15,24 +17,49 @@ echo "Running update with:" >> "$LOG_FILE"
 REGIONS=${REGIONS:-""}  # which regions to update
 OVERWRITE=${OVERWRITE:-"false"}  # overwrite user-modified entries
 TEST_MODE=${TEST_MODE:-"false"}  # test mode, only insert 100 places
+WORKERS=${WORKERS:-"1"}  # worker processes for the multi-region pipeline
+PIPELINE=${PIPELINE:-"off"}  # parse in a process or thread while earlier batches are seeded, or off
+INCREMENTAL=${INCREMENTAL:-"false"}  # apply OSM change files instead of a full import
+CHUNK_SIZE=${CHUNK_SIZE:-"0"}  # places merged and committed per transaction, 0 for one per region
+FROM_CACHE=${FROM_CACHE:-"false"}  # re-seed from places parsed by an earlier run, without downloading
+CLUSTER=${CLUSTER:-"off"}  # rewrite places in Hilbert key order after seeding: off, auto (after large loads) or always
+DUMP=${DUMP:-"full"}  # dump all rows, only rows changed since the last dump, or nothing
+PROFILE=${PROFILE:-"false"}  # profile the run with cProfile
+TRACE_MEMORY=${TRACE_MEMORY:-"false"}  # trace Python allocations with tracemalloc
 
 echo "- Selected regions: ${REGIONS:-all regions}" >> "$LOG_FILE"
 echo "- Overwrite user-modified: ${OVERWRITE}" >> "$LOG_FILE"
 echo "- Test mode: ${TEST_MODE}" >> "$LOG_FILE"
+echo "- Workers: ${WORKERS}" >> "$LOG_FILE"
+echo "- Pipeline: ${PIPELINE}" >> "$LOG_FILE"
+echo "- Incremental: ${INCREMENTAL}" >> "$LOG_FILE"
+echo "- Chunk size: ${CHUNK_SIZE}" >> "$LOG_FILE"
+echo "- From cache: ${FROM_CACHE}" >> "$LOG_FILE"
+echo "- Cluster: ${CLUSTER}" >> "$LOG_FILE"
+echo "- Dump: ${DUMP}" >> "$LOG_FILE"
+echo "- Profile: ${PROFILE}" >> "$LOG_FILE"
+echo "- Trace memory: ${TRACE_MEMORY}" >> "$LOG_FILE"
 
 # Build docker arguments explicitly based on flags
 docker_args=""
 [ "$OVERWRITE" == "true" ] && docker_args="$docker_args --overwrite"
 [ "$TEST_MODE" == "true" ] && docker_args="$docker_args --test"
+[ "$INCREMENTAL" == "true" ] && docker_args="$docker_args --incremental"
+[ "$TRACE_MEMORY" == "true" ] && docker_args="$docker_args --trace-memory"
+[ "$FROM_CACHE" == "true" ] && docker_args="$docker_args --from-cache"
+docker_args="$docker_args --workers $WORKERS --pipeline $PIPELINE --chunk-size $CHUNK_SIZE --cluster $CLUSTER"
 
 if [ -z "$REGIONS" ]; then
   echo "No specific regions selected, processing all regions" | tee -a "$LOG_FILE"
   
+  all_args="$docker_args --dump $DUMP --report ${REPORT_PREFIX}.json"
+  [ "$PROFILE" == "true" ] && all_args="$all_args --profile ${REPORT_PREFIX}.prof"
+  
   echo "Starting Docker container for all regions..." >> "$LOG_FILE"
   if ! docker run --rm \
     -v $(pwd)/backend/data:/app/data \
     -e DATABASE_URL \
-    map-data-updater $docker_args 2>&1 | tee -a "$LOG_FILE"; then
+    map-data-updater $all_args 2>&1 | tee -a "$LOG_FILE"; then
     echo "::error::Data update failed! Check logs for details."
     echo "===== Update FAILED: $(date) =====" >> "$LOG_FILE"
     exit 1
@@ -40,13 +67,25 @@ if [ -z "$REGIONS" ]; then
 else
   echo "Processing selected regions: $REGIONS" | tee -a "$LOG_FILE"
   IFS=',' read -ra REGION_ARRAY <<< "$REGIONS"
+  LAST_REGION=""
+  for region in "${REGION_ARRAY[@]}"; do
+    [ -n "$region" ] && LAST_REGION="$region"
+  done
   
   for region in "${REGION_ARRAY[@]}"; do
     if [ -n "$region" ]; then
       echo "Processing region: $region" | tee -a "$LOG_FILE"
       
       # Start with the region-specific arg, then add common args
-      region_args="--region $region $docker_args"
+      region_args="--region $region $docker_args --report ${REPORT_PREFIX}_${region}.json"
+      [ "$PROFILE" == "true" ] && region_args="$region_args --profile ${REPORT_PREFIX}_${region}.prof"
+      # dump once after the last region, an incremental dump per region would
+      # replace the changes of the one before
+      if [ "$region" == "$LAST_REGION" ]; then
+        region_args="$region_args --dump $DUMP"
+      else
+        region_args="$region_args --dump off"
+      fi
       
       echo "Starting Docker container for region $region..." >> "$LOG_FILE"
       if ! docker run --rm \
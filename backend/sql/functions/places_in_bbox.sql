@@ -38,36 +38,12 @@ BEGIN
   END IF;
   
 
-  SELECT jsonb_agg(
-    jsonb_build_object(
-      'id', p.id,
-      'osm_id', p.osm_id,
-      'name', p.name,
-      'category', p.category,
-      'lat', p.lat,
-      'lon', p.lon,
-      'region', p.region,
-      'last_osm_update', p.last_osm_update,
-      'last_user_update', p.last_user_update,
-      'created_at', p.created_at,
-      'contact', to_jsonb(c) - 'place_id',
-      'generalAccessibility', to_jsonb(g) - 'place_id',
-      'entranceAccessibility', to_jsonb(e) - 'place_id',
-      'restroomAccessibility', to_jsonb(r) - 'place_id'
-    )
-  )
+  -- documents are precomputed by seeding and triggers, see place_documents
+  SELECT jsonb_agg(doc)
   INTO result
-  FROM public.places p
-    LEFT JOIN public.contact c
-      ON c.place_id = p.id
-    LEFT JOIN public.general_accessibility g
-      ON g.place_id = p.id
-    LEFT JOIN public.entrance_accessibility e
-      ON e.place_id = p.id
-    LEFT JOIN public.restroom_accessibility r
-      ON r.place_id = p.id
+  FROM public.place_documents
   WHERE ST_Intersects(
-    p.geom,
+    geom,
     ST_MakeEnvelope(safe_min_lon, safe_min_lat, safe_max_lon, safe_max_lat, 4326)::geography
   )
   LIMIT result_limit;
@@ -0,0 +1,94 @@
+-- Copyright © 2025 Aaro Koinsaari
+-- Licensed under the Apache License, Version 2.0
+-- http://www.apache.org/licenses/LICENSE-2.0
+
+-- places_in_bbox for zoomed-out views: places are grouped into grid cells of a
+-- quarter map tile at the given zoom, and cells with at least min_cluster_size
+-- places come back as one cluster with its place count, centroid and a count per
+-- general accessibility status. Places of sparser cells are returned as full
+-- documents. Nothing is cut off, the payload is bounded by the number of cells.
+-- Returns {"clusters": [...], "places": [...]}
+CREATE OR REPLACE FUNCTION places_in_bbox_clustered(
+  min_lon float8, min_lat float8,
+  max_lon float8, max_lat float8,
+  zoom integer,
+  min_cluster_size integer DEFAULT 10
+)
+RETURNS JSONB
+LANGUAGE plpgsql STABLE
+SET search_path = public
+AS
+$$
+DECLARE
+  shift integer;
+  min_x integer;
+  max_x integer;
+  min_y integer;
+  max_y integer;
+  result jsonb;
+BEGIN
+  -- place_documents stores zoom 20 cells, a cell here is a tile of zoom + 2
+  shift := 20 - GREATEST(0, LEAST(zoom + 2, 20));
+  -- zoom 20 cells of the bbox corners, computed like place_document_source does,
+  -- so cells are counted with an index-only scan of idx_place_documents_cells
+  min_x := LEAST(GREATEST(floor((min_lon + 180) / 360 * 1048576), 0), 1048575);
+  max_x := LEAST(GREATEST(floor((max_lon + 180) / 360 * 1048576), 0), 1048575);
+  min_y := LEAST(GREATEST(floor((1 - ln(tan(radians(LEAST(GREATEST(max_lat, -85.0511), 85.0511)))
+    + 1 / cos(radians(LEAST(GREATEST(max_lat, -85.0511), 85.0511)))) / pi()) / 2 * 1048576), 0), 1048575);
+  max_y := LEAST(GREATEST(floor((1 - ln(tan(radians(LEAST(GREATEST(min_lat, -85.0511), 85.0511)))
+    + 1 / cos(radians(LEAST(GREATEST(min_lat, -85.0511), 85.0511)))) / pi()) / 2 * 1048576), 0), 1048575);
+
+  WITH cells AS (
+    SELECT
+      d.cell_x >> shift AS cx,
+      d.cell_y >> shift AS cy,
+      count(*) AS places,
+      avg(d.lat) AS lat,
+      avg(d.lon) AS lon,
+      count(*) FILTER (WHERE d.accessibility = 'FULLY_ACCESSIBLE') AS fully,
+      count(*) FILTER (WHERE d.accessibility = 'PARTIALLY_ACCESSIBLE') AS partially,
+      count(*) FILTER (WHERE d.accessibility = 'NOT_ACCESSIBLE') AS "not",
+      count(*) FILTER (WHERE d.accessibility IS NULL) AS unknown
+    FROM public.place_documents d
+    WHERE d.cell_x BETWEEN min_x AND max_x
+      AND d.cell_y BETWEEN min_y AND max_y
+      -- border cells reach a little past the bbox
+      AND d.lat BETWEEN min_lat AND max_lat
+      AND d.lon BETWEEN min_lon AND max_lon
+    GROUP BY cx, cy
+  )
+  SELECT jsonb_build_object(
+    'clusters', (
+      SELECT coalesce(jsonb_agg(jsonb_build_object(
+        'count', c.places,
+        'lat', c.lat,
+        'lon', c.lon,
+        'accessibility', jsonb_build_object(
+          'FULLY_ACCESSIBLE', c.fully,
+          'PARTIALLY_ACCESSIBLE', c.partially,
+          'NOT_ACCESSIBLE', c."not",
+          'UNKNOWN', c.unknown
+        )
+      )), '[]'::jsonb)
+      FROM cells c
+      WHERE c.places >= min_cluster_size
+    ),
+    'places', (
+      -- documents are only read for the few places of sparse cells
+      SELECT coalesce(jsonb_agg(d.doc), '[]'::jsonb)
+      FROM cells c
+        JOIN public.place_documents d
+          ON d.cell_x BETWEEN GREATEST(c.cx << shift, min_x) AND LEAST(((c.cx + 1) << shift) - 1, max_x)
+          AND d.cell_y BETWEEN GREATEST(c.cy << shift, min_y) AND LEAST(((c.cy + 1) << shift) - 1, max_y)
+      WHERE c.places < min_cluster_size
+        AND d.lat BETWEEN min_lat AND max_lat
+        AND d.lon BETWEEN min_lon AND max_lon
+    )
+  )
+  INTO result;
+
+  RETURN result;
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION places_in_bbox_clustered(float8, float8, float8, float8, integer, integer) TO anon;
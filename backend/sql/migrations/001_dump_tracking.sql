@@ -0,0 +1,64 @@
+-- Copyright © 2025 Aaro Koinsaari
+-- Licensed under the Apache License, Version 2.0
+-- http://www.apache.org/licenses/LICENSE-2.0
+
+-- brings a database created from an earlier schema.sql up to what incremental
+-- dumps need: updated_at on every dumped table, kept current by a trigger so
+-- edits from the app count too, a log of deleted places, and the time of the
+-- last dump. Apply once, before the first run of this version:
+--   psql "$DATABASE_URL" -f sql/migrations/001_dump_tracking.sql
+BEGIN;
+
+CREATE TABLE public.dump_state (
+  name VARCHAR(50) PRIMARY KEY,
+  dumped_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
+
+CREATE TABLE public.deleted_places (
+  id UUID NOT NULL,
+  osm_id BIGINT NOT NULL,
+  deleted_at TIMESTAMP WITH TIME ZONE DEFAULT now() NOT NULL
+);
+
+CREATE INDEX idx_deleted_places_deleted_at ON public.deleted_places (deleted_at);
+
+ALTER TABLE public.places ADD COLUMN updated_at TIMESTAMP WITH TIME ZONE DEFAULT now();
+ALTER TABLE public.general_accessibility ADD COLUMN updated_at TIMESTAMP WITH TIME ZONE DEFAULT now();
+ALTER TABLE public.entrance_accessibility ADD COLUMN updated_at TIMESTAMP WITH TIME ZONE DEFAULT now();
+ALTER TABLE public.restroom_accessibility ADD COLUMN updated_at TIMESTAMP WITH TIME ZONE DEFAULT now();
+ALTER TABLE public.contact ADD COLUMN updated_at TIMESTAMP WITH TIME ZONE DEFAULT now();
+
+CREATE INDEX idx_places_updated_at ON public.places (updated_at);
+
+CREATE FUNCTION public.touch_updated_at() RETURNS TRIGGER
+LANGUAGE plpgsql AS
+$$
+BEGIN
+  NEW.updated_at := now();
+  RETURN NEW;
+END;
+$$;
+
+CREATE FUNCTION public.log_deleted_place() RETURNS TRIGGER
+LANGUAGE plpgsql AS
+$$
+BEGIN
+  INSERT INTO public.deleted_places (id, osm_id) VALUES (OLD.id, OLD.osm_id);
+  RETURN OLD;
+END;
+$$;
+
+CREATE TRIGGER touch_places BEFORE UPDATE ON public.places
+  FOR EACH ROW EXECUTE FUNCTION public.touch_updated_at();
+CREATE TRIGGER touch_general_accessibility BEFORE UPDATE ON public.general_accessibility
+  FOR EACH ROW EXECUTE FUNCTION public.touch_updated_at();
+CREATE TRIGGER touch_entrance_accessibility BEFORE UPDATE ON public.entrance_accessibility
+  FOR EACH ROW EXECUTE FUNCTION public.touch_updated_at();
+CREATE TRIGGER touch_restroom_accessibility BEFORE UPDATE ON public.restroom_accessibility
+  FOR EACH ROW EXECUTE FUNCTION public.touch_updated_at();
+CREATE TRIGGER touch_contact BEFORE UPDATE ON public.contact
+  FOR EACH ROW EXECUTE FUNCTION public.touch_updated_at();
+CREATE TRIGGER log_deleted_places AFTER DELETE ON public.places
+  FOR EACH ROW EXECUTE FUNCTION public.log_deleted_place();
+
+COMMIT;
\ No newline at end of file
@@ -0,0 +1,15 @@
+-- Copyright © 2025 Aaro Koinsaari
+-- Licensed under the Apache License, Version 2.0
+-- http://www.apache.org/licenses/LICENSE-2.0
+
+-- brings a database created from an earlier schema.sql up to what spatially
+-- ordered seeding and clustering need. Existing places get their key when the
+-- next full import merges them. Apply once, before the first run of this version:
+--   psql "$DATABASE_URL" -f sql/migrations/002_spatial_key.sql
+BEGIN;
+
+ALTER TABLE public.places ADD COLUMN spatial_key BIGINT;
+
+CREATE INDEX idx_places_spatial_key ON public.places (spatial_key);
+
+COMMIT;
\ No newline at end of file
@@ -0,0 +1,14 @@
+-- Copyright © 2025 Aaro Koinsaari
+-- Licensed under the Apache License, Version 2.0
+-- http://www.apache.org/licenses/LICENSE-2.0
+
+-- brings a database created from an earlier schema.sql up to what incremental
+-- updates need, the last applied replication sequence of each region. Apply
+-- once, before the first run of this version:
+--   psql "$DATABASE_URL" -f sql/migrations/004_replication_state.sql
+CREATE TABLE public.replication_state (
+  region VARCHAR(50) PRIMARY KEY,
+  sequence BIGINT NOT NULL,
+  timestamp TIMESTAMP WITH TIME ZONE,
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT now()
+);
\ No newline at end of file
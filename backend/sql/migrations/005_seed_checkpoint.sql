@@ -0,0 +1,15 @@
+-- Copyright © 2025 Aaro Koinsaari
+-- Licensed under the Apache License, Version 2.0
+-- http://www.apache.org/licenses/LICENSE-2.0
+
+-- brings a database created from an earlier schema.sql up to what chunked
+-- imports need, the committed chunks a failed import resumes after. Apply
+-- once, before the first run of this version:
+--   psql "$DATABASE_URL" -f sql/migrations/005_seed_checkpoint.sql
+CREATE TABLE public.seed_checkpoint (
+  region VARCHAR(50) PRIMARY KEY,
+  source TEXT NOT NULL,
+  places INTEGER NOT NULL,
+  chunks INTEGER NOT NULL,
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT now()
+);
\ No newline at end of file
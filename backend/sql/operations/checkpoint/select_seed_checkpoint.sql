@@ -2,5 +2,6 @@
 -- Licensed under the Apache License, Version 2.0
 -- http://www.apache.org/licenses/LICENSE-2.0
 
-INSERT INTO staging_places (osm_id, name, category, lat, lon, region)
-VALUES (%s, %s, %s, %s, %s, %s)
\ No newline at end of file
+SELECT source, places, chunks
+FROM public.seed_checkpoint
+WHERE region = %s
\ No newline at end of file
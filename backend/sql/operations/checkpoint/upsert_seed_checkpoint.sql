@@ -0,0 +1,11 @@
+-- Copyright © 2025 Aaro Koinsaari
+-- Licensed under the Apache License, Version 2.0
+-- http://www.apache.org/licenses/LICENSE-2.0
+
+INSERT INTO public.seed_checkpoint (region, source, places, chunks, updated_at)
+VALUES (%s, %s, %s, %s, now())
+ON CONFLICT (region) DO UPDATE SET
+    source = EXCLUDED.source,
+    places = EXCLUDED.places,
+    chunks = EXCLUDED.chunks,
+    updated_at = now()
\ No newline at end of file
@@ -0,0 +1,34 @@
+-- Copyright © 2025 Aaro Koinsaari
+-- Licensed under the Apache License, Version 2.0
+-- http://www.apache.org/licenses/LICENSE-2.0
+
+-- rewrite places and the tables read with it in Hilbert key order, so a bbox
+-- reads the few heap pages its places are on. Updates and deletes since the
+-- last rewrite leave rows out of order, seeding only orders the rows it inserts.
+-- Every table is locked until commit, like CLUSTER always does
+SET LOCAL inwheel.bulk_documents = 'on';
+
+CLUSTER public.places USING idx_places_spatial_key;
+
+-- the child tables have no key of their own, their rows are copied out in the
+-- order of their places and written back. Rows keep their updated_at, so
+-- incremental dumps do not see them as changed
+DO $$
+DECLARE
+  child text;
+BEGIN
+  FOREACH child IN ARRAY ARRAY[
+    'general_accessibility', 'entrance_accessibility', 'restroom_accessibility', 'contact', 'place_documents'
+  ] LOOP
+    EXECUTE format(
+      'CREATE TEMP TABLE clustered_rows AS SELECT c.* FROM public.%I c '
+      'JOIN public.places p ON p.id = c.place_id ORDER BY p.spatial_key', child);
+    EXECUTE format('TRUNCATE public.%I', child);
+    EXECUTE format('INSERT INTO public.%I SELECT * FROM clustered_rows', child);
+    DROP TABLE clustered_rows;
+  END LOOP;
+END
+$$;
+
+ANALYZE public.places, public.general_accessibility, public.entrance_accessibility,
+  public.restroom_accessibility, public.contact, public.place_documents
\ No newline at end of file
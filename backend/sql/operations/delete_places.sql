@@ -0,0 +1,16 @@
+-- Copyright © 2025 Aaro Koinsaari
+-- Licensed under the Apache License, Version 2.0
+-- http://www.apache.org/licenses/LICENSE-2.0
+
+-- places that were deleted or retagged out of TAGS in OSM. Places with user edits
+-- are kept unless overwrite is set, child rows go with ON DELETE CASCADE
+DELETE FROM public.places p
+USING staging_deleted sd
+WHERE p.osm_id = sd.osm_id
+  AND ({overwrite} OR NOT EXISTS (
+    SELECT 1 FROM public.general_accessibility g WHERE g.place_id = p.id AND g.user_modified
+    UNION ALL
+    SELECT 1 FROM public.entrance_accessibility e WHERE e.place_id = p.id AND e.user_modified
+    UNION ALL
+    SELECT 1 FROM public.restroom_accessibility r WHERE r.place_id = p.id AND r.user_modified
+  ))
\ No newline at end of file
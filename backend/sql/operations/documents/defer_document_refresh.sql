@@ -0,0 +1,7 @@
+-- Copyright © 2025 Aaro Koinsaari
+-- Licensed under the Apache License, Version 2.0
+-- http://www.apache.org/licenses/LICENSE-2.0
+
+-- row triggers on the merged tables skip their document refresh for the rest
+-- of the transaction, refresh_place_documents.sql covers the written places
+SET LOCAL inwheel.bulk_documents = 'on'
@@ -0,0 +1,19 @@
+-- Copyright © 2025 Aaro Koinsaari
+-- Licensed under the Apache License, Version 2.0
+-- http://www.apache.org/licenses/LICENSE-2.0
+
+-- rebuild the documents of every place a merge wrote, in one statement. New
+-- documents are inserted in Hilbert key order, the bbox functions read this table
+INSERT INTO public.place_documents (place_id, geom, doc, lat, lon, cell_x, cell_y, accessibility)
+SELECT v.place_id, v.geom, v.doc, v.lat, v.lon, v.cell_x, v.cell_y, v.accessibility
+FROM public.place_document_source v
+WHERE v.place_id IN (SELECT place_id FROM touched_places)
+ORDER BY v.spatial_key
+ON CONFLICT (place_id) DO UPDATE SET
+  geom = EXCLUDED.geom,
+  doc = EXCLUDED.doc,
+  lat = EXCLUDED.lat,
+  lon = EXCLUDED.lon,
+  cell_x = EXCLUDED.cell_x,
+  cell_y = EXCLUDED.cell_y,
+  accessibility = EXCLUDED.accessibility
\ No newline at end of file
@@ -0,0 +1,5 @@
+-- Copyright © 2025 Aaro Koinsaari
+-- Licensed under the Apache License, Version 2.0
+-- http://www.apache.org/licenses/LICENSE-2.0
+
+COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER)
@@ -0,0 +1,11 @@
+-- Copyright © 2025 Aaro Koinsaari
+-- Licensed under the Apache License, Version 2.0
+-- http://www.apache.org/licenses/LICENSE-2.0
+
+-- a snapshot the per-table connections share, so all files show the same moment.
+-- changes of writers still running may be invisible to it, their rows carry an
+-- updated_at from their own start, so the next dump starts from the oldest of them
+SELECT pg_export_snapshot(), coalesce(
+  (SELECT min(xact_start) FROM pg_stat_activity WHERE backend_xid IS NOT NULL AND pid <> pg_backend_pid()),
+  now()
+)
@@ -0,0 +1,6 @@
+-- Copyright © 2025 Aaro Koinsaari
+-- Licensed under the Apache License, Version 2.0
+-- http://www.apache.org/licenses/LICENSE-2.0
+
+-- deletions before the recorded dump time are in that dump or an earlier one
+DELETE FROM public.deleted_places WHERE deleted_at < %s
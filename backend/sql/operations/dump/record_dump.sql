@@ -0,0 +1,6 @@
+-- Copyright © 2025 Aaro Koinsaari
+-- Licensed under the Apache License, Version 2.0
+-- http://www.apache.org/licenses/LICENSE-2.0
+
+INSERT INTO public.dump_state (name, dumped_at) VALUES (%s, %s)
+ON CONFLICT (name) DO UPDATE SET dumped_at = EXCLUDED.dumped_at
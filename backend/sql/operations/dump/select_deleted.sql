@@ -0,0 +1,7 @@
+-- Copyright © 2025 Aaro Koinsaari
+-- Licensed under the Apache License, Version 2.0
+-- http://www.apache.org/licenses/LICENSE-2.0
+
+SELECT id, osm_id, deleted_at FROM public.deleted_places
+WHERE deleted_at >= %(since)s
+ORDER BY deleted_at, id
@@ -0,0 +1,5 @@
+-- Copyright © 2025 Aaro Koinsaari
+-- Licensed under the Apache License, Version 2.0
+-- http://www.apache.org/licenses/LICENSE-2.0
+
+SELECT dumped_at FROM public.dump_state WHERE name = %s
@@ -0,0 +1,8 @@
+-- Copyright © 2025 Aaro Koinsaari
+-- Licensed under the Apache License, Version 2.0
+-- http://www.apache.org/licenses/LICENSE-2.0
+
+-- ordered by key so unchanged rows stay on the same lines between dumps
+SELECT * FROM public.{table}
+WHERE %(since)s::timestamptz IS NULL OR updated_at >= %(since)s
+ORDER BY {key}
@@ -2,12 +2,23 @@
 -- Licensed under the Apache License, Version 2.0
 -- http://www.apache.org/licenses/LICENSE-2.0
 
-INSERT INTO public.contact (place_id, phone, website, email, address)
-SELECT p.id, sc.phone, sc.website, sc.email, sc.address
-FROM staging_contact sc
-JOIN public.places p ON p.osm_id = sc.osm_id
-ON CONFLICT (place_id) DO UPDATE SET
-    phone = EXCLUDED.phone,
-    website = EXCLUDED.website,
-    email = EXCLUDED.email,
-    address = EXCLUDED.address
\ No newline at end of file
+-- rows are only rewritten when a value actually changed. returns (inserted, updated) counts,
+-- written rows are recorded in touched_places
+WITH upserted AS (
+    INSERT INTO public.contact (place_id, phone, website, email, address)
+    SELECT s.place_id, s.phone, s.website, s.email, s.address
+    FROM staging_resolved s
+    ORDER BY s.spatial_key
+    ON CONFLICT (place_id) DO UPDATE SET
+        phone = EXCLUDED.phone,
+        website = EXCLUDED.website,
+        email = EXCLUDED.email,
+        address = EXCLUDED.address
+    WHERE (contact.phone, contact.website, contact.email, contact.address)
+        IS DISTINCT FROM (EXCLUDED.phone, EXCLUDED.website, EXCLUDED.email, EXCLUDED.address)
+    RETURNING place_id, (xmax = 0) AS inserted
+), touched AS (
+    INSERT INTO touched_places SELECT place_id FROM upserted
+)
+SELECT count(*) FILTER (WHERE inserted), count(*) FILTER (WHERE NOT inserted)
+FROM upserted
\ No newline at end of file
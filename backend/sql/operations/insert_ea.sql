@@ -2,39 +2,41 @@
 -- Licensed under the Apache License, Version 2.0
 -- http://www.apache.org/licenses/LICENSE-2.0
 
-INSERT INTO public.entrance_accessibility (
-    place_id, accessibility, step_count, step_height, ramp, lift, entrance_width, door_type
+-- user-modified rows are left alone unless overwrite is set, and rows are
+-- only rewritten when a value actually changed. returns (inserted, updated) counts,
+-- written rows are recorded in touched_places
+WITH upserted AS (
+    INSERT INTO public.entrance_accessibility (
+        place_id, accessibility, step_count, step_height, ramp, lift, entrance_width, door_type
+    )
+    SELECT
+        s.place_id,
+        s.ea_accessibility::ACCESSIBILITY_STATUS,
+        s.ea_step_count::ACCESSIBILITY_STATUS,
+        s.ea_step_height::ACCESSIBILITY_STATUS,
+        s.ea_ramp::ACCESSIBILITY_STATUS,
+        s.ea_lift::ACCESSIBILITY_STATUS,
+        s.ea_entrance_width::ACCESSIBILITY_STATUS,
+        s.ea_door_type
+    FROM staging_resolved s
+    ORDER BY s.spatial_key
+    ON CONFLICT (place_id) DO UPDATE SET
+        accessibility = EXCLUDED.accessibility,
+        step_count = EXCLUDED.step_count,
+        step_height = EXCLUDED.step_height,
+        ramp = EXCLUDED.ramp,
+        lift = EXCLUDED.lift,
+        entrance_width = EXCLUDED.entrance_width,
+        door_type = EXCLUDED.door_type
+    WHERE (entrance_accessibility.user_modified IS NOT TRUE OR {overwrite})
+        AND (entrance_accessibility.accessibility, entrance_accessibility.step_count,
+             entrance_accessibility.step_height, entrance_accessibility.ramp, entrance_accessibility.lift,
+             entrance_accessibility.entrance_width, entrance_accessibility.door_type)
+        IS DISTINCT FROM (EXCLUDED.accessibility, EXCLUDED.step_count, EXCLUDED.step_height, EXCLUDED.ramp,
+                          EXCLUDED.lift, EXCLUDED.entrance_width, EXCLUDED.door_type)
+    RETURNING place_id, (xmax = 0) AS inserted
+), touched AS (
+    INSERT INTO touched_places SELECT place_id FROM upserted
 )
-SELECT 
-    p.id, 
-    se.accessibility::ACCESSIBILITY_STATUS,
-    se.step_count::ACCESSIBILITY_STATUS,
-    se.step_height::ACCESSIBILITY_STATUS,
-    se.ramp::ACCESSIBILITY_STATUS,
-    se.lift::ACCESSIBILITY_STATUS,
-    se.entrance_width::ACCESSIBILITY_STATUS,
-    se.door_type
-FROM staging_ea se
-JOIN public.places p ON p.osm_id = se.osm_id
-ON CONFLICT (place_id) DO UPDATE SET
-    accessibility = CASE WHEN entrance_accessibility.user_modified AND NOT {overwrite} 
-        THEN entrance_accessibility.accessibility 
-        ELSE EXCLUDED.accessibility END,
-    step_count = CASE WHEN entrance_accessibility.user_modified AND NOT {overwrite} 
-        THEN entrance_accessibility.step_count 
-        ELSE EXCLUDED.step_count END,
-    step_height = CASE WHEN entrance_accessibility.user_modified AND NOT {overwrite} 
-        THEN entrance_accessibility.step_height 
-        ELSE EXCLUDED.step_height END,
-    ramp = CASE WHEN entrance_accessibility.user_modified AND NOT {overwrite} 
-        THEN entrance_accessibility.ramp 
-        ELSE EXCLUDED.ramp END,
-    lift = CASE WHEN entrance_accessibility.user_modified AND NOT {overwrite} 
-        THEN entrance_accessibility.lift 
-        ELSE EXCLUDED.lift END,
-    entrance_width = CASE WHEN entrance_accessibility.user_modified AND NOT {overwrite} 
-        THEN entrance_accessibility.entrance_width 
-        ELSE EXCLUDED.entrance_width END,
-    door_type = CASE WHEN entrance_accessibility.user_modified AND NOT {overwrite} 
-        THEN entrance_accessibility.door_type 
-        ELSE EXCLUDED.door_type END
\ No newline at end of file
+SELECT count(*) FILTER (WHERE inserted), count(*) FILTER (WHERE NOT inserted)
+FROM upserted
\ No newline at end of file
@@ -2,21 +2,29 @@
 -- Licensed under the Apache License, Version 2.0
 -- http://www.apache.org/licenses/LICENSE-2.0
 
-INSERT INTO public.general_accessibility (place_id, accessibility, indoor_accessibility, additional_info)
-SELECT 
-    p.id, 
-    sg.accessibility::ACCESSIBILITY_STATUS,
-    sg.indoor_accessibility::ACCESSIBILITY_STATUS,
-    sg.additional_info
-FROM staging_ga sg
-JOIN public.places p ON p.osm_id = sg.osm_id
-ON CONFLICT (place_id) DO UPDATE SET
-    accessibility = CASE WHEN general_accessibility.user_modified AND NOT {overwrite} 
-        THEN general_accessibility.accessibility 
-        ELSE EXCLUDED.accessibility END,
-    indoor_accessibility = CASE WHEN general_accessibility.user_modified AND NOT {overwrite} 
-        THEN general_accessibility.indoor_accessibility 
-        ELSE EXCLUDED.indoor_accessibility END,
-    additional_info = CASE WHEN general_accessibility.user_modified AND NOT {overwrite} 
-        THEN general_accessibility.additional_info 
-        ELSE EXCLUDED.additional_info END
\ No newline at end of file
+-- user-modified rows are left alone unless overwrite is set, and rows are
+-- only rewritten when a value actually changed. returns (inserted, updated) counts,
+-- written rows are recorded in touched_places
+WITH upserted AS (
+    INSERT INTO public.general_accessibility (place_id, accessibility, indoor_accessibility, additional_info)
+    SELECT
+        s.place_id,
+        s.ga_accessibility::ACCESSIBILITY_STATUS,
+        s.ga_indoor_accessibility::ACCESSIBILITY_STATUS,
+        s.ga_additional_info
+    FROM staging_resolved s
+    ORDER BY s.spatial_key
+    ON CONFLICT (place_id) DO UPDATE SET
+        accessibility = EXCLUDED.accessibility,
+        indoor_accessibility = EXCLUDED.indoor_accessibility,
+        additional_info = EXCLUDED.additional_info
+    WHERE (general_accessibility.user_modified IS NOT TRUE OR {overwrite})
+        AND (general_accessibility.accessibility, general_accessibility.indoor_accessibility,
+             general_accessibility.additional_info)
+        IS DISTINCT FROM (EXCLUDED.accessibility, EXCLUDED.indoor_accessibility, EXCLUDED.additional_info)
+    RETURNING place_id, (xmax = 0) AS inserted
+), touched AS (
+    INSERT INTO touched_places SELECT place_id FROM upserted
+)
+SELECT count(*) FILTER (WHERE inserted), count(*) FILTER (WHERE NOT inserted)
+FROM upserted
\ No newline at end of file
@@ -2,15 +2,31 @@
 -- Licensed under the Apache License, Version 2.0
 -- http://www.apache.org/licenses/LICENSE-2.0
 
-INSERT INTO public.places (osm_id, name, category, lat, lon, geom, region, last_osm_update)
-SELECT sp.osm_id, sp.name, sp.category, sp.lat, sp.lon, 
-        ST_SetSRID(ST_MakePoint(sp.lon, sp.lat), 4326), sp.region, now()
-FROM staging_places sp
-ON CONFLICT (osm_id) DO UPDATE SET
-    name = EXCLUDED.name,
-    category = EXCLUDED.category,
-    lat = EXCLUDED.lat,
-    lon = EXCLUDED.lon,
-    geom = EXCLUDED.geom,
-    region = EXCLUDED.region,
-    last_osm_update = now()
\ No newline at end of file
+-- rows are only rewritten when a value actually changed, unchanged places are skipped.
+-- returns (inserted, updated) counts, xmax = 0 marks freshly inserted rows.
+-- written rows are recorded in touched_places. New rows are inserted in Hilbert
+-- key order, so places close together on the map share heap pages
+WITH upserted AS (
+    INSERT INTO public.places (osm_id, name, category, lat, lon, geom, region, spatial_key, last_osm_update)
+    SELECT sp.osm_id, sp.name, sp.category, sp.lat, sp.lon, 
+            ST_SetSRID(ST_MakePoint(sp.lon, sp.lat), 4326), sp.region, sp.spatial_key, now()
+    FROM staging_place sp
+    ORDER BY sp.spatial_key
+    ON CONFLICT (osm_id) DO UPDATE SET
+        name = EXCLUDED.name,
+        category = EXCLUDED.category,
+        lat = EXCLUDED.lat,
+        lon = EXCLUDED.lon,
+        geom = EXCLUDED.geom,
+        region = EXCLUDED.region,
+        spatial_key = EXCLUDED.spatial_key,
+        last_osm_update = now()
+    WHERE (places.name, places.category, places.lat, places.lon, places.region, places.spatial_key)
+        IS DISTINCT FROM (EXCLUDED.name, EXCLUDED.category, EXCLUDED.lat, EXCLUDED.lon, EXCLUDED.region,
+                          EXCLUDED.spatial_key)
+    RETURNING id AS place_id, (xmax = 0) AS inserted
+), touched AS (
+    INSERT INTO touched_places SELECT place_id FROM upserted
+)
+SELECT count(*) FILTER (WHERE inserted), count(*) FILTER (WHERE NOT inserted)
+FROM upserted
\ No newline at end of file
@@ -2,44 +2,46 @@
 -- Licensed under the Apache License, Version 2.0
 -- http://www.apache.org/licenses/LICENSE-2.0
 
-INSERT INTO public.restroom_accessibility (
-    place_id, accessibility, door_width, room_maneuver, grab_rails, 
-    sink, toilet_seat, emergency_alarm, euro_key
+-- user-modified rows are left alone unless overwrite is set, and rows are
+-- only rewritten when a value actually changed. returns (inserted, updated) counts,
+-- written rows are recorded in touched_places
+WITH upserted AS (
+    INSERT INTO public.restroom_accessibility (
+        place_id, accessibility, door_width, room_maneuver, grab_rails, 
+        sink, toilet_seat, emergency_alarm, euro_key
+    )
+    SELECT
+        s.place_id,
+        s.ra_accessibility::ACCESSIBILITY_STATUS,
+        s.ra_door_width::ACCESSIBILITY_STATUS,
+        s.ra_room_maneuver::ACCESSIBILITY_STATUS,
+        s.ra_grab_rails::ACCESSIBILITY_STATUS,
+        s.ra_sink::ACCESSIBILITY_STATUS,
+        s.ra_toilet_seat::ACCESSIBILITY_STATUS,
+        s.ra_emergency_alarm::ACCESSIBILITY_STATUS,
+        s.ra_euro_key
+    FROM staging_resolved s
+    ORDER BY s.spatial_key
+    ON CONFLICT (place_id) DO UPDATE SET
+        accessibility = EXCLUDED.accessibility,
+        door_width = EXCLUDED.door_width,
+        room_maneuver = EXCLUDED.room_maneuver,
+        grab_rails = EXCLUDED.grab_rails,
+        sink = EXCLUDED.sink,
+        toilet_seat = EXCLUDED.toilet_seat,
+        emergency_alarm = EXCLUDED.emergency_alarm,
+        euro_key = EXCLUDED.euro_key
+    WHERE (restroom_accessibility.user_modified IS NOT TRUE OR {overwrite})
+        AND (restroom_accessibility.accessibility, restroom_accessibility.door_width,
+             restroom_accessibility.room_maneuver, restroom_accessibility.grab_rails,
+             restroom_accessibility.sink, restroom_accessibility.toilet_seat,
+             restroom_accessibility.emergency_alarm, restroom_accessibility.euro_key)
+        IS DISTINCT FROM (EXCLUDED.accessibility, EXCLUDED.door_width, EXCLUDED.room_maneuver,
+                          EXCLUDED.grab_rails, EXCLUDED.sink, EXCLUDED.toilet_seat,
+                          EXCLUDED.emergency_alarm, EXCLUDED.euro_key)
+    RETURNING place_id, (xmax = 0) AS inserted
+), touched AS (
+    INSERT INTO touched_places SELECT place_id FROM upserted
 )
-SELECT 
-    p.id, 
-    sr.accessibility::ACCESSIBILITY_STATUS,
-    sr.door_width::ACCESSIBILITY_STATUS,
-    sr.room_maneuver::ACCESSIBILITY_STATUS,
-    sr.grab_rails::ACCESSIBILITY_STATUS,
-    sr.sink::ACCESSIBILITY_STATUS,
-    sr.toilet_seat::ACCESSIBILITY_STATUS,
-    sr.emergency_alarm::ACCESSIBILITY_STATUS,
-    sr.euro_key
-FROM staging_ra sr
-JOIN public.places p ON p.osm_id = sr.osm_id
-ON CONFLICT (place_id) DO UPDATE SET
-    accessibility = CASE WHEN restroom_accessibility.user_modified AND NOT {overwrite} 
-        THEN restroom_accessibility.accessibility 
-        ELSE EXCLUDED.accessibility END,
-    door_width = CASE WHEN restroom_accessibility.user_modified AND NOT {overwrite} 
-        THEN restroom_accessibility.door_width 
-        ELSE EXCLUDED.door_width END,
-    room_maneuver = CASE WHEN restroom_accessibility.user_modified AND NOT {overwrite} 
-        THEN restroom_accessibility.room_maneuver 
-        ELSE EXCLUDED.room_maneuver END,
-    grab_rails = CASE WHEN restroom_accessibility.user_modified AND NOT {overwrite} 
-        THEN restroom_accessibility.grab_rails 
-        ELSE EXCLUDED.grab_rails END,
-    sink = CASE WHEN restroom_accessibility.user_modified AND NOT {overwrite} 
-        THEN restroom_accessibility.sink 
-        ELSE EXCLUDED.sink END,
-    toilet_seat = CASE WHEN restroom_accessibility.user_modified AND NOT {overwrite} 
-        THEN restroom_accessibility.toilet_seat 
-        ELSE EXCLUDED.toilet_seat END,
-    emergency_alarm = CASE WHEN restroom_accessibility.user_modified AND NOT {overwrite} 
-        THEN restroom_accessibility.emergency_alarm 
-        ELSE EXCLUDED.emergency_alarm END,
-    euro_key = CASE WHEN restroom_accessibility.user_modified AND NOT {overwrite} 
-        THEN restroom_accessibility.euro_key 
-        ELSE EXCLUDED.euro_key END
\ No newline at end of file
+SELECT count(*) FILTER (WHERE inserted), count(*) FILTER (WHERE NOT inserted)
+FROM upserted
\ No newline at end of file
@@ -0,0 +1,7 @@
+-- Copyright © 2025 Aaro Koinsaari
+-- Licensed under the Apache License, Version 2.0
+-- http://www.apache.org/licenses/LICENSE-2.0
+
+SELECT sequence, timestamp
+FROM public.replication_state
+WHERE region = %s
\ No newline at end of file
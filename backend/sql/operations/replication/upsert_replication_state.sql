@@ -0,0 +1,10 @@
+-- Copyright © 2025 Aaro Koinsaari
+-- Licensed under the Apache License, Version 2.0
+-- http://www.apache.org/licenses/LICENSE-2.0
+
+INSERT INTO public.replication_state (region, sequence, timestamp, updated_at)
+VALUES (%s, %s, %s, now())
+ON CONFLICT (region) DO UPDATE SET
+    sequence = EXCLUDED.sequence,
+    timestamp = EXCLUDED.timestamp,
+    updated_at = now()
\ No newline at end of file
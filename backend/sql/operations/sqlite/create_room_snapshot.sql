@@ -0,0 +1,28 @@
+-- Copyright © 2025 Aaro Koinsaari
+-- Licensed under the Apache License, Version 2.0
+-- http://www.apache.org/licenses/LICENSE-2.0
+
+-- SQLite snapshot of a region for the app. places is the table Room creates
+-- for the Place entity (AppDatabase version 1), with the same columns, types
+-- and indexes, so Room accepts the file as a prepackaged database. tileId is
+-- filled in, which makes the tileId index the spatial index getPlacesInTiles
+-- reads. snapshot_info holds the version of the file, deleted_places the ids a
+-- patch removes and is empty in a full snapshot.
+CREATE TABLE IF NOT EXISTS `places` (`id` TEXT NOT NULL, `name` TEXT NOT NULL, `category` TEXT NOT NULL, `lat` REAL NOT NULL, `lon` REAL NOT NULL, `region` TEXT, `email` TEXT, `phone` TEXT, `address` TEXT, `website` TEXT, `generalAccessibility` TEXT, `indoorAccessibility` TEXT, `entranceAccessibility` TEXT, `additionalInfo` TEXT, `stepCount` TEXT, `stepHeight` TEXT, `ramp` TEXT, `lift` TEXT, `entranceWidth` TEXT, `doorType` TEXT, `restroomAccessibility` TEXT, `doorWidth` TEXT, `roomManeuver` TEXT, `grabRails` TEXT, `toiletSeat` TEXT, `emergencyAlarm` TEXT, `sink` TEXT, `euroKey` INTEGER, `tileId` TEXT, `fetchTimestamp` INTEGER NOT NULL, `lastVisited` INTEGER NOT NULL, `userModified` INTEGER NOT NULL, PRIMARY KEY(`id`));
+CREATE INDEX IF NOT EXISTS `index_places_lat_lon` ON `places` (`lat`, `lon`);
+CREATE INDEX IF NOT EXISTS `index_places_tileId` ON `places` (`tileId`);
+CREATE INDEX IF NOT EXISTS `index_places_region` ON `places` (`region`);
+CREATE INDEX IF NOT EXISTS `index_places_category` ON `places` (`category`);
+CREATE INDEX IF NOT EXISTS `index_places_lastVisited` ON `places` (`lastVisited`);
+
+CREATE TABLE IF NOT EXISTS snapshot_info (
+  key TEXT PRIMARY KEY NOT NULL,
+  value TEXT
+);
+
+CREATE TABLE IF NOT EXISTS deleted_places (
+  id TEXT PRIMARY KEY NOT NULL
+);
+
+-- the version of the Room database, a different one makes Room run migrations
+PRAGMA user_version = 1;
\ No newline at end of file
@@ -0,0 +1,44 @@
+-- Copyright © 2025 Aaro Koinsaari
+-- Licensed under the Apache License, Version 2.0
+-- http://www.apache.org/licenses/LICENSE-2.0
+
+-- places of a region as columns of the app's Room entity, in its column order
+-- up to euroKey, then userModified. Missing statuses are UNKNOWN and a missing
+-- name "Unknown", like the app maps a places_in_bbox document
+SELECT
+  p.id::text,
+  coalesce(p.name, 'Unknown'),
+  p.category,
+  p.lat,
+  p.lon,
+  p.region,
+  c.email,
+  c.phone,
+  c.address,
+  c.website,
+  coalesce(g.accessibility::text, 'UNKNOWN'),
+  coalesce(g.indoor_accessibility::text, 'UNKNOWN'),
+  coalesce(e.accessibility::text, 'UNKNOWN'),
+  g.additional_info,
+  coalesce(e.step_count::text, 'UNKNOWN'),
+  coalesce(e.step_height::text, 'UNKNOWN'),
+  coalesce(e.ramp::text, 'UNKNOWN'),
+  coalesce(e.lift::text, 'UNKNOWN'),
+  coalesce(e.entrance_width::text, 'UNKNOWN'),
+  e.door_type,
+  coalesce(r.accessibility::text, 'UNKNOWN'),
+  coalesce(r.door_width::text, 'UNKNOWN'),
+  coalesce(r.room_maneuver::text, 'UNKNOWN'),
+  coalesce(r.grab_rails::text, 'UNKNOWN'),
+  coalesce(r.toilet_seat::text, 'UNKNOWN'),
+  coalesce(r.emergency_alarm::text, 'UNKNOWN'),
+  coalesce(r.sink::text, 'UNKNOWN'),
+  r.euro_key,
+  coalesce(g.user_modified, false) OR coalesce(e.user_modified, false) OR coalesce(r.user_modified, false)
+FROM public.places p
+  LEFT JOIN public.contact c ON c.place_id = p.id
+  LEFT JOIN public.general_accessibility g ON g.place_id = p.id
+  LEFT JOIN public.entrance_accessibility e ON e.place_id = p.id
+  LEFT JOIN public.restroom_accessibility r ON r.place_id = p.id
+WHERE p.region = %s
+ORDER BY p.id
\ No newline at end of file
@@ -0,0 +1,7 @@
+-- Copyright © 2025 Aaro Koinsaari
+-- Licensed under the Apache License, Version 2.0
+-- http://www.apache.org/licenses/LICENSE-2.0
+
+-- temp tables are never analyzed automatically, without statistics the planner
+-- guesses their size and may join them against public.places with nested loops
+ANALYZE staging_place
\ No newline at end of file
@@ -0,0 +1,8 @@
+-- Copyright © 2025 Aaro Koinsaari
+-- Licensed under the Apache License, Version 2.0
+-- http://www.apache.org/licenses/LICENSE-2.0
+
+-- empties the staging tables after a chunk is merged and committed, so the
+-- next chunk is staged into the same temp tables
+TRUNCATE staging_place, staging_deleted, touched_places;
+DROP TABLE IF EXISTS staging_resolved
\ No newline at end of file
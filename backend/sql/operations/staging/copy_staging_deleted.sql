@@ -0,0 +1,6 @@
+-- Copyright © 2025 Aaro Koinsaari
+-- Licensed under the Apache License, Version 2.0
+-- http://www.apache.org/licenses/LICENSE-2.0
+
+COPY staging_deleted (osm_id)
+FROM STDIN WITH (FORMAT {format})
\ No newline at end of file
@@ -0,0 +1,13 @@
+-- Copyright © 2025 Aaro Koinsaari
+-- Licensed under the Apache License, Version 2.0
+-- http://www.apache.org/licenses/LICENSE-2.0
+
+COPY staging_place (
+    osm_id, name, category, lat, lon, region, spatial_key,
+    ga_accessibility, ga_indoor_accessibility, ga_additional_info,
+    ea_accessibility, ea_step_count, ea_step_height, ea_ramp, ea_lift, ea_entrance_width, ea_door_type,
+    ra_accessibility, ra_door_width, ra_room_maneuver, ra_grab_rails, ra_sink, ra_toilet_seat,
+    ra_emergency_alarm, ra_euro_key,
+    phone, website, email, address
+)
+FROM STDIN WITH (FORMAT {format})
\ No newline at end of file
@@ -2,49 +2,45 @@
 -- Licensed under the Apache License, Version 2.0
 -- http://www.apache.org/licenses/LICENSE-2.0
 
-CREATE TEMP TABLE staging_places (
+-- one row per place with the columns of places and its four child tables, so
+-- osm_id is staged once and place_id is resolved once for all child merges
+CREATE TEMP TABLE staging_place (
     osm_id BIGINT,
     name VARCHAR(255),
     category VARCHAR(50),
     lat DOUBLE PRECISION,
     lon DOUBLE PRECISION,
-    region VARCHAR(50)
-);
-
-CREATE TEMP TABLE staging_ga (
-    osm_id BIGINT,
-    accessibility VARCHAR(20),
-    indoor_accessibility VARCHAR(20),
-    additional_info TEXT
-);
-
-CREATE TEMP TABLE staging_ea (
-    osm_id BIGINT,
-    accessibility VARCHAR(20),
-    step_count VARCHAR(20),
-    step_height VARCHAR(20),
-    ramp VARCHAR(20),
-    lift VARCHAR(20),
-    entrance_width VARCHAR(20),
-    door_type VARCHAR(50)
-);
-
-CREATE TEMP TABLE staging_ra (
-    osm_id BIGINT,
-    accessibility VARCHAR(20),
-    door_width VARCHAR(20),
-    room_maneuver VARCHAR(20),
-    grab_rails VARCHAR(20),
-    sink VARCHAR(20),
-    toilet_seat VARCHAR(20),
-    emergency_alarm VARCHAR(20),
-    euro_key BOOLEAN
-);
-
-CREATE TEMP TABLE staging_contact (
-    osm_id BIGINT,
+    region VARCHAR(50),
+    spatial_key BIGINT,
+    ga_accessibility VARCHAR(20),
+    ga_indoor_accessibility VARCHAR(20),
+    ga_additional_info TEXT,
+    ea_accessibility VARCHAR(20),
+    ea_step_count VARCHAR(20),
+    ea_step_height VARCHAR(20),
+    ea_ramp VARCHAR(20),
+    ea_lift VARCHAR(20),
+    ea_entrance_width VARCHAR(20),
+    ea_door_type VARCHAR(50),
+    ra_accessibility VARCHAR(20),
+    ra_door_width VARCHAR(20),
+    ra_room_maneuver VARCHAR(20),
+    ra_grab_rails VARCHAR(20),
+    ra_sink VARCHAR(20),
+    ra_toilet_seat VARCHAR(20),
+    ra_emergency_alarm VARCHAR(20),
+    ra_euro_key BOOLEAN,
     phone VARCHAR(100),
     website VARCHAR(255),
     email VARCHAR(255),
     address VARCHAR(255)
-);
\ No newline at end of file
+);
+
+CREATE TEMP TABLE staging_deleted (
+    osm_id BIGINT
+);
+
+-- places whose row or child rows the merges wrote, their documents are refreshed afterwards
+CREATE TEMP TABLE touched_places (
+    place_id UUID
+)
\ No newline at end of file
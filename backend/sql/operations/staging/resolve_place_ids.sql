@@ -0,0 +1,14 @@
+-- Copyright © 2025 Aaro Koinsaari
+-- Licensed under the Apache License, Version 2.0
+-- http://www.apache.org/licenses/LICENSE-2.0
+
+-- look up the place_id of every staged place once, after the places merge, so the
+-- child table merges read it from here instead of each joining public.places.
+-- Kept in Hilbert key order, the order the child merges insert in
+CREATE TEMP TABLE staging_resolved AS
+SELECT p.id AS place_id, s.*
+FROM staging_place s
+JOIN public.places p ON p.osm_id = s.osm_id
+ORDER BY s.spatial_key;
+
+ANALYZE staging_resolved
\ No newline at end of file
@@ -0,0 +1,10 @@
+-- Copyright © 2025 Aaro Koinsaari
+-- Licensed under the Apache License, Version 2.0
+-- http://www.apache.org/licenses/LICENSE-2.0
+
+-- with the index the anti-join stays a lookup per place even when the statistics
+-- of places still predate the import and the planner picks a nested loop
+CREATE INDEX ON seen_osm_ids (osm_id);
+
+-- temp tables are never analyzed automatically, the anti-join needs the row count
+ANALYZE seen_osm_ids
\ No newline at end of file
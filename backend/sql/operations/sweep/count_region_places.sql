@@ -0,0 +1,8 @@
+-- Copyright © 2025 Aaro Koinsaari
+-- Licensed under the Apache License, Version 2.0
+-- http://www.apache.org/licenses/LICENSE-2.0
+
+SELECT count(*)
+FROM public.places
+WHERE region = %s
+  AND ({areas} OR osm_id > 0)
\ No newline at end of file
@@ -0,0 +1,12 @@
+-- Copyright © 2025 Aaro Koinsaari
+-- Licensed under the Apache License, Version 2.0
+-- http://www.apache.org/licenses/LICENSE-2.0
+
+-- osm_ids of every place of a complete full import
+CREATE TEMP TABLE seen_osm_ids (
+    osm_id BIGINT
+);
+
+CREATE TEMP TABLE missing_places (
+    id UUID
+)
\ No newline at end of file
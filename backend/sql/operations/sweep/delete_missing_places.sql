@@ -0,0 +1,8 @@
+-- Copyright © 2025 Aaro Koinsaari
+-- Licensed under the Apache License, Version 2.0
+-- http://www.apache.org/licenses/LICENSE-2.0
+
+-- child rows and documents go with ON DELETE CASCADE
+DELETE FROM public.places p
+USING missing_places m
+WHERE p.id = m.id
\ No newline at end of file
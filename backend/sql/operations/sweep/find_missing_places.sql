@@ -0,0 +1,21 @@
+-- Copyright © 2025 Aaro Koinsaari
+-- Licensed under the Apache License, Version 2.0
+-- http://www.apache.org/licenses/LICENSE-2.0
+
+-- places of the region the complete extract no longer has, they were deleted or
+-- retagged out of TAGS in OSM. With areas false the extract had no ways and
+-- relations, so only nodes are considered. Places with user edits are kept
+-- unless overwrite is set
+INSERT INTO missing_places
+SELECT p.id
+FROM public.places p
+WHERE p.region = %s
+  AND ({areas} OR p.osm_id > 0)
+  AND NOT EXISTS (SELECT 1 FROM seen_osm_ids s WHERE s.osm_id = p.osm_id)
+  AND ({overwrite} OR NOT EXISTS (
+    SELECT 1 FROM public.general_accessibility g WHERE g.place_id = p.id AND g.user_modified
+    UNION ALL
+    SELECT 1 FROM public.entrance_accessibility e WHERE e.place_id = p.id AND e.user_modified
+    UNION ALL
+    SELECT 1 FROM public.restroom_accessibility r WHERE r.place_id = p.id AND r.user_modified
+  ))
\ No newline at end of file
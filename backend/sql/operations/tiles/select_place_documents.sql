@@ -0,0 +1,9 @@
+-- Copyright © 2025 Aaro Koinsaari
+-- Licensed under the Apache License, Version 2.0
+-- http://www.apache.org/licenses/LICENSE-2.0
+
+-- documents of the places of a region, as places_in_bbox returns them
+SELECT d.doc
+FROM public.place_documents d
+JOIN public.places p ON p.id = d.place_id
+WHERE p.region = %s
@@ -14,6 +14,10 @@ CREATE POLICY update_contact ON public.contact FOR ALL
   USING (current_setting('app.is_service', true) = 'true')
   WITH CHECK (current_setting('app.is_service', true) = 'true');
 
+-- written by seeding and the security definer trigger only
+ALTER TABLE public.place_documents ENABLE ROW LEVEL SECURITY;
+CREATE POLICY select_place_documents ON public.place_documents FOR SELECT USING (true);
+
 ALTER TABLE public.general_accessibility ENABLE ROW LEVEL SECURITY;
 ALTER TABLE public.entrance_accessibility ENABLE ROW LEVEL SECURITY;
 ALTER TABLE public.restroom_accessibility ENABLE ROW LEVEL SECURITY;
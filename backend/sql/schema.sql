@@ -15,9 +15,12 @@ CREATE TABLE public.places (
   lon DOUBLE PRECISION NOT NULL,
   geom GEOGRAPHY(Point, 4326),
   region VARCHAR(50) NOT NULL,
+  -- Hilbert curve key of lat, lon, set by seeding, see src/hilbert.py
+  spatial_key BIGINT,
   last_osm_update TIMESTAMP WITH TIME ZONE DEFAULT now(),
   last_user_update TIMESTAMP WITH TIME ZONE,
-  created_at TIMESTAMP WITH TIME ZONE DEFAULT now()
+  created_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT now()
 );
 
 CREATE TABLE public.general_accessibility (
@@ -25,7 +28,8 @@ CREATE TABLE public.general_accessibility (
   accessibility ACCESSIBILITY_STATUS,
   indoor_accessibility ACCESSIBILITY_STATUS,
   additional_info TEXT CHECK (char_length(additional_info) <= 1000),
-  user_modified BOOLEAN DEFAULT FALSE
+  user_modified BOOLEAN DEFAULT FALSE,
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT now()
 );
 
 CREATE TABLE public.entrance_accessibility (
@@ -37,7 +41,8 @@ CREATE TABLE public.entrance_accessibility (
   lift ACCESSIBILITY_STATUS,
   entrance_width ACCESSIBILITY_STATUS,
   door_type VARCHAR(50),
-  user_modified BOOLEAN DEFAULT FALSE
+  user_modified BOOLEAN DEFAULT FALSE,
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT now()
 );
 
 CREATE TABLE public.restroom_accessibility (
@@ -50,7 +55,8 @@ CREATE TABLE public.restroom_accessibility (
   toilet_seat ACCESSIBILITY_STATUS,
   emergency_alarm ACCESSIBILITY_STATUS,
   euro_key BOOLEAN,
-  user_modified BOOLEAN DEFAULT FALSE
+  user_modified BOOLEAN DEFAULT FALSE,
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT now()
 );
 
 CREATE TABLE public.contact (
@@ -58,10 +64,201 @@ CREATE TABLE public.contact (
   phone VARCHAR(100),
   website VARCHAR(255),
   email VARCHAR(255),
-  address VARCHAR(255)
+  address VARCHAR(255),
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT now()
+);
+
+CREATE TABLE public.replication_state (
+  region VARCHAR(50) PRIMARY KEY,
+  sequence BIGINT NOT NULL,
+  timestamp TIMESTAMP WITH TIME ZONE,
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT now()
+);
+
+CREATE TABLE public.seed_checkpoint (
+  region VARCHAR(50) PRIMARY KEY,
+  source TEXT NOT NULL,
+  places INTEGER NOT NULL,
+  chunks INTEGER NOT NULL,
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT now()
+);
+
+CREATE TABLE public.place_documents (
+  place_id UUID PRIMARY KEY REFERENCES public.places(id) ON DELETE CASCADE,
+  geom GEOGRAPHY(Point, 4326),
+  doc JSONB NOT NULL,
+  lat DOUBLE PRECISION,
+  lon DOUBLE PRECISION,
+  cell_x INTEGER,
+  cell_y INTEGER,
+  accessibility ACCESSIBILITY_STATUS
+);
+
+CREATE TABLE public.dump_state (
+  name VARCHAR(50) PRIMARY KEY,
+  dumped_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
+
+CREATE TABLE public.deleted_places (
+  id UUID NOT NULL,
+  osm_id BIGINT NOT NULL,
+  deleted_at TIMESTAMP WITH TIME ZONE DEFAULT now() NOT NULL
 );
 
 CREATE INDEX idx_places_geom ON public.places USING GIST (geom);
 CREATE INDEX idx_places_osm_id ON public.places (osm_id);
 CREATE INDEX idx_places_category ON public.places (category);
-CREATE INDEX idx_places_region ON public.places (region);
\ No newline at end of file
+CREATE INDEX idx_places_region ON public.places (region);
+CREATE INDEX idx_places_updated_at ON public.places (updated_at);
+-- places are clustered on it, see operations/cluster/cluster_places.sql
+CREATE INDEX idx_places_spatial_key ON public.places (spatial_key);
+CREATE INDEX idx_place_documents_geom ON public.place_documents USING GIST (geom);
+-- covers places_in_bbox_clustered, which reads only these columns
+CREATE INDEX idx_place_documents_cells ON public.place_documents (cell_x, cell_y) INCLUDE (lat, lon, accessibility);
+CREATE INDEX idx_deleted_places_deleted_at ON public.deleted_places (deleted_at);
+
+-- updated_at and deleted_places let dumps write only what changed since the last one
+CREATE FUNCTION public.touch_updated_at() RETURNS TRIGGER
+LANGUAGE plpgsql AS
+$$
+BEGIN
+  NEW.updated_at := now();
+  RETURN NEW;
+END;
+$$;
+
+CREATE FUNCTION public.log_deleted_place() RETURNS TRIGGER
+LANGUAGE plpgsql AS
+$$
+BEGIN
+  INSERT INTO public.deleted_places (id, osm_id) VALUES (OLD.id, OLD.osm_id);
+  RETURN OLD;
+END;
+$$;
+
+CREATE TRIGGER touch_places BEFORE UPDATE ON public.places
+  FOR EACH ROW EXECUTE FUNCTION public.touch_updated_at();
+CREATE TRIGGER touch_general_accessibility BEFORE UPDATE ON public.general_accessibility
+  FOR EACH ROW EXECUTE FUNCTION public.touch_updated_at();
+CREATE TRIGGER touch_entrance_accessibility BEFORE UPDATE ON public.entrance_accessibility
+  FOR EACH ROW EXECUTE FUNCTION public.touch_updated_at();
+CREATE TRIGGER touch_restroom_accessibility BEFORE UPDATE ON public.restroom_accessibility
+  FOR EACH ROW EXECUTE FUNCTION public.touch_updated_at();
+CREATE TRIGGER touch_contact BEFORE UPDATE ON public.contact
+  FOR EACH ROW EXECUTE FUNCTION public.touch_updated_at();
+CREATE TRIGGER log_deleted_places AFTER DELETE ON public.places
+  FOR EACH ROW EXECUTE FUNCTION public.log_deleted_place();
+
+-- the JSON places_in_bbox returns per place, kept in place_documents
+CREATE VIEW public.place_document_source AS
+SELECT
+  p.id AS place_id,
+  p.geom,
+  jsonb_build_object(
+    'id', p.id,
+    'osm_id', p.osm_id,
+    'name', p.name,
+    'category', p.category,
+    'lat', p.lat,
+    'lon', p.lon,
+    'region', p.region,
+    'last_osm_update', p.last_osm_update,
+    'last_user_update', p.last_user_update,
+    'created_at', p.created_at,
+    -- child columns are listed, bookkeeping columns such as updated_at stay out
+    'contact', CASE WHEN c.place_id IS NOT NULL THEN jsonb_build_object(
+      'phone', c.phone,
+      'website', c.website,
+      'email', c.email,
+      'address', c.address
+    ) END,
+    'generalAccessibility', CASE WHEN g.place_id IS NOT NULL THEN jsonb_build_object(
+      'accessibility', g.accessibility,
+      'indoor_accessibility', g.indoor_accessibility,
+      'additional_info', g.additional_info,
+      'user_modified', g.user_modified
+    ) END,
+    'entranceAccessibility', CASE WHEN e.place_id IS NOT NULL THEN jsonb_build_object(
+      'accessibility', e.accessibility,
+      'step_count', e.step_count,
+      'step_height', e.step_height,
+      'ramp', e.ramp,
+      'lift', e.lift,
+      'entrance_width', e.entrance_width,
+      'door_type', e.door_type,
+      'user_modified', e.user_modified
+    ) END,
+    'restroomAccessibility', CASE WHEN r.place_id IS NOT NULL THEN jsonb_build_object(
+      'accessibility', r.accessibility,
+      'door_width', r.door_width,
+      'room_maneuver', r.room_maneuver,
+      'grab_rails', r.grab_rails,
+      'sink', r.sink,
+      'toilet_seat', r.toilet_seat,
+      'emergency_alarm', r.emergency_alarm,
+      'euro_key', r.euro_key,
+      'user_modified', r.user_modified
+    ) END
+  ) AS doc,
+  p.lat,
+  p.lon,
+  -- web mercator tile of the place at zoom 20, cells of coarser zooms are
+  -- these shifted right by the zoom difference
+  LEAST(floor((p.lon + 180) / 360 * 1048576), 1048575)::integer AS cell_x,
+  LEAST(floor((1 - ln(tan(radians(LEAST(GREATEST(p.lat, -85.0511), 85.0511)))
+    + 1 / cos(radians(LEAST(GREATEST(p.lat, -85.0511), 85.0511)))) / pi()) / 2 * 1048576), 1048575)::integer AS cell_y,
+  g.accessibility,
+  -- the order seeding writes documents in
+  p.spatial_key
+FROM public.places p
+  LEFT JOIN public.contact c
+    ON c.place_id = p.id
+  LEFT JOIN public.general_accessibility g
+    ON g.place_id = p.id
+  LEFT JOIN public.entrance_accessibility e
+    ON e.place_id = p.id
+  LEFT JOIN public.restroom_accessibility r
+    ON r.place_id = p.id;
+
+-- seeding refreshes documents in bulk with inwheel.bulk_documents set, other
+-- writers such as the app go through these triggers
+CREATE FUNCTION public.refresh_place_document() RETURNS TRIGGER
+LANGUAGE plpgsql SECURITY DEFINER
+SET search_path = public
+AS
+$$
+DECLARE
+  changed_id UUID;
+BEGIN
+  IF current_setting('inwheel.bulk_documents', true) = 'on' THEN
+    RETURN NULL;
+  END IF;
+  IF TG_OP = 'DELETE' THEN
+    changed_id := OLD.place_id;
+  ELSIF TG_TABLE_NAME = 'places' THEN
+    changed_id := NEW.id;
+  ELSE
+    changed_id := NEW.place_id;
+  END IF;
+  INSERT INTO place_documents (place_id, geom, doc, lat, lon, cell_x, cell_y, accessibility)
+  SELECT place_id, geom, doc, lat, lon, cell_x, cell_y, accessibility
+  FROM place_document_source WHERE place_id = changed_id
+  ON CONFLICT (place_id) DO UPDATE SET
+    geom = EXCLUDED.geom, doc = EXCLUDED.doc, lat = EXCLUDED.lat, lon = EXCLUDED.lon,
+    cell_x = EXCLUDED.cell_x, cell_y = EXCLUDED.cell_y, accessibility = EXCLUDED.accessibility;
+  RETURN NULL;
+END;
+$$;
+
+-- a deleted place takes its document with it through the foreign key, a deleted
+-- child row leaves the document of its place to rebuild
+CREATE TRIGGER refresh_document_places AFTER INSERT OR UPDATE ON public.places
+  FOR EACH ROW EXECUTE FUNCTION public.refresh_place_document();
+CREATE TRIGGER refresh_document_general_accessibility AFTER INSERT OR UPDATE OR DELETE ON public.general_accessibility
+  FOR EACH ROW EXECUTE FUNCTION public.refresh_place_document();
+CREATE TRIGGER refresh_document_entrance_accessibility AFTER INSERT OR UPDATE OR DELETE ON public.entrance_accessibility
+  FOR EACH ROW EXECUTE FUNCTION public.refresh_place_document();
+CREATE TRIGGER refresh_document_restroom_accessibility AFTER INSERT OR UPDATE OR DELETE ON public.restroom_accessibility
+  FOR EACH ROW EXECUTE FUNCTION public.refresh_place_document();
+CREATE TRIGGER refresh_document_contact AFTER INSERT OR UPDATE OR DELETE ON public.contact
+  FOR EACH ROW EXECUTE FUNCTION public.refresh_place_document();
\ No newline at end of file
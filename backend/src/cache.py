@@ -0,0 +1,198 @@
+# Copyright © 2025 Aaro Koinsaari
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+On-disk cache of parsed places, one artifact per region, so a region can be
+seeded again without downloading and parsing its extract. The artifact holds
+the PlaceBatches of a parse in order, each one a JSON header listing its columns
+followed by every column's typed array compressed with zlib, and is read back
+one batch at a time. Nothing in it is unpickled or otherwise executed. A <region>.places.json next
+to it records the source it was parsed from (extract checksum and read
+options) and the parser version, a hash of the parsing code, so a cache is only
+used while both are unchanged.
+"""
+
+import os
+import sys
+import json
+import time
+import zlib
+import struct
+import hashlib
+from array import array
+from typing import BinaryIO, Dict, Iterable, Iterator, Optional
+
+import osmium.version
+
+from dump import atomic_output
+from place import PlaceBatch
+
+CACHE_SUFFIX = ".places"
+META_SUFFIX = ".places.json"
+# bump when the artifact layout changes
+CACHE_FORMAT = 3
+# modules whose code decides what a parse produces
+PARSER_FILES = ("place.py", "parsers.py")
+
+_LENGTH = struct.Struct("<Q")
+# a string column is stored as the UTF-8 length of every value, -1 for None,
+# followed by the values' bytes
+STRING_TYPE = "str"
+_STRING_LENGTH = "i"
+# the columns are mostly small integers and repeated strings, the fastest level
+# already shrinks them to under a third
+COMPRESS_LEVEL = 1
+
+
+def parser_version() -> str:
+    """Hash of the cache format, osmium versions and parsing code."""
+    versions = f"{CACHE_FORMAT}:{osmium.version.pyosmium_release}:{osmium.version.libosmium_version}"
+    digest = hashlib.sha256(versions.encode())
+    src_dir = os.path.dirname(os.path.abspath(__file__))
+    for name in PARSER_FILES:
+        with open(os.path.join(src_dir, name), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def cache_filename(cache_dir: str, region: str) -> str:
+    return os.path.join(cache_dir, region + CACHE_SUFFIX)
+
+
+def read_cache_meta(cache_dir: str, region: str) -> Optional[Dict]:
+    """Metadata of the cached parse of region, None if there is none or it was made by other parsing code."""
+    try:
+        with open(os.path.join(cache_dir, region + META_SUFFIX)) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get("parser") != parser_version() or not os.path.exists(cache_filename(cache_dir, region)):
+        return None
+    return meta
+
+
+def write_place_cache(
+    batches: Iterable[PlaceBatch],
+    cache_dir: str,
+    region: str,
+    source: str,
+    options: Optional[Dict] = None,
+    replication: Optional[tuple] = None
+) -> Iterator[PlaceBatch]:
+    """
+    Yield batches while writing them to the cache of region. The artifact replaces
+    the previous one only once every batch was read, a parse stopped early leaves
+    the cache as it was. options are the read options of the parse, replication
+    the (sequence, timestamp) of the extract, both kept in the metadata.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    filename = cache_filename(cache_dir, region)
+    meta_filename = os.path.join(cache_dir, region + META_SUFFIX)
+    places = count = 0
+    with atomic_output(filename) as f:
+        for batch in batches:
+            write_batch(f, batch)
+            places += len(batch)
+            count += 1
+            yield batch
+        # the old metadata must not describe the new artifact
+        if os.path.exists(meta_filename):
+            os.remove(meta_filename)
+    with atomic_output(meta_filename) as f:
+        f.write(json.dumps({
+            "region": region,
+            "source": source,
+            "parser": parser_version(),
+            "places": places,
+            "batches": count,
+            "size": os.path.getsize(filename),
+            "options": options or {},
+            "replication": replication,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        }, indent=2, default=str).encode())
+    print(f"Cached {places} places of {region} in {filename} ({os.path.getsize(filename) / 1024 / 1024:.1f} MB)")
+
+
+def read_place_cache(cache_dir: str, region: str) -> Iterator[PlaceBatch]:
+    """Yield the cached batches of region in the order they were parsed."""
+    with open(cache_filename(cache_dir, region), "rb") as f:
+        while prefix := f.read(_LENGTH.size):
+            (length,) = _LENGTH.unpack(prefix)
+            yield read_batch(f, json.loads(f.read(length)))
+
+
+def write_batch(f: BinaryIO, batch: PlaceBatch):
+    """Write the length-prefixed JSON header of batch, then its compressed columns in the order the header lists them."""
+    columns = []
+    data = []
+    for (name, field), column in batch.columns().items():
+        if isinstance(column, array):
+            kind = column.typecode
+            raw = column.tobytes()
+        else:
+            kind = STRING_TYPE
+            encoded = [None if value is None else value.encode() for value in column]
+            lengths = array(_STRING_LENGTH, (-1 if value is None else len(value) for value in encoded))
+            raw = lengths.tobytes() + b"".join(value for value in encoded if value)
+        compressed = zlib.compress(raw, COMPRESS_LEVEL)
+        columns.append({"name": name, "field": field, "type": kind, "count": len(column), "bytes": len(compressed)})
+        data.append(compressed)
+    header = json.dumps({"region": batch.region, "byteorder": sys.byteorder, "columns": columns}).encode()
+    f.write(_LENGTH.pack(len(header)))
+    f.write(header)
+    for part in data:
+        f.write(part)
+
+
+def read_batch(f: BinaryIO, header: Dict) -> PlaceBatch:
+    """Read the columns header lists into a new batch, rejecting any column PlaceBatch does not have."""
+    batch = PlaceBatch(header["region"])
+    columns = batch.columns()
+    if len(header["columns"]) != len(columns):
+        raise ValueError(f"Place cache batch has {len(header['columns'])} columns, expected {len(columns)}")
+    swap = header["byteorder"] != sys.byteorder
+    for entry in header["columns"]:
+        column = columns.get((entry["name"], entry["field"]))
+        kind = column.typecode if isinstance(column, array) else STRING_TYPE
+        if column is None or entry["type"] != kind:
+            raise ValueError(f"Unexpected column {entry['name']}.{entry['field']} ({entry['type']}) in place cache")
+        compressed = f.read(entry["bytes"])
+        if len(compressed) != entry["bytes"]:
+            raise EOFError(f"Place cache ends inside column {entry['name']}.{entry['field']}")
+        raw = zlib.decompress(compressed)
+        if isinstance(column, array):
+            column.frombytes(raw)
+            if swap:
+                column.byteswap()
+            if len(column) != entry["count"]:
+                raise ValueError(f"Place cache column {entry['name']}.{entry['field']} has {len(column)} values, expected {entry['count']}")
+            continue
+        lengths = array(_STRING_LENGTH)
+        lengths.frombytes(raw[:entry["count"] * lengths.itemsize])
+        if swap:
+            lengths.byteswap()
+        blob = memoryview(raw)[entry["count"] * lengths.itemsize:]
+        offset = 0
+        for length in lengths:
+            if length < 0:
+                column.append(None)
+            else:
+                column.append(str(blob[offset:offset + length], "utf-8"))
+                offset += length
+        if offset != len(blob):
+            raise ValueError(f"Place cache column {entry['name']}.{entry['field']} has {len(blob) - offset} bytes left over")
+        if entry["name"] == "category":
+            # parsing interns categories, a batch holds only a few distinct ones
+            column[:] = map(sys.intern, column)
+    return batch
@@ -0,0 +1,48 @@
+# Copyright © 2025 Aaro Koinsaari
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import psycopg
+
+from metrics import METRICS
+from queries import load_sql, require_columns
+
+# added to older databases by SPATIAL_KEY_MIGRATION
+SPATIAL_KEY_COLUMNS = {"places": ("spatial_key",)}
+SPATIAL_KEY_MIGRATION = "002_spatial_key.sql"
+
+
+def cluster_places(database_url: str, min_share: float = 0.0) -> bool:
+    """
+    Rewrite places and its child tables in Hilbert key order if this run refreshed
+    at least min_share of all place documents. Returns whether it did.
+    """
+    written = sum(stage.rows.get("place_documents", {}).get("refreshed", 0)
+                  for stage in METRICS.stages if stage.name == "seed")
+    with psycopg.connect(database_url) as conn:
+        with conn.cursor() as cur:
+            require_columns(cur, SPATIAL_KEY_COLUMNS, SPATIAL_KEY_MIGRATION)
+            cur.execute(load_sql("operations/cluster/count_place_documents.sql"))
+            total = cur.fetchone()[0]
+            if not total or written < min_share * total:
+                print(f"Not clustering: {written} of {total} place documents written, "
+                      f"below {min_share:.0%}")
+                return False
+            print(f"Clustering places in Hilbert key order ({written} of {total} place documents written)...")
+            with METRICS.stage("cluster") as stage:
+                cur.execute(load_sql("operations/cluster/cluster_places.sql"))
+                conn.commit()
+                stage.objects = total
+                stage.extra.update(written=written)
+            print(f"Clustered {total} places in {stage.seconds:.2f}s")
+    return True
@@ -0,0 +1,293 @@
+# Copyright © 2025 Aaro Koinsaari
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Resumable HTTP downloads of OSM extracts in parallel byte ranges, checked
+against Geofabrik's .md5 files and skipped while the ETag is unchanged.
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Optional
+
+import requests
+
+CHUNK_SIZE = 1024 * 1024
+# ranges smaller than this are not worth an extra connection
+MIN_RANGE_SIZE = 16 * 1024 * 1024
+# range progress is saved to the .part.json file after this many bytes per range
+SAVE_INTERVAL = 64 * 1024 * 1024
+META_SUFFIX = ".meta.json"
+PART_SUFFIX = ".part"
+# range progress, next to the .part file
+PART_META_SUFFIX = ".json"
+
+
+class DownloadError(Exception):
+    """A download could not be completed or did not match its checksum."""
+
+
+class DownloadResult(NamedTuple):
+    filename: str
+    # "downloaded", "resumed" or "not_modified"
+    status: str
+    size: int
+    # bytes fetched in this run, less than size when resumed
+    transferred: int
+    seconds: float
+    connections: int
+
+    @property
+    def throughput(self) -> float:
+        """Transferred MB per second."""
+        return self.transferred / 1024 / 1024 / self.seconds if self.seconds else 0.0
+
+
+def read_meta(filename: str) -> Optional[Dict]:
+    """Return the metadata stored next to a downloaded file, or None."""
+    try:
+        with open(filename + META_SUFFIX) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_meta(filename: str, meta: Dict):
+    tmp = filename + META_SUFFIX + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp, filename + META_SUFFIX)
+
+
+def conditional_headers(meta: Optional[Dict]) -> Dict[str, str]:
+    headers = {}
+    if meta and meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta and meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+    return headers
+
+
+def file_md5(filename: str) -> str:
+    md5 = hashlib.md5()
+    with open(filename, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            md5.update(chunk)
+    return md5.hexdigest()
+
+
+def fetch_md5(session: requests.Session, url: str, timeout: float) -> Optional[str]:
+    """Return the checksum from a .md5 file ("<hash>  <filename>"), or None if there is none."""
+    try:
+        r = session.get(url, timeout=timeout)
+    except requests.RequestException as e:
+        print(f"Could not fetch checksum {url}: {e}")
+        return None
+    if r.status_code != 200 or not r.text.strip():
+        return None
+    return r.text.split()[0].lower()
+
+
+class RangeDownload:
+    """
+    Writes byte ranges of one remote file into a preallocated .part file. Each range
+    is fetched by its own thread and retried from its last written byte, with
+    If-Range so a file replaced on the server in the meantime is not mixed in.
+    """
+    def __init__(self, session: requests.Session, url: str, part_filename: str, part_meta: Dict,
+                 retries: int, timeout: float):
+        self.session = session
+        self.url = url
+        self.part_filename = part_filename
+        self.part_meta = part_meta
+        self.retries = retries
+        self.timeout = timeout
+        self.lock = threading.Lock()
+
+    def save(self):
+        with self.lock:
+            with open(self.part_filename + PART_META_SUFFIX, "w") as f:
+                json.dump(self.part_meta, f)
+
+    def fetch_range(self, fd: int, index: int):
+        # [start, end, next byte to write], end inclusive
+        byte_range = self.part_meta["ranges"][index]
+        # If-Range only accepts strong ETags
+        etag = self.part_meta.get("etag")
+        validator = etag if etag and not etag.startswith("W/") else self.part_meta.get("last_modified")
+        failures = 0
+        unsaved = 0
+        while byte_range[2] <= byte_range[1]:
+            position = byte_range[2]
+            headers = {"Range": f"bytes={byte_range[2]}-{byte_range[1]}"}
+            if validator:
+                headers["If-Range"] = validator
+            try:
+                with self.session.get(self.url, headers=headers, stream=True, timeout=self.timeout) as r:
+                    if r.status_code != 206:
+                        raise DownloadError(f"{self.url} answered a range request with {r.status_code}, "
+                                            "the file probably changed on the server")
+                    for chunk in r.iter_content(CHUNK_SIZE):
+                        chunk = chunk[:byte_range[1] - byte_range[2] + 1]
+                        os.pwrite(fd, chunk, byte_range[2])
+                        byte_range[2] += len(chunk)
+                        unsaved += len(chunk)
+                        if unsaved >= SAVE_INTERVAL:
+                            self.save()
+                            unsaved = 0
+                        if byte_range[2] > byte_range[1]:
+                            break
+                if byte_range[2] <= byte_range[1]:
+                    raise requests.ConnectionError("connection closed before the end of the range")
+            except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+                # only count attempts that made no progress at all
+                failures = 1 if byte_range[2] > position else failures + 1
+                if failures > self.retries:
+                    raise DownloadError(f"Giving up on {self.url} after {self.retries} retries: {e}") from e
+                delay = min(2 ** failures, 60)
+                print(f"Range {byte_range[0]}-{byte_range[1]} interrupted at byte {byte_range[2]} ({e}), "
+                      f"retrying in {delay}s")
+                time.sleep(delay)
+
+    def run(self) -> int:
+        """Fetch all unfinished ranges and return the number of connections used."""
+        pending = [i for i, (_, end, position) in enumerate(self.part_meta["ranges"]) if position <= end]
+        fd = os.open(self.part_filename, os.O_RDWR | os.O_CREAT)
+        try:
+            os.ftruncate(fd, self.part_meta["size"])
+            with ThreadPoolExecutor(max_workers=max(len(pending), 1)) as pool:
+                for future in [pool.submit(self.fetch_range, fd, i) for i in pending]:
+                    future.result()
+        finally:
+            os.close(fd)
+            self.save()
+        return len(pending)
+
+
+def split_ranges(size: int, connections: int) -> List[List[int]]:
+    count = max(1, min(connections, size // MIN_RANGE_SIZE))
+    step = -(-size // count)
+    return [[start, min(start + step, size) - 1, start] for start in range(0, size, step)]
+
+
+def load_part_meta(part_filename: str, url: str, size: int, etag: Optional[str],
+                   last_modified: Optional[str]) -> Optional[Dict]:
+    """Return saved range progress if it belongs to the same version of the same file."""
+    if not os.path.exists(part_filename):
+        return None
+    try:
+        with open(part_filename + PART_META_SUFFIX) as f:
+            part_meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    same = (part_meta.get("url") == url and part_meta.get("size") == size
+            and part_meta.get("etag") == etag and part_meta.get("last_modified") == last_modified)
+    return part_meta if same else None
+
+
+def stream_download(session: requests.Session, url: str, part_filename: str, retries: int, timeout: float):
+    """Plain sequential download for servers without range support, restarted on failure."""
+    for attempt in range(retries + 1):
+        try:
+            with session.get(url, stream=True, timeout=timeout) as r:
+                r.raise_for_status()
+                with open(part_filename, "wb") as f:
+                    for chunk in r.iter_content(CHUNK_SIZE):
+                        f.write(chunk)
+            return
+        except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+            if attempt == retries:
+                raise DownloadError(f"Giving up on {url} after {retries} retries: {e}") from e
+            delay = min(2 ** (attempt + 1), 60)
+            print(f"Download of {url} interrupted ({e}), restarting in {delay}s")
+            time.sleep(delay)
+
+
+def download(
+    url: str,
+    filename: str,
+    connections: int = 4,
+    conditional: bool = True,
+    verify: bool = True,
+    retries: int = 5,
+    timeout: float = 60
+) -> DownloadResult:
+    """
+    Download url to filename over up to connections range requests, or return
+    status "not_modified" if conditional and unchanged. Raises DownloadError.
+    """
+    start = time.perf_counter()
+    meta = read_meta(filename) if conditional else None
+    part_filename = filename + PART_SUFFIX
+
+    with requests.Session() as session:
+        r = session.head(url, headers=conditional_headers(meta), allow_redirects=True, timeout=timeout)
+        if r.status_code == 304:
+            return DownloadResult(filename, "not_modified", 0, 0, time.perf_counter() - start, 0)
+        r.raise_for_status()
+
+        etag = r.headers.get("ETag")
+        last_modified = r.headers.get("Last-Modified")
+        if meta and etag and meta.get("etag") == etag:
+            # server ignored the conditional headers but reports the same version
+            return DownloadResult(filename, "not_modified", 0, 0, time.perf_counter() - start, 0)
+
+        size = int(r.headers["Content-Length"]) if "Content-Length" in r.headers else None
+        status = "downloaded"
+        done = 0
+        if size and r.headers.get("Accept-Ranges") == "bytes":
+            part_meta = load_part_meta(part_filename, r.url, size, etag, last_modified)
+            if part_meta:
+                status = "resumed"
+                done = sum(position - first for first, _, position in part_meta["ranges"])
+                print(f"Resuming {url} at {done / size:.0%}")
+            else:
+                part_meta = {
+                    "url": r.url, "size": size, "etag": etag, "last_modified": last_modified,
+                    "ranges": split_ranges(size, connections)
+                }
+                if os.path.exists(part_filename):
+                    os.remove(part_filename)
+            used = RangeDownload(session, r.url, part_filename, part_meta, retries, timeout).run()
+        else:
+            stream_download(session, url, part_filename, retries, timeout)
+            used = 1
+        size = os.path.getsize(part_filename)
+        transferred = size - done
+
+        md5 = None
+        if verify:
+            expected = fetch_md5(session, url + ".md5", timeout)
+            if expected:
+                md5 = file_md5(part_filename)
+                if md5 != expected:
+                    os.remove(part_filename)
+                    if os.path.exists(part_filename + PART_META_SUFFIX):
+                        os.remove(part_filename + PART_META_SUFFIX)
+                    raise DownloadError(f"Checksum mismatch for {url}: expected {expected}, got {md5}")
+            else:
+                print(f"No checksum published for {url}, skipping verification")
+
+    os.replace(part_filename, filename)
+    if os.path.exists(part_filename + PART_META_SUFFIX):
+        os.remove(part_filename + PART_META_SUFFIX)
+    write_meta(filename, {
+        "url": url, "etag": etag, "last_modified": last_modified, "size": size, "md5": md5,
+        "downloaded_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    })
+    return DownloadResult(filename, status, size, transferred, time.perf_counter() - start, used)
@@ -0,0 +1,301 @@
+# Copyright © 2025 Aaro Koinsaari
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Table dumps: CSV streamed straight from COPY TO STDOUT, optionally gzip or zstd
+compressed, or Parquet built from a server-side cursor. Files are written under
+a temporary name and only replace the previous dump once complete. zstandard
+and pyarrow are only needed for the formats that use them.
+"""
+
+import os
+import gzip
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from typing import BinaryIO, Dict, Iterator, List, NamedTuple
+
+import psycopg
+
+from queries import load_sql, require_columns
+
+DUMP_FORMATS = ("csv", "parquet")
+COMPRESSIONS = ("none", "gzip", "zstd")
+CSV_EXTENSIONS = {"none": ".csv", "gzip": ".csv.gz", "zstd": ".csv.zst"}
+
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 10
+# rows fetched from the server-side cursor per Parquet row group
+PARQUET_BATCH_ROWS = 50000
+
+# postgres type oids with a matching arrow type, everything else is written as text
+PARQUET_TYPES = {
+    16: "bool_",
+    20: "int64",
+    21: "int16",
+    23: "int32",
+    700: "float32",
+    701: "float64",
+    1114: "timestamp",
+    1184: "timestamptz",
+}
+
+
+class DumpResult(NamedTuple):
+    name: str
+    filename: str
+    rows: int
+    size: int
+    seconds: float
+
+
+def dump_filename(name: str, dump_format: str, compression: str) -> str:
+    if dump_format == "parquet":
+        return f"{name}.parquet"
+    return f"{name}{CSV_EXTENSIONS[compression]}"
+
+
+@contextmanager
+def atomic_output(filename: str) -> Iterator[BinaryIO]:
+    """Binary file written as filename.tmp and moved into place when the block succeeds."""
+    tmp = filename + ".tmp"
+    try:
+        with open(tmp, "wb") as f:
+            yield f
+        os.replace(tmp, filename)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+@contextmanager
+def compressed(f: BinaryIO, compression: str) -> Iterator[BinaryIO]:
+    if compression == "none":
+        yield f
+    elif compression == "gzip":
+        # a fixed mtime keeps unchanged dumps byte-identical
+        with gzip.GzipFile(fileobj=f, mode="wb", compresslevel=GZIP_LEVEL, mtime=0) as gz:
+            yield gz
+    elif compression == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError("zstd compression needs the zstandard package: pip install zstandard")
+        with zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(f, closefd=False) as zst:
+            yield zst
+    else:
+        raise ValueError(f"Unknown compression: {compression}")
+
+
+def write_csv(cur: psycopg.Cursor, copy_query: str, params: Dict, filename: str, compression: str) -> int:
+    """Stream the output of a COPY ... TO STDOUT query into filename, return the row count."""
+    with atomic_output(filename) as f, compressed(f, compression) as out:
+        with cur.copy(copy_query, params) as copy:
+            for data in copy:
+                out.write(data)
+    return cur.rowcount
+
+
+def write_parquet(cur: psycopg.Cursor, query: str, params: Dict, filename: str, compression: str) -> int:
+    """Write the result of query to a Parquet file, one row group per PARQUET_BATCH_ROWS rows."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet dumps need the pyarrow package: pip install pyarrow")
+
+    types = {
+        "timestamp": pa.timestamp("us"),
+        "timestamptz": pa.timestamp("us", tz="UTC"),
+    }
+    cur.execute(query, params)
+    columns = [column.name for column in cur.description]
+    fields = []
+    as_text = []
+    for i, column in enumerate(cur.description):
+        arrow_type = PARQUET_TYPES.get(column.type_code)
+        if arrow_type is None:
+            # uuid, enums, varchar and geography (as hex EWKB) end up as strings
+            as_text.append(i)
+            fields.append(pa.field(column.name, pa.string()))
+        else:
+            fields.append(pa.field(column.name, types.get(arrow_type) or getattr(pa, arrow_type)()))
+    schema = pa.schema(fields)
+
+    rows = 0
+    with atomic_output(filename) as f:
+        with pq.ParquetWriter(f, schema, compression="NONE" if compression == "none" else compression) as writer:
+            while batch := cur.fetchmany(PARQUET_BATCH_ROWS):
+                values = [list(column) for column in zip(*batch)]
+                for i in as_text:
+                    values[i] = [None if v is None else str(v) for v in values[i]]
+                writer.write_table(pa.Table.from_arrays(
+                    [pa.array(v, type=field.type) for v, field in zip(values, fields)], names=columns
+                ))
+                rows += len(batch)
+            if not rows:
+                writer.write_table(schema.empty_table())
+    return rows
+
+
+def dump_query(
+    conn: psycopg.Connection,
+    name: str,
+    query: str,
+    copy_query: str,
+    params: Dict,
+    out_dir: str,
+    dump_format: str = "csv",
+    compression: str = "none"
+) -> DumpResult:
+    """
+    Dump the rows of query into out_dir as name plus the extension of the format.
+    copy_query is the same query wrapped in COPY ... TO STDOUT for CSV output.
+    """
+    start = time.perf_counter()
+    filename = os.path.join(out_dir, dump_filename(name, dump_format, compression))
+    if dump_format == "parquet":
+        # a named cursor fetches in batches instead of loading the whole table
+        with conn.cursor(name=f"dump_{name.replace('.', '_')}") as cur:
+            rows = write_parquet(cur, query, params, filename, compression)
+    else:
+        with conn.cursor() as cur:
+            rows = write_csv(cur, copy_query, params, filename, compression)
+    return DumpResult(name, filename, rows, os.path.getsize(filename), time.perf_counter() - start)
+
+
+def remove_stale(out_dir: str, name: str, keep: str):
+    """Remove dumps of name in the format of keep with another compression, so they are not taken for current."""
+    dump_format = "parquet" if keep.endswith(".parquet") else "csv"
+    for compression in COMPRESSIONS:
+        path = os.path.join(out_dir, dump_filename(name, dump_format, compression))
+        if path != keep and os.path.exists(path):
+            os.remove(path)
+
+
+# dumped table -> key its rows are ordered by
+DUMP_TABLES = {
+    "places": "id",
+    "general_accessibility": "place_id",
+    "entrance_accessibility": "place_id",
+    "restroom_accessibility": "place_id",
+    "contact": "place_id",
+}
+# dump_state row of the dumps written to data/
+DUMP_NAME = "data"
+# summary of the last dump, next to its files
+DUMP_INDEX = "dump.json"
+# columns incremental dumps read, added to older databases by DUMP_MIGRATION
+DUMP_COLUMNS = dict({table: ("updated_at",) for table in DUMP_TABLES},
+                    dump_state=("name", "dumped_at"), deleted_places=("id", "osm_id", "deleted_at"))
+DUMP_MIGRATION = "001_dump_tracking.sql"
+
+
+def dump_table(
+    database_url: str,
+    out_dir: str,
+    snapshot: str,
+    name: str,
+    query: str,
+    params: Dict,
+    dump_format: str,
+    compression: str
+) -> DumpResult:
+    """Dump one query on its own connection, reading from the exported snapshot."""
+    with psycopg.connect(database_url) as conn:
+        conn.isolation_level = psycopg.IsolationLevel.REPEATABLE_READ
+        conn.read_only = True
+        conn.execute(load_sql("operations/dump/set_snapshot.sql", snapshot=snapshot))
+        result = dump_query(
+            conn, name, query, load_sql("operations/dump/copy_csv.sql", query=query), params,
+            out_dir, dump_format, compression
+        )
+    print(f"Dumped {result.rows} rows of {name} → {result.filename} "
+          f"({result.size / 1024 / 1024:.1f} MB, {result.seconds:.2f}s)")
+    return result
+
+
+def dump_tables(
+    database_url: str,
+    out_dir: str,
+    dump_format: str = "csv",
+    compression: str = "none",
+    incremental: bool = False,
+    jobs: int = len(DUMP_TABLES)
+) -> List[DumpResult]:
+    """
+    Dump DUMP_TABLES to out_dir from one snapshot, up to jobs tables at a time.
+    Incremental dumps hold the changes since the dump last recorded by record_dump.
+    """
+    start = time.perf_counter()
+    with psycopg.connect(database_url) as conn:
+        require_columns(conn, DUMP_COLUMNS, DUMP_MIGRATION)
+        since = None
+        if incremental:
+            row = conn.execute(load_sql("operations/dump/select_dump_state.sql"), (DUMP_NAME,)).fetchone()
+            since = row[0] if row else None
+            if since is None:
+                print("No earlier dump recorded, writing a full dump")
+        conn.commit()
+
+        # the snapshot stays valid while this transaction is open
+        conn.isolation_level = psycopg.IsolationLevel.REPEATABLE_READ
+        conn.read_only = True
+        snapshot, dumped_at = conn.execute(load_sql("operations/dump/export_snapshot.sql")).fetchone()
+
+        queries = []
+        for table, key in DUMP_TABLES.items():
+            name = f"{table}.changes" if since else table
+            queries.append((name, load_sql("operations/dump/select_rows.sql", table=table, key=key)))
+        if since:
+            queries.append(("places.deleted", load_sql("operations/dump/select_deleted.sql")))
+
+        with ThreadPoolExecutor(max_workers=max(1, min(jobs, len(queries)))) as pool:
+            futures = [
+                pool.submit(dump_table, database_url, out_dir, snapshot, name, query, {"since": since}, dump_format, compression)
+                for name, query in queries
+            ]
+            results = [future.result() for future in futures]
+        conn.rollback()
+
+    for result in results:
+        remove_stale(out_dir, result.name, keep=result.filename)
+    with open(os.path.join(out_dir, DUMP_INDEX), "w") as f:
+        json.dump({
+            "dumped_at": dumped_at.isoformat(),
+            "since": since.isoformat() if since else None,
+            "format": dump_format,
+            "compression": compression,
+            "files": [
+                {"name": r.name, "file": os.path.basename(r.filename), "rows": r.rows, "size": r.size}
+                for r in results
+            ],
+        }, f, indent=2)
+    total = sum(r.size for r in results)
+    print(f"Dumped {len(results)} files, {total / 1024 / 1024:.1f} MB in {time.perf_counter() - start:.2f}s")
+    return results
+
+
+def record_dump(database_url: str, out_dir: str) -> datetime:
+    """Record the dump in out_dir/dump.json as the base of the next incremental dump."""
+    with open(os.path.join(out_dir, DUMP_INDEX)) as f:
+        dumped_at = datetime.fromisoformat(json.load(f)["dumped_at"])
+    with psycopg.connect(database_url) as conn:
+        require_columns(conn, DUMP_COLUMNS, DUMP_MIGRATION)
+        conn.execute(load_sql("operations/dump/record_dump.sql"), (DUMP_NAME, dumped_at))
+        conn.execute(load_sql("operations/dump/prune_deleted_places.sql"), (dumped_at,))
+    print(f"Recorded the dump of {dumped_at.isoformat()} as published")
+    return dumped_at
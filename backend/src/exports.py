@@ -0,0 +1,77 @@
+# Copyright © 2025 Aaro Koinsaari
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Exports of the seeded places for the app: static tiles and SQLite snapshots."""
+
+from typing import List
+
+import psycopg
+
+from metrics import METRICS
+from queries import load_sql
+from sqlite_export import SnapshotStats, write_region_snapshot
+from tiles import TILE_SIZE_DEGREES, TileStats, write_region_tiles
+
+
+def export_tiles(
+    database_url: str,
+    region_names: List[str],
+    out_dir: str,
+    tile_size: float = TILE_SIZE_DEGREES,
+    compression: str = "gzip"
+) -> List[TileStats]:
+    """Write the static place tiles of each region to out_dir/<region>/, see tiles.py."""
+    results = []
+    with psycopg.connect(database_url) as conn:
+        for region_name in region_names:
+            # named cursor, documents are streamed instead of fetched at once
+            with METRICS.stage("tiles", region_name) as stage, conn.cursor(name="tile_documents") as cur:
+                cur.execute(load_sql("operations/tiles/select_place_documents.sql"), (region_name,))
+                stats = write_region_tiles(region_name, (row[0] for row in cur), out_dir, tile_size, compression)
+                stage.objects = stats.places
+                stage.extra.update(tiles=stats.tiles, written=stats.written, unchanged=stats.unchanged,
+                                   removed=stats.removed)
+            print(f"Tiles of {region_name}: {stats.places} places in {stats.tiles} tiles, {stats.written} written, "
+                  f"{stats.unchanged} unchanged, {stats.removed} removed ({stats.seconds:.2f}s)")
+            results.append(stats)
+    return results
+
+
+def export_sqlite(
+    database_url: str,
+    region_names: List[str],
+    out_dir: str,
+    keep_patches: int = 4
+) -> List[SnapshotStats]:
+    """Write the SQLite snapshot of each region for the app's Room cache to out_dir, see sqlite_export.py."""
+    results = []
+    schema = load_sql("operations/sqlite/create_room_snapshot.sql")
+    with psycopg.connect(database_url) as conn:
+        for region_name in region_names:
+            with METRICS.stage("sqlite", region_name) as stage, conn.cursor(name="room_places") as cur:
+                cur.execute(load_sql("operations/sqlite/select_room_places.sql"), (region_name,))
+                stats = write_region_snapshot(region_name, cur, out_dir, schema, keep_patches)
+                stage.objects = stats.places
+                stage.bytes = stats.size
+                stage.extra.update(version=stats.version, changed=stats.changed, deleted=stats.deleted,
+                                   patch_size=stats.patch_size)
+            if stats.changed or stats.deleted:
+                print(f"SQLite snapshot of {region_name}: version {stats.version}, {stats.places} places, "
+                      f"{stats.changed} changed, {stats.deleted} deleted, {stats.size / 1024 / 1024:.1f} MB"
+                      + (f", patch {stats.patch_size / 1024:.0f} kB" if stats.patch_size else "")
+                      + f" ({stats.seconds:.2f}s)")
+            else:
+                print(f"SQLite snapshot of {region_name}: unchanged at version {stats.version} ({stats.seconds:.2f}s)")
+            results.append(stats)
+    return results
@@ -0,0 +1,216 @@
+# Copyright © 2025 Aaro Koinsaari
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Duration, throughput, rows and peak memory of each stage of an update run,
+collected in METRICS and written as a JSON run report.
+"""
+
+import os
+import sys
+import json
+import time
+import cProfile
+import resource
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+# ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+_MAXRSS_UNIT = 1 if sys.platform == "darwin" else 1024
+# allocation sites listed per stage with tracemalloc
+TOP_ALLOCATIONS = 5
+
+
+def _read_hwm() -> Optional[int]:
+    """Peak RSS of this process in bytes since the last reset, None without /proc."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def _reset_hwm() -> bool:
+    """Reset the peak RSS of this process, which Linux allows through /proc/self/clear_refs."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def max_rss(children: bool = False) -> int:
+    """Peak RSS in bytes of this process, or of its largest finished child process."""
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+    return usage.ru_maxrss * _MAXRSS_UNIT
+
+
+class Stage:
+    """One timed stage. Fields are filled in by the code running the stage."""
+    def __init__(self, name: str, region: Optional[str] = None):
+        self.name = name
+        self.region = region
+        self.seconds = 0.0
+        self.bytes: Optional[int] = None
+        self.objects: Optional[int] = None
+        self.rows: Dict[str, Dict[str, int]] = {}
+        self.peak_rss: Optional[int] = None
+        self.python_peak: Optional[int] = None
+        self.allocations: List[Dict] = []
+        self.extra: Dict = {}
+
+    def as_dict(self) -> Dict:
+        result = {"name": self.name, "region": self.region, "seconds": round(self.seconds, 3)}
+        if self.bytes is not None:
+            result["bytes"] = self.bytes
+            result["mb_per_s"] = round(self.bytes / 1024 / 1024 / self.seconds, 2) if self.seconds > 0 else None
+        if self.objects is not None:
+            result["objects"] = self.objects
+            result["objects_per_s"] = round(self.objects / self.seconds, 1) if self.seconds > 0 else None
+        if self.rows:
+            result["rows"] = self.rows
+        if self.peak_rss is not None:
+            result["peak_rss_mb"] = round(self.peak_rss / 1024 / 1024, 1)
+        if self.python_peak is not None:
+            result["python_peak_mb"] = round(self.python_peak / 1024 / 1024, 1)
+        if self.allocations:
+            result["python_allocations"] = self.allocations
+        result.update(self.extra)
+        return result
+
+
+class Metrics:
+    """Stages of one run in the order they finished."""
+    def __init__(self):
+        self.stages: List[Stage] = []
+        self.started = time.time()
+        # stages that are running, outer ones first
+        self._open: List[Stage] = []
+        self._per_stage_rss = _read_hwm() is not None and _reset_hwm()
+
+    def _fold_peak(self):
+        """Carry the current high-water mark into every open stage before it is reset."""
+        if not self._per_stage_rss:
+            return
+        hwm = _read_hwm()
+        for stage in self._open:
+            stage.peak_rss = max(stage.peak_rss or 0, hwm)
+
+    @contextmanager
+    def stage(self, name: str, region: Optional[str] = None) -> Iterator[Stage]:
+        """Time the block as a stage, recorded also when the block fails."""
+        stage = Stage(name, region)
+        self._fold_peak()
+        if self._per_stage_rss:
+            _reset_hwm()
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            # the peak of an outer stage is lost here, nested stages only keep their own
+            tracemalloc.reset_peak()
+        self._open.append(stage)
+        start = time.perf_counter()
+        try:
+            yield stage
+        except BaseException as e:
+            stage.extra["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            stage.seconds = time.perf_counter() - start
+            self._fold_peak()
+            self._open.remove(stage)
+            if not self._per_stage_rss:
+                stage.peak_rss = max_rss()
+            if tracing:
+                stage.python_peak = tracemalloc.get_traced_memory()[1]
+                stage.allocations = top_allocations(TOP_ALLOCATIONS)
+            self.stages.append(stage)
+
+    def timed(self, items: Iterable[T], stage: Stage) -> Iterator[T]:
+        """Yield from items, adding the time spent producing each one to stage."""
+        iterator = iter(items)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                stage.seconds += time.perf_counter() - start
+                return
+            stage.seconds += time.perf_counter() - start
+            yield item
+
+    def record(self, stage: Stage):
+        """Add a stage timed elsewhere, such as in a worker process."""
+        self.stages.append(stage)
+
+    def report(self, **info) -> Dict:
+        """The run as a JSON-serializable dict, with info added at the top level."""
+        finished = time.time()
+        result = {
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(self.started)),
+            "finished_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(finished)),
+            "seconds": round(finished - self.started, 3),
+            # resetting the high-water mark for each stage resets ru_maxrss as well
+            "peak_rss_mb": round(max([max_rss()] + [s.peak_rss or 0 for s in self.stages]) / 1024 / 1024, 1),
+            "peak_rss_children_mb": round(max_rss(children=True) / 1024 / 1024, 1),
+        }
+        result.update(info)
+        result["stages"] = [stage.as_dict() for stage in self.stages]
+        return result
+
+    def write_report(self, filename: str, **info):
+        os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+        with open(filename, "w") as f:
+            json.dump(self.report(**info), f, indent=2, default=str)
+        print(f"Run report written to {filename}")
+
+    def print_summary(self):
+        print("Stages:")
+        for stage in self.stages:
+            line = f"  {stage.name}"
+            if stage.region:
+                line += f" ({stage.region})"
+            line += f": {stage.seconds:.2f}s"
+            if stage.objects is not None and stage.seconds > 0:
+                line += f", {stage.objects} objects ({stage.objects / stage.seconds:.1f}/s)"
+            if stage.bytes is not None:
+                line += f", {stage.bytes / 1024 / 1024:.1f} MB"
+            if stage.peak_rss is not None:
+                line += f", peak RSS {stage.peak_rss / 1024 / 1024:.0f} MB"
+            print(line)
+
+
+def top_allocations(limit: int = TOP_ALLOCATIONS) -> List[Dict]:
+    """Largest live Python allocations by source line, while tracemalloc is tracing."""
+    if not tracemalloc.is_tracing():
+        return []
+    snapshot = tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, cProfile.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+    ])
+    return [
+        {"location": str(stat.traceback[0]), "size_mb": round(stat.size / 1024 / 1024, 2), "count": stat.count}
+        for stat in snapshot.statistics("lineno")[:limit]
+    ]
+
+
+# metrics of the running process, worker processes hand their stages back to be recorded
+METRICS = Metrics()
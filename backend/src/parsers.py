@@ -14,7 +14,8 @@
 
 import re
 from enum import Enum
-from typing import Optional, Dict, Tuple
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple
 
 
 class AccessibilityStatus(Enum):
@@ -24,6 +25,24 @@ class AccessibilityStatus(Enum):
     NOT_ACCESSIBLE = "NOT_ACCESSIBLE"
 
 
+# plain str constants of the statuses, so parsers return the same interned objects
+# instead of going through the enum on every call
+FULLY_ACCESSIBLE = AccessibilityStatus.FULLY_ACCESSIBLE.value
+PARTIALLY_ACCESSIBLE = AccessibilityStatus.PARTIALLY_ACCESSIBLE.value
+NOT_ACCESSIBLE = AccessibilityStatus.NOT_ACCESSIBLE.value
+
+_WHITESPACE_RE = re.compile(r'\s+')
+_DECIMAL_RE = re.compile(r'\d+[.,]\d+')
+_INTEGER_RE = re.compile(r'^\D*(\d+)\D*$')
+_YES_VALUES = frozenset(("yes", "wheelchair", "designated"))
+
+# OSM tag values repeat heavily ("yes", "no", "2", "80 cm"...), so the value parsers
+# below are memoized. Each function keeps at most PARSE_CACHE_SIZE distinct inputs
+# and evicts the least recently used ones beyond that.
+PARSE_CACHE_SIZE = 4096
+_parse_cache = lru_cache(maxsize=PARSE_CACHE_SIZE)
+
+
 # word -> number dictionary for some common languages in OSM
 _NUMBER_WORDS: Dict[str, int] = {
     **dict.fromkeys(("zero", "nul", "null", "zéro"), 0),
@@ -33,11 +52,12 @@ _NUMBER_WORDS: Dict[str, int] = {
 }
 
 
+@_parse_cache
 def normalize(val: Optional[str]) -> Optional[str]:
     """Trim, lowercase, remove whitespace."""
     if not val:
         return None
-    return re.sub(r'\s+', ' ', val.strip().lower())
+    return _WHITESPACE_RE.sub(' ', val.strip().lower())
 
 
 def is_simple_token(val: str) -> bool:
@@ -51,6 +71,7 @@ def parse_number_word(val: str) -> Optional[int]:
     return _NUMBER_WORDS.get(val)
 
 
+@_parse_cache
 def extract_integer(val: str) -> Optional[int]:
     """
     Extracts a plain integer from:
@@ -64,7 +85,7 @@ def extract_integer(val: str) -> Optional[int]:
         return None
 
     # reject decimals
-    if re.search(r'\d+[.,]\d+', val):
+    if _DECIMAL_RE.search(val):
         return None
 
     # try word→number
@@ -74,7 +95,7 @@ def extract_integer(val: str) -> Optional[int]:
 
     # try pulling digits
     try:
-        m = re.match(r'^\D*(\d+)\D*$', val)
+        m = _INTEGER_RE.match(val)
         if m:
             return int(m.group(1))
     except (ValueError, TypeError):
@@ -83,6 +104,7 @@ def extract_integer(val: str) -> Optional[int]:
     return None
 
 
+@_parse_cache
 def parse_meters(value: Optional[str]) -> Optional[float]:
     """Convert various text measurements to meters."""
     v = normalize(value)
@@ -109,38 +131,41 @@ def parse_meters(value: Optional[str]) -> Optional[float]:
 def parse_step_count(count: int) -> str:
     """Map count to an AccessibilityStatus value."""
     if count == 0:
-        return AccessibilityStatus.FULLY_ACCESSIBLE.value
+        return FULLY_ACCESSIBLE
     if count == 1:
-        return AccessibilityStatus.PARTIALLY_ACCESSIBLE.value
-    return AccessibilityStatus.NOT_ACCESSIBLE.value
+        return PARTIALLY_ACCESSIBLE
+    return NOT_ACCESSIBLE
 
 
+@_parse_cache
 def parse_yes_no(value: Optional[str]) -> Optional[str]:
     """Parse common yes/no/limited accessibility indicators."""
     v = normalize(value)
     if not v:
         return None
-    if v in {"yes", "wheelchair", "designated"}:
-        return AccessibilityStatus.FULLY_ACCESSIBLE.value
+    if v in _YES_VALUES:
+        return FULLY_ACCESSIBLE
     if v == "limited":
-        return AccessibilityStatus.PARTIALLY_ACCESSIBLE.value
+        return PARTIALLY_ACCESSIBLE
     if v == "no":
-        return AccessibilityStatus.NOT_ACCESSIBLE.value
+        return NOT_ACCESSIBLE
     return None
 
 
+@_parse_cache
 def parse_width(value: Optional[str]) -> Optional[str]:
     """Convert width measurements to accessibility status."""
     m = parse_meters(value)
     if m is None:
         return None
     if m == 0:
-        return AccessibilityStatus.FULLY_ACCESSIBLE.value
+        return FULLY_ACCESSIBLE
     if m <= 0.7:
-        return AccessibilityStatus.PARTIALLY_ACCESSIBLE.value
-    return AccessibilityStatus.NOT_ACCESSIBLE.value
+        return PARTIALLY_ACCESSIBLE
+    return NOT_ACCESSIBLE
 
 
+@_parse_cache
 def parse_count(value: Optional[str]) -> Optional[str]:
     """Parse step counts into accessibility rating."""
     v = normalize(value)
@@ -152,28 +177,57 @@ def parse_count(value: Optional[str]) -> Optional[str]:
     return parse_step_count(count)
 
 
+@_parse_cache
 def parse_step_height(value: Optional[str]) -> Optional[str]:
     """Convert step height measurements to accessibility status."""
     height = parse_meters(value)
     if height is None:
         return None
     if height == 0:
-        return AccessibilityStatus.FULLY_ACCESSIBLE.value
+        return FULLY_ACCESSIBLE
     elif height <= 0.03:  # 3 cm threshold for "small step"
-        return AccessibilityStatus.PARTIALLY_ACCESSIBLE.value
+        return PARTIALLY_ACCESSIBLE
     else:
-        return AccessibilityStatus.NOT_ACCESSIBLE.value
+        return NOT_ACCESSIBLE
 
 
+@_parse_cache
 def parse_restroom_maneuver(front: Optional[str], side: Optional[str]) -> Optional[str]:
     """Evaluate restroom maneuverability from front and side space."""
     f = parse_meters(front)
     s = parse_meters(side)
     if f is None or s is None:
         return None
-    return (AccessibilityStatus.FULLY_ACCESSIBLE.value
+    return (FULLY_ACCESSIBLE
             if f >= 1.5 and s >= 1.5
-            else AccessibilityStatus.NOT_ACCESSIBLE.value)
+            else NOT_ACCESSIBLE)
+
+
+CACHED_PARSERS = (
+    normalize, extract_integer, parse_meters, parse_yes_no, parse_width,
+    parse_count, parse_step_height, parse_restroom_maneuver
+)
+
+
+def parse_cache_info() -> Dict[str, Dict[str, float]]:
+    """Return hits, misses, size and hit rate of each memoized parser."""
+    info = {}
+    for fn in CACHED_PARSERS:
+        ci = fn.cache_info()
+        calls = ci.hits + ci.misses
+        info[fn.__name__] = {
+            "hits": ci.hits,
+            "misses": ci.misses,
+            "size": ci.currsize,
+            "hit_rate": ci.hits / calls if calls else 0.0,
+        }
+    return info
+
+
+def clear_parse_cache():
+    """Empty the caches of all memoized parsers and reset their statistics."""
+    for fn in CACHED_PARSERS:
+        fn.cache_clear()
 
 
 def format_address(tags: Dict[str, str]) -> Optional[str]:
@@ -224,3 +278,81 @@ def parse_accessibility_info(tags: Dict[str, str]) -> Tuple[Dict, Dict, Dict]:
     }
     
     return general, entrance, restroom
+
+
+# every tag read by parse_accessibility_info, i.e. the raw columns parse_accessibility_columns needs
+ACCESSIBILITY_TAGS = (
+    "wheelchair", "wheelchair:turning_circle", "wheelchair:description",
+    "entrance:step_count", "entrance:steps", "entrance:kerb:height",
+    "entrance:ramp", "ramp", "wheelchair:ramp",
+    "door:width", "entrance:width", "entrance:automatic_door", "entrance:door",
+    "toilets:wheelchair:door_width", "toilets:wheelchair:space_front", "toilets:wheelchair:space_side",
+    "centralkey",
+)
+
+
+def _map_unique(fn: Callable, values: List) -> List:
+    """Apply fn once per distinct value and spread the results back over values."""
+    results = {value: fn(value) for value in set(values)}
+    if len(results) == 1:
+        # typical for tags no node in the batch has
+        return [next(iter(results.values()))] * len(values)
+    return [results[value] for value in values]
+
+
+def _coalesce(*columns: List[Optional[str]]) -> List[Optional[str]]:
+    """Column-wise `a or b or ...`, the batch form of chained tags.get fallbacks."""
+    if len(columns) == 1:
+        return columns[0]
+    return [next((v for v in row if v), row[-1]) for row in zip(*columns)]
+
+
+def parse_accessibility_columns(
+    columns: Dict[str, List[Optional[str]]], count: int
+) -> Tuple[Dict[str, List], Dict[str, List], Dict[str, List]]:
+    """
+    Batch form of parse_accessibility_info for a block of count nodes. columns maps
+    tag keys (see ACCESSIBILITY_TAGS) to one value per node, None where the node does
+    not have the tag; missing keys count as all None. Each distinct value is parsed
+    once per batch and the result is spread back over the nodes.
+
+    Returns:
+        Tuple of (general, entrance, restroom) dicts holding one list per field,
+        with the same values parse_accessibility_info gives node by node.
+    """
+    nones = [None] * count
+
+    def col(*keys: str) -> List[Optional[str]]:
+        return _coalesce(*(columns.get(key) or nones for key in keys))
+
+    general = {
+        "accessibility": _map_unique(parse_yes_no, col("wheelchair")),
+        "indoor_accessibility": _map_unique(parse_yes_no, col("wheelchair:turning_circle")),
+        "additional_info": _map_unique(lambda v: (v or "")[:1000] or None, col("wheelchair:description")),
+    }
+
+    automatic = _map_unique(lambda v: normalize(v) == "yes", col("entrance:automatic_door"))
+    door = _map_unique(lambda v: (v or "")[:50] or None, col("entrance:door"))
+    entrance = {
+        "accessibility": nones,
+        "step_count": _map_unique(parse_count, col("entrance:step_count", "entrance:steps")),
+        "step_height": _map_unique(parse_step_height, col("entrance:kerb:height")),
+        "ramp": _map_unique(parse_yes_no, col("entrance:ramp", "ramp", "wheelchair:ramp")),
+        "lift": nones,
+        "entrance_width": _map_unique(parse_width, col("door:width", "entrance:width")),
+        "door_type": ["automatic" if a else d for a, d in zip(automatic, door)],
+    }
+
+    space = list(zip(col("toilets:wheelchair:space_front"), col("toilets:wheelchair:space_side")))
+    restroom = {
+        "accessibility": nones,
+        "door_width": _map_unique(parse_width, col("toilets:wheelchair:door_width")),
+        "room_maneuver": _map_unique(lambda fs: parse_restroom_maneuver(*fs), space),
+        "toilet_seat": nones,
+        "grab_rails": nones,
+        "sink": nones,
+        "emergency_alarm": nones,
+        "euro_key": _map_unique(lambda v: None if v is None else v == "eurokey", col("centralkey")),
+    }
+
+    return general, entrance, restroom
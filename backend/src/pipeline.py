@@ -0,0 +1,184 @@
+# Copyright © 2025 Aaro Koinsaari
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import time
+import queue
+import threading
+import traceback
+import multiprocessing
+from typing import Callable, Iterable, Iterator, NamedTuple, Optional
+
+from place import PlaceBatch
+
+PIPELINE_MODES = ("off", "thread", "process")
+
+# osmium reads with a thread pool that a forked child would inherit without its
+# threads, so producer processes are started fresh
+_process_context = multiprocessing.get_context("spawn")
+# how often a consumer waiting for a batch checks that its producer is still running
+POLL_SECONDS = 1.0
+
+
+class StageTimes(NamedTuple):
+    busy: float
+    idle: float
+
+
+class _Done(NamedTuple):
+    """Last queue item of a producer, with its busy and blocked seconds."""
+    times: StageTimes
+
+
+class _Failed(NamedTuple):
+    error: str
+
+
+def _produce(produce: Callable[..., Iterable[PlaceBatch]], args: tuple, out, stop):
+    """Run produce(*args) and put its batches on out, blocking while out is full."""
+    busy = blocked = 0.0
+    try:
+        start = time.perf_counter()
+        for batch in produce(*args):
+            now = time.perf_counter()
+            busy += now - start
+            while not stop.is_set():
+                try:
+                    out.put(batch, timeout=0.1)
+                    break
+                except queue.Full:
+                    pass
+            start = time.perf_counter()
+            blocked += start - now
+            if stop.is_set():
+                return
+        busy += time.perf_counter() - start
+        out.put(_Done(StageTimes(busy, blocked)))
+    except BaseException:
+        # exceptions of the producer are passed on as text, they need not be picklable
+        out.put(_Failed(traceback.format_exc()))
+
+
+class PrefetchedBatches:
+    """
+    Iterates over produce(*args), e.g. stream_pbf, run in a background thread or
+    process with at most queue_size batches waiting. In process mode produce and
+    args must be picklable.
+    """
+    def __init__(
+        self,
+        produce: Callable[..., Iterable[PlaceBatch]],
+        args: tuple,
+        queue_size: int = 4,
+        mode: str = "thread"
+    ):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unknown pipeline mode: {mode}")
+        self.produce = produce
+        self.args = args
+        self.queue_size = queue_size
+        self.mode = mode
+        self.worker = None
+        self.parse_times: Optional[StageTimes] = None
+        self.load_times = StageTimes(0.0, 0.0)
+        self.started = None
+        self.finished = None
+
+    def start(self):
+        """Start producing before the consumer is ready, e.g. while it connects to the database."""
+        if self.worker:
+            return
+        if self.mode == "process":
+            self.queue = _process_context.Queue(self.queue_size)
+            self.stop = _process_context.Event()
+            self.worker = _process_context.Process(
+                target=_produce, args=(self.produce, self.args, self.queue, self.stop), daemon=True
+            )
+        else:
+            self.queue = queue.Queue(self.queue_size)
+            self.stop = threading.Event()
+            self.worker = threading.Thread(
+                target=_produce, args=(self.produce, self.args, self.queue, self.stop), daemon=True
+            )
+        self.started = time.perf_counter()
+        self.worker.start()
+
+    def __iter__(self) -> Iterator[PlaceBatch]:
+        self.start()
+        busy = idle = 0.0
+        try:
+            while True:
+                wait_start = time.perf_counter()
+                item = self._next_item()
+                resumed = time.perf_counter()
+                idle += resumed - wait_start
+                if isinstance(item, _Done):
+                    self.parse_times = item.times
+                    return
+                if isinstance(item, _Failed):
+                    raise RuntimeError(f"Parsing failed in the {self.mode} producer:\n{item.error}")
+                yield item
+                busy += time.perf_counter() - resumed
+        finally:
+            self.load_times = StageTimes(busy, idle)
+            self.finished = time.perf_counter()
+            self.close()
+
+    def _next_item(self):
+        """Next item of the queue, raising if the producer died without putting _Done or _Failed on it."""
+        while True:
+            try:
+                return self.queue.get(timeout=POLL_SECONDS)
+            except queue.Empty:
+                if self.worker.is_alive():
+                    continue
+            # an item put just before the producer exited may still be on its way
+            try:
+                return self.queue.get(timeout=POLL_SECONDS)
+            except queue.Empty:
+                pass
+            if self.mode == "process":
+                raise RuntimeError(f"Parsing failed: the producer process exited with code {self.worker.exitcode}")
+            raise RuntimeError("Parsing failed: the producer thread stopped without a result")
+
+    def close(self):
+        """Stop the producer, also when the consumer stopped early (--test limit, errors)."""
+        if not self.worker:
+            return
+        self.stop.set()
+        if self.mode == "process":
+            self.worker.join(timeout=5)
+            if self.worker.is_alive():
+                self.worker.terminate()
+                self.worker.join()
+            self.queue.close()
+            self.queue.cancel_join_thread()
+        else:
+            # unblock a producer waiting on a full queue
+            while self.worker.is_alive():
+                try:
+                    self.queue.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            self.worker.join()
+
+    def print_report(self):
+        """Print busy and idle time of the parse and load stages."""
+        wall = (self.finished or time.perf_counter()) - (self.started or time.perf_counter())
+        print(f"Pipeline ({self.mode}, queue of {self.queue_size} batches), {wall:.2f}s wall time:")
+        if self.parse_times:
+            print(f"  parse: {self.parse_times.busy:.2f}s busy, "
+                  f"{self.parse_times.idle:.2f}s blocked on a full queue")
+        else:
+            print("  parse: stopped early")
+        print(f"  load:  {self.load_times.busy:.2f}s busy, {self.load_times.idle:.2f}s waiting for batches")
@@ -12,8 +12,16 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import os
+import sys
 import osmium
-from parsers import parse_accessibility_info, format_address
+import osmium.filter
+from array import array
+from contextlib import contextmanager
+from itertools import repeat
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from parsers import ACCESSIBILITY_TAGS, format_address, parse_accessibility_columns
+from hilbert import hilbert_keys
 
 TAGS = {
     "amenity": [
@@ -33,7 +41,22 @@ TAGS = {
 }
 
 
+# TAGS as (key, value) pairs for osmium's TagFilter, which drops every other object
+# in C++ before it reaches a Python callback
+TAG_FILTER_PAIRS = tuple((key, value) for key, values in TAGS.items() for value in values)
+
+
+def place_filter() -> osmium.filter.TagFilter:
+    """Return a native osmium filter passing only objects tagged with one of TAGS."""
+    return osmium.filter.TagFilter(*TAG_FILTER_PAIRS)
+
+
 class Place:
+    __slots__ = (
+        "osm_id", "name", "category", "lat", "lon", "contact",
+        "general_accessibility", "entrance_accessibility", "restroom_accessibility", "region"
+    )
+
     def __init__(
         self,
         osm_id: int,
@@ -59,42 +82,530 @@ class Place:
         self.region = region
 
 
+# small-int codes for AccessibilityStatus values, 0 is None. Anything that is not
+# a valid status also maps to 0, so seeding does not rollback because of one invalid value
+STATUS_VALUES = (None, "FULLY_ACCESSIBLE", "PARTIALLY_ACCESSIBLE", "NOT_ACCESSIBLE")
+_STATUS_CODES = {value: code for code, value in enumerate(STATUS_VALUES)}
+
+# euro_key is an optional boolean, stored the same way
+_BOOL_VALUES = (None, False, True)
+_BOOL_CODES = {value: code for code, value in enumerate(_BOOL_VALUES)}
+
+GENERAL_STATUS_FIELDS = ("accessibility", "indoor_accessibility")
+ENTRANCE_STATUS_FIELDS = ("accessibility", "step_count", "step_height", "ramp", "lift", "entrance_width")
+RESTROOM_STATUS_FIELDS = (
+    "accessibility", "door_width", "room_maneuver", "grab_rails", "sink", "toilet_seat", "emergency_alarm"
+)
+CONTACT_FIELDS = ("phone", "website", "email", "address")
+
+
+def _decode(codes: array, values: tuple) -> Iterator:
+    return map(values.__getitem__, codes)
+
+
+class PlaceBatch:
+    """
+    Columnar batch of places from one region. Ids and coordinates live in typed
+    arrays, accessibility statuses as one byte codes and category/region as
+    interned strings, so a place costs a fraction of a Place with four dicts.
+    staging_rows() produces staging table rows straight from the columns, the
+    other *_rows() methods the rows of each target table.
+    """
+    def __init__(self, region: str = None):
+        self.region = sys.intern(region[:50]) if region else None
+        self.osm_id = array("q")
+        self.lat = array("d")
+        self.lon = array("d")
+        self.name = []
+        self.category = []
+        self.general = {field: array("b") for field in GENERAL_STATUS_FIELDS}
+        self.entrance = {field: array("b") for field in ENTRANCE_STATUS_FIELDS}
+        self.restroom = {field: array("b") for field in RESTROOM_STATUS_FIELDS}
+        self.additional_info = []
+        self.door_type = []
+        self.euro_key = array("b")
+        self.contact = {field: [] for field in CONTACT_FIELDS}
+        # raw accessibility tag values of the last nodes added with append_node. They
+        # are parsed together by parse_accessibility_columns before the batch is read
+        self.pending_tags = {key: [] for key in ACCESSIBILITY_TAGS}
+        self.pending = 0
+
+    def __len__(self) -> int:
+        return len(self.osm_id)
+
+    def append(
+        self,
+        osm_id: int,
+        name: str,
+        category: str,
+        lat: float,
+        lon: float,
+        contact: dict,
+        general_accessibility: dict,
+        entrance_accessibility: dict,
+        restroom_accessibility: dict
+    ):
+        """Add one place, given in the same shape as the Place constructor."""
+        self._parse_pending()
+        self.osm_id.append(osm_id)
+        self.lat.append(lat)
+        self.lon.append(lon)
+        self.name.append(name)
+        self.category.append(sys.intern(category))
+        for field, codes in self.general.items():
+            codes.append(_STATUS_CODES.get(general_accessibility.get(field), 0))
+        for field, codes in self.entrance.items():
+            codes.append(_STATUS_CODES.get(entrance_accessibility.get(field), 0))
+        for field, codes in self.restroom.items():
+            codes.append(_STATUS_CODES.get(restroom_accessibility.get(field), 0))
+        info = general_accessibility.get("additional_info")
+        self.additional_info.append(info[:1000] if info else None)
+        self.door_type.append(entrance_accessibility.get("door_type"))
+        self.euro_key.append(_BOOL_CODES.get(restroom_accessibility.get("euro_key"), 0))
+        for field, values in self.contact.items():
+            values.append(contact.get(field))
+
+    def append_node(self, n) -> bool:
+        """Parse an osmium node and add it if it matches TAGS. Returns True if added."""
+        cat = _category(n.tags)
+        if not cat:
+            return False
+        self._append_tags(n.id, n.location.lat, n.location.lon, n.tags, cat)
+        return True
+
+    def append_tags(self, osm_id: int, lat: float, lon: float, tags) -> bool:
+        """
+        Add a place from its tags (a dict or osmium TagList) and a representative
+        point, used for ways and relations. Returns True if it matches TAGS.
+        """
+        cat = _category(tags)
+        if not cat:
+            return False
+        self._append_tags(osm_id, lat, lon, tags, cat)
+        return True
+
+    def _append_tags(self, osm_id: int, lat: float, lon: float, tags, cat: str):
+        tags = dict(tags)
+        self.osm_id.append(osm_id)
+        self.lat.append(lat)
+        self.lon.append(lon)
+        self.name.append(tags.get("name", "Unknown")[:255])
+        self.category.append(sys.intern(cat[:50]))
+        contact = self.contact
+        contact["phone"].append(tags.get("phone")[:100] if tags.get("phone") else None)
+        contact["website"].append(tags.get("website")[:255] if tags.get("website") else None)
+        contact["email"].append(tags.get("email")[:255] if tags.get("email") else None)
+        contact["address"].append(format_address(tags))
+        for key, values in self.pending_tags.items():
+            values.append(tags.get(key))
+        self.pending += 1
+
+    def _parse_pending(self):
+        """Parse the accessibility tags of pending nodes into the status columns."""
+        if not self.pending:
+            return
+        general, entrance, restroom = parse_accessibility_columns(self.pending_tags, self.pending)
+        for field, codes in self.general.items():
+            codes.extend([_STATUS_CODES.get(value, 0) for value in general[field]])
+        for field, codes in self.entrance.items():
+            codes.extend([_STATUS_CODES.get(value, 0) for value in entrance[field]])
+        for field, codes in self.restroom.items():
+            codes.extend([_STATUS_CODES.get(value, 0) for value in restroom[field]])
+        self.additional_info.extend(general["additional_info"])
+        self.door_type.extend(entrance["door_type"])
+        self.euro_key.extend([_BOOL_CODES.get(value, 0) for value in restroom["euro_key"]])
+        self.pending_tags = {key: [] for key in ACCESSIBILITY_TAGS}
+        self.pending = 0
+
+    def __getstate__(self):
+        # batches are pickled to pass them between processes, send them parsed
+        self._parse_pending()
+        return self.__dict__
+
+    def columns(self) -> Dict[Tuple[str, Optional[str]], list]:
+        """
+        Every column of the parsed batch by (attribute, field), field being None
+        outside the status and contact dicts. The columns are the batch's own.
+        """
+        self._parse_pending()
+        columns = {}
+        for name, value in vars(self).items():
+            if name == "pending_tags":
+                continue
+            if isinstance(value, dict):
+                columns.update(((name, field), column) for field, column in value.items())
+            elif isinstance(value, (array, list)):
+                columns[name, None] = value
+        return columns
+
+    @classmethod
+    def from_places(cls, places: Iterable[Place], region: str = None) -> "PlaceBatch":
+        batch = cls(region)
+        for p in places:
+            if batch.region is None and p.region:
+                batch.region = sys.intern(p.region[:50])
+            batch.append(
+                p.osm_id, p.name, p.category, p.lat, p.lon, p.contact,
+                p.general_accessibility, p.entrance_accessibility, p.restroom_accessibility
+            )
+        return batch
+
+    def __iter__(self) -> Iterator[Place]:
+        """Expand the batch back into Place objects, mainly for debugging and tests."""
+        self._parse_pending()
+        general = [dict(zip(GENERAL_STATUS_FIELDS, row)) for row in self._decoded(self.general)]
+        entrance = [dict(zip(ENTRANCE_STATUS_FIELDS, row)) for row in self._decoded(self.entrance)]
+        restroom = [dict(zip(RESTROOM_STATUS_FIELDS, row)) for row in self._decoded(self.restroom)]
+        contact = zip(*self.contact.values())
+        for i, c in enumerate(contact):
+            general[i]["additional_info"] = self.additional_info[i]
+            entrance[i]["door_type"] = self.door_type[i]
+            restroom[i]["euro_key"] = _BOOL_VALUES[self.euro_key[i]]
+            yield Place(
+                self.osm_id[i], self.name[i], self.category[i], self.lat[i], self.lon[i],
+                dict(zip(CONTACT_FIELDS, c)), general[i], entrance[i], restroom[i], self.region
+            )
+
+    def _sliced(self, part: slice) -> "PlaceBatch":
+        self._parse_pending()
+        out = PlaceBatch()
+        out.region = self.region
+        for name, value in vars(self).items():
+            if isinstance(value, dict):
+                setattr(out, name, {field: column[part] for field, column in value.items()})
+            elif isinstance(value, (array, list)):
+                setattr(out, name, value[part])
+        return out
+
+    def head(self, n: int) -> "PlaceBatch":
+        """Return a new batch with the first n places."""
+        return self._sliced(slice(None, n))
+
+    def skip(self, n: int) -> "PlaceBatch":
+        """Return a new batch without the first n places."""
+        return self._sliced(slice(n, None))
+
+    @staticmethod
+    def _decoded(columns: Dict[str, array]) -> Iterator[tuple]:
+        return zip(*(_decode(codes, STATUS_VALUES) for codes in columns.values()))
+
+    def places_rows(self) -> Iterator[tuple]:
+        self._parse_pending()
+        return zip(self.osm_id, self.name, self.category, self.lat, self.lon, repeat(self.region))
+
+    def ga_rows(self) -> Iterator[tuple]:
+        self._parse_pending()
+        return zip(
+            self.osm_id,
+            *(_decode(c, STATUS_VALUES) for c in self.general.values()),
+            self.additional_info
+        )
+
+    def ea_rows(self) -> Iterator[tuple]:
+        self._parse_pending()
+        return zip(
+            self.osm_id,
+            *(_decode(c, STATUS_VALUES) for c in self.entrance.values()),
+            self.door_type
+        )
+
+    def ra_rows(self) -> Iterator[tuple]:
+        self._parse_pending()
+        return zip(
+            self.osm_id,
+            *(_decode(c, STATUS_VALUES) for c in self.restroom.values()),
+            _decode(self.euro_key, _BOOL_VALUES)
+        )
+
+    def contact_rows(self) -> Iterator[tuple]:
+        self._parse_pending()
+        return zip(self.osm_id, *self.contact.values())
+
+    def staging_rows(self) -> Iterator[tuple]:
+        """
+        Rows of the wide staging table: place columns with the Hilbert key of the
+        place, then general, entrance, restroom and contact columns.
+        """
+        self._parse_pending()
+        return zip(
+            self.osm_id, self.name, self.category, self.lat, self.lon, repeat(self.region),
+            hilbert_keys(self.lat, self.lon),
+            *(_decode(c, STATUS_VALUES) for c in self.general.values()),
+            self.additional_info,
+            *(_decode(c, STATUS_VALUES) for c in self.entrance.values()),
+            self.door_type,
+            *(_decode(c, STATUS_VALUES) for c in self.restroom.values()),
+            _decode(self.euro_key, _BOOL_VALUES),
+            *self.contact.values()
+        )
+
+
+def _category(tags) -> Optional[str]:
+    """Return the matched TAGS category of a node, or None if it is not a place."""
+    if "amenity" in tags and tags["amenity"] in TAGS["amenity"]:
+        return tags["amenity"]
+    elif "shop" in tags and tags["shop"] in TAGS["shop"]:
+        return tags["shop"]
+    elif "tourism" in tags and tags["tourism"] in TAGS["tourism"]:
+        return tags["tourism"]
+    return None
+
+
+# osm_id of places mapped as ways or relations: the negated osmium area id
+# (2 * way id, 2 * relation id + 1), so they never collide with node ids
+def way_osm_id(way_id: int) -> int:
+    return -2 * way_id
+
+
+def relation_osm_id(relation_id: int) -> int:
+    return -(2 * relation_id + 1)
+
+
+def decode_osm_id(osm_id: int) -> Tuple[str, int]:
+    """Return ("node" | "way" | "relation", OSM id) for an osm_id of the places table."""
+    if osm_id > 0:
+        return "node", osm_id
+    area_id = -osm_id
+    if area_id % 2:
+        return "relation", (area_id - 1) // 2
+    return "way", area_id // 2
+
+
+# node location indexes from osmium.index.map_types() that make sense for a single
+# pass over a file. The *_file_array ones are stored in a file next to the PBF
+LOCATION_INDEXES = (
+    "auto", "flex_mem", "sparse_mem_array", "dense_mmap_array", "sparse_file_array", "dense_file_array"
+)
+# from this PBF size on, auto keeps node locations in a file instead of memory
+LOCATION_INDEX_FILE_MIN_SIZE = 1024 ** 3
+
+
+def location_index(filename: str, kind: str = "auto") -> str:
+    """Return the osmium index description for kind, chosen by the size of filename for auto."""
+    if kind == "auto":
+        kind = "sparse_file_array" if os.path.getsize(filename) >= LOCATION_INDEX_FILE_MIN_SIZE else "flex_mem"
+    if kind.endswith("_file_array"):
+        return f"{kind},{filename}.nodes"
+    return kind
+
+
+@contextmanager
+def location_store(filename: str, kind: str = "auto") -> Iterator[osmium.index.LocationTable]:
+    """Node location storage for reading filename, its index file is removed afterwards."""
+    index = location_index(filename, kind)
+    store = osmium.index.create_map(index)
+    try:
+        yield store
+    finally:
+        store.clear()
+        if "," in index:
+            index_file = index.split(",", 1)[1]
+            if os.path.exists(index_file):
+                os.remove(index_file)
+
+
+def _representative_point(lines: List[Tuple[List[float], List[float]]]) -> Optional[Tuple[float, float]]:
+    """
+    (lat, lon) of a place drawn as one or more lines of (lons, lats). If all lines
+    are closed rings, this is their area-weighted centroid, otherwise the mean of
+    all vertices. Coordinates are treated as planar, which is fine at building scale.
+    """
+    lines = [(lons, lats) for lons, lats in lines if lons]
+    if not lines:
+        return None
+    closed = all(len(lons) >= 4 and lons[0] == lons[-1] and lats[0] == lats[-1] for lons, lats in lines)
+    if closed:
+        # shoelace formula relative to the first vertex, for precision
+        lon0, lat0 = lines[0][0][0], lines[0][1][0]
+        area = cx = cy = 0.0
+        for lons, lats in lines:
+            ring_area = ring_x = ring_y = 0.0
+            for i in range(len(lons) - 1):
+                x0, y0 = lons[i] - lon0, lats[i] - lat0
+                x1, y1 = lons[i + 1] - lon0, lats[i + 1] - lat0
+                cross = x0 * y1 - x1 * y0
+                ring_area += cross
+                ring_x += (x0 + x1) * cross
+                ring_y += (y0 + y1) * cross
+            # rings may be drawn in either direction
+            if ring_area < 0:
+                ring_area, ring_x, ring_y = -ring_area, -ring_x, -ring_y
+            area += ring_area
+            cx += ring_x
+            cy += ring_y
+        if area > 0:
+            return lat0 + cy / (3 * area), lon0 + cx / (3 * area)
+    count = sum(len(lons) for lons, _ in lines)
+    return (
+        sum(sum(lats) for _, lats in lines) / count,
+        sum(sum(lons) for lons, _ in lines) / count
+    )
+
+
+def way_point(w) -> Optional[Tuple[float, float]]:
+    """(lat, lon) of a way read with node locations, None if none of its nodes has one."""
+    lons, lats = [], []
+    for node in w.nodes:
+        location = node.location
+        if location.valid():
+            lons.append(location.lon)
+            lats.append(location.lat)
+    return _representative_point([(lons, lats)])
+
+
+class PlaceRelations:
+    """
+    Multipolygon relations matching TAGS. They are read in a pass over the relations
+    before the main pass, and placed at the centroid of their outer ways afterwards,
+    using the node locations collected in the main pass.
+    """
+    def __init__(self):
+        self.tags: Dict[int, dict] = {}
+        self.outer_ways: Dict[int, List[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.tags)
+
+    @classmethod
+    def read(cls, filename: str) -> "PlaceRelations":
+        relations = cls()
+        for r in osmium.FileProcessor(filename, osmium.osm.RELATION).with_filter(place_filter()):
+            if r.tags.get("type") != "multipolygon":
+                continue
+            outer = [m.ref for m in r.members if m.type == "w" and m.role in ("outer", "")]
+            if outer:
+                relations.tags[r.id] = dict(r.tags)
+                relations.outer_ways[r.id] = outer
+        return relations
+
+    def points(self, filename: str, store: osmium.index.LocationTable) -> Iterator[Tuple[int, float, float, dict]]:
+        """Yield (osm_id, lat, lon, tags) of each relation with at least one located node."""
+        if not self.tags:
+            return
+        member_ids = {way_id for ways in self.outer_ways.values() for way_id in ways}
+        lines = {}
+        for w in osmium.FileProcessor(filename, osmium.osm.WAY).with_filter(osmium.filter.IdFilter(member_ids)):
+            lons, lats = [], []
+            for node in w.nodes:
+                try:
+                    location = store.get(node.ref)
+                except KeyError:
+                    continue
+                lons.append(location.lon)
+                lats.append(location.lat)
+            lines[w.id] = (lons, lats)
+
+        for relation_id, way_ids in self.outer_ways.items():
+            point = _representative_point([lines[way_id] for way_id in way_ids if way_id in lines])
+            if point:
+                yield relation_osm_id(relation_id), point[0], point[1], self.tags[relation_id]
+
+
+def is_place(tags) -> bool:
+    """Return True if the tags of an OSM object match TAGS."""
+    return _category(tags) is not None
+
+
 class PlaceHandler(osmium.SimpleHandler):
-    def __init__(self, region=None):
+    """
+    Collects matching nodes into self.places, a PlaceBatch. If on_batch is given,
+    the handler runs in streaming mode: every batch_size places are passed to
+    on_batch and a new batch is started, so memory stays bounded by the batch size.
+    Call flush() after apply_file() to emit the last partial batch.
+    With areas set, places mapped as ways and multipolygon relations are collected
+    too, which needs node locations stored in a location_index of that kind.
+    """
+    def __init__(
+        self,
+        region=None,
+        batch_size: int = 10000,
+        on_batch: Callable[[PlaceBatch], None] = None,
+        areas: bool = False,
+        location_index: str = "auto"
+    ):
         super().__init__()
-        self.places = []
         self.region = region
+        self.places = PlaceBatch(region)
+        self.batch_size = batch_size
+        self.on_batch = on_batch
+        self.areas = areas
+        self.location_index = location_index
+
+    def apply_file(self, filename, locations=False, idx='flex_mem', filters=None):
+        """Like SimpleHandler.apply_file, with place_filter() in front so only places reach node()."""
+        filters = [place_filter(), *(filters or [])]
+        if not self.areas:
+            super().apply_file(filename, locations, idx, filters)
+            return
+
+        relations = PlaceRelations.read(filename)
+        with location_store(filename, self.location_index) as store:
+            locations_handler = osmium.NodeLocationsForWays(store)
+            locations_handler.ignore_errors()
+            osmium.apply(filename, locations_handler, *filters, self)
+            for osm_id, lat, lon, tags in relations.points(filename, store):
+                if self.places.append_tags(osm_id, lat, lon, tags):
+                    self._added()
 
     def node(self, n):
-        tags = dict(n.tags)
-        cat = None
-        
-        if "amenity" in tags and tags["amenity"] in TAGS["amenity"]:
-            cat = tags["amenity"]
-        elif "shop" in tags and tags["shop"] in TAGS["shop"]:
-            cat = tags["shop"]
-        elif "tourism" in tags and tags["tourism"] in TAGS["tourism"]:
-            cat = tags["tourism"]
-
-        if cat:
-            general_acc, entrance_acc, restroom_acc = parse_accessibility_info(tags)
-            contact = {
-                "address": format_address(tags),
-                "phone": tags.get("phone")[:100] if tags.get("phone") else None,
-                "email": tags.get("email")[:255] if tags.get("email") else None,
-                "website": tags.get("website")[:255] if tags.get("website") else None,
-            }
-
-            place = Place(
-                osm_id=n.id,
-                name=tags.get("name", "Unknown")[:255],
-                category=cat[:50],
-                lat=n.location.lat,
-                lon=n.location.lon,
-                contact=contact,
-                general_accessibility=general_acc,
-                entrance_accessibility=entrance_acc,
-                restroom_accessibility=restroom_acc,
-                region=self.region[:50]
-            )
-            self.places.append(place)
+        if self.places.append_node(n):
+            self._added()
+
+    def way(self, w):
+        point = way_point(w)
+        if point and self.places.append_tags(way_osm_id(w.id), point[0], point[1], w.tags):
+            self._added()
+
+    def _added(self):
+        if self.on_batch and len(self.places) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Pass the collected places to on_batch and start a new batch."""
+        if self.on_batch and len(self.places):
+            self.on_batch(self.places)
+            self.places = PlaceBatch(self.region)
+
+
+def iter_place_batches(
+    filename: str,
+    region: str = None,
+    batch_size: int = 10000,
+    areas: bool = False,
+    location_index: str = "auto"
+) -> Iterator[PlaceBatch]:
+    """
+    Read a PBF file and yield batches of at most batch_size places while osmium is
+    still reading, instead of collecting the whole region in memory. Only objects
+    passing place_filter() are handed to Python. With areas set, places mapped as
+    ways and multipolygon relations are included, see PlaceHandler.
+    """
+    batch = PlaceBatch(region)
+    if not areas:
+        for n in osmium.FileProcessor(filename, osmium.osm.NODE).with_filter(place_filter()):
+            if batch.append_node(n) and len(batch) >= batch_size:
+                yield batch
+                batch = PlaceBatch(region)
+        if len(batch):
+            yield batch
+        return
+
+    relations = PlaceRelations.read(filename)
+    with location_store(filename, location_index) as store:
+        reader = osmium.FileProcessor(filename, osmium.osm.NODE | osmium.osm.WAY)
+        for obj in reader.with_locations(store).with_filter(place_filter()):
+            if obj.is_node():
+                added = batch.append_node(obj)
+            else:
+                point = way_point(obj)
+                added = point is not None and batch.append_tags(way_osm_id(obj.id), point[0], point[1], obj.tags)
+            if added and len(batch) >= batch_size:
+                yield batch
+                batch = PlaceBatch(region)
+
+        for osm_id, lat, lon, tags in relations.points(filename, store):
+            if batch.append_tags(osm_id, lat, lon, tags) and len(batch) >= batch_size:
+                yield batch
+                batch = PlaceBatch(region)
+    if len(batch):
+        yield batch
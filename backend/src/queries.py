@@ -0,0 +1,35 @@
+# Copyright © 2025 Aaro Koinsaari
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+from typing import Dict, Iterable
+
+SQL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'sql')
+
+
+def load_sql(filepath, **kwargs):
+    """Load SQL from file and format with provided parameters"""
+    with open(os.path.join(SQL_DIR, filepath), 'r') as f:
+        sql = f.read()
+    return sql.format(**kwargs)
+
+
+
+def require_columns(conn, columns: Dict[str, Iterable[str]], migration: str):
+    """Raise if a table lacks one of its columns, naming the migration in sql/migrations that adds them."""
+    present = set(conn.execute(load_sql("operations/select_columns.sql"), (list(columns),)).fetchall())
+    missing = [f"{table}.{column}" for table, names in columns.items() for column in names
+               if (table, column) not in present]
+    if missing:
+        raise RuntimeError(f"The database has no {', '.join(missing)}. Apply sql/migrations/{migration} first")
@@ -0,0 +1,117 @@
+# Copyright © 2025 Aaro Koinsaari
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import datetime as dt
+import urllib.request as urlrequest
+from array import array
+from typing import Iterator, NamedTuple, Optional, Tuple
+
+import osmium
+from osmium.replication.server import ReplicationServer
+from osmium.replication.utils import get_replication_header
+
+from place import PlaceBatch, is_place, relation_osm_id, way_osm_id
+
+
+class ChangeSet(NamedTuple):
+    """Places from one chunk of change files and the replication state they lead to."""
+    places: PlaceBatch
+    deleted_osm_ids: array
+    sequence: int
+    timestamp: Optional[dt.datetime]
+    newest: int
+
+
+class PlaceChangeHandler(osmium.SimpleHandler):
+    """
+    Collects created and modified nodes matching TAGS from change files. Nodes that
+    were deleted, or modified so that they no longer match TAGS, go to deleted_osm_ids.
+    Change files carry no locations for unchanged nodes, so places mapped as ways
+    and relations are only refreshed by a full import. Their deletions are applied.
+    """
+    def __init__(self, region=None):
+        super().__init__()
+        self.places = PlaceBatch(region)
+        self.deleted_osm_ids = array("q")
+
+    def node(self, n):
+        if n.deleted or not self.places.append_node(n):
+            self.deleted_osm_ids.append(n.id)
+
+    def way(self, w):
+        if w.deleted or not is_place(w.tags):
+            self.deleted_osm_ids.append(way_osm_id(w.id))
+
+    def relation(self, r):
+        if r.deleted or not is_place(r.tags):
+            self.deleted_osm_ids.append(relation_osm_id(r.id))
+
+
+class LocalReplicationServer(ReplicationServer):
+    """
+    ReplicationServer reading state and change files with urllib instead of requests,
+    so a file:// URL pointing to a local directory laid out like a replication
+    server (state.txt, 000/000/001.osc.gz, ...) can stand in for Geofabrik.
+    """
+    def open_url(self, url: urlrequest.Request):
+        return urlrequest.urlopen(url)
+
+
+def replication_server(url: str) -> ReplicationServer:
+    """Return a replication server for a http(s) URL, a file:// URL or a local directory."""
+    if os.path.isdir(url):
+        url = "file://" + os.path.abspath(url)
+    if url.startswith("file://"):
+        return LocalReplicationServer(url)
+    return ReplicationServer(url)
+
+
+def read_replication_header(pbf_filename: str) -> Optional[Tuple[int, Optional[dt.datetime]]]:
+    """Return (sequence, timestamp) from the replication header of a PBF file, if present."""
+    if not os.path.exists(pbf_filename):
+        return None
+    header = get_replication_header(pbf_filename)
+    if header.sequence is None:
+        return None
+    return header.sequence, header.timestamp
+
+
+def iter_changes(url: str, region: str, sequence: int, max_size: int = 102400) -> Iterator[ChangeSet]:
+    """
+    Download and apply change files after sequence, yielding one ChangeSet per chunk
+    of at most max_size kB of unpacked diffs until the region is up to date.
+    Each chunk is simplified, so only the newest version of an object is seen.
+    """
+    with replication_server(url) as server:
+        while True:
+            diffs = server.collect_diffs(sequence + 1, max_size)
+            if diffs is None:
+                return
+
+            handler = PlaceChangeHandler(region)
+            diffs.reader.apply(handler, simplify=True)
+
+            state = server.get_state_info(diffs.id)
+            yield ChangeSet(
+                places=handler.places,
+                deleted_osm_ids=handler.deleted_osm_ids,
+                sequence=diffs.id,
+                timestamp=state.timestamp if state else None,
+                newest=diffs.newest
+            )
+
+            sequence = diffs.id
+            if sequence >= diffs.newest:
+                return
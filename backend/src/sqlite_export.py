@@ -0,0 +1,244 @@
+# Copyright © 2025 Aaro Koinsaari
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+SQLite snapshots of a region for the app's Room cache. <region>.sqlite holds
+every place of the region in the places table of the Room schema, so the app can
+ship or download it as one file and open it as a prepackaged database. Each
+snapshot has a version. When the places changed since the previous snapshot,
+a patch from the previous version is written next to it,
+<region>-<from>-<to>.patch.sqlite, with the changed places in the same table
+and the ids of removed ones in deleted_places. <region>.json lists the current
+version and the patches kept, so the app downloads either the snapshot or the
+patches from the version it has.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from place import TAGS
+from tiles import TILE_SIZE_DEGREES, tile_id, tile_name
+
+# bump when the layout of the files changes
+SNAPSHOT_FORMAT = 1
+SNAPSHOT_SUFFIX = ".sqlite"
+PATCH_SUFFIX = ".patch.sqlite"
+
+# columns of the places table in the order Room creates them
+PLACE_COLUMNS = (
+    "id", "name", "category", "lat", "lon", "region", "email", "phone", "address", "website",
+    "generalAccessibility", "indoorAccessibility", "entranceAccessibility", "additionalInfo",
+    "stepCount", "stepHeight", "ramp", "lift", "entranceWidth", "doorType",
+    "restroomAccessibility", "doorWidth", "roomManeuver", "grabRails", "toiletSeat", "emergencyAlarm", "sink",
+    "euroKey", "tileId", "fetchTimestamp", "lastVisited", "userModified",
+)
+# set at export time, not compared between snapshots
+TIMESTAMP_COLUMNS = ("fetchTimestamp", "lastVisited")
+CONTENT_COLUMNS = tuple(column for column in PLACE_COLUMNS if column not in TIMESTAMP_COLUMNS)
+
+# PlaceCategory names of the app are the TAGS values in upper case
+_CATEGORIES = {value: value.upper() for values in TAGS.values() for value in values}
+
+
+class SnapshotStats(NamedTuple):
+    region: str
+    version: int
+    places: int
+    changed: int
+    deleted: int
+    size: int
+    patch_size: Optional[int]
+    seconds: float
+
+
+def room_row(row: tuple, timestamp: int) -> tuple:
+    """
+    A places row of the Room table from a row of select_room_places.sql, the
+    Room columns up to euroKey followed by userModified. timestamp is in ms.
+    """
+    *columns, user_modified = row
+    columns[2] = _CATEGORIES.get(columns[2], "UNKNOWN")
+    tile = tile_name(tile_id(columns[3], columns[4], TILE_SIZE_DEGREES))
+    return (*columns, tile, timestamp, timestamp, user_modified)
+
+
+def _file_hash(filename: str) -> str:
+    digest = hashlib.sha256()
+    with open(filename, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _create(filename: str, schema: str, info: Dict) -> sqlite3.Connection:
+    if os.path.exists(filename):
+        os.remove(filename)
+    db = sqlite3.connect(filename)
+    # a half-written file is discarded anyway, no journal needed
+    db.execute("PRAGMA journal_mode = OFF")
+    db.execute("PRAGMA synchronous = OFF")
+    db.executescript(schema)
+    db.executemany("INSERT INTO snapshot_info (key, value) VALUES (?, ?)", [(k, str(v)) for k, v in info.items()])
+    return db
+
+
+def read_snapshot_info(filename: str) -> Dict[str, str]:
+    """snapshot_info of a snapshot or patch file, empty if there is no such file."""
+    if not os.path.exists(filename):
+        return {}
+    db = sqlite3.connect(f"file:{filename}?mode=ro", uri=True)
+    try:
+        return dict(db.execute("SELECT key, value FROM snapshot_info"))
+    except sqlite3.DatabaseError:
+        return {}
+    finally:
+        db.close()
+
+
+def _write_patch(filename: str, schema: str, info: Dict, snapshot: str, previous: str) -> Dict[str, int]:
+    """Places of snapshot that differ from previous, and ids only previous has, into a new patch file."""
+    db = _create(filename, schema, info)
+    try:
+        db.execute("ATTACH DATABASE ? AS snapshot", (snapshot,))
+        db.execute("ATTACH DATABASE ? AS previous", (previous,))
+        content = ", ".join(f"`{column}`" for column in CONTENT_COLUMNS)
+        columns = ", ".join(f"`{column}`" for column in PLACE_COLUMNS)
+        changed = db.execute(
+            f"INSERT INTO places ({columns}) SELECT {columns} FROM snapshot.places WHERE id IN ("
+            f"SELECT id FROM (SELECT {content} FROM snapshot.places EXCEPT SELECT {content} FROM previous.places))"
+        ).rowcount
+        deleted = db.execute(
+            "INSERT INTO deleted_places (id) SELECT id FROM previous.places EXCEPT SELECT id FROM snapshot.places"
+        ).rowcount
+        db.commit()
+        db.execute("DETACH DATABASE snapshot")
+        db.execute("DETACH DATABASE previous")
+    finally:
+        db.close()
+    return {"changed": changed, "deleted": deleted}
+
+
+def apply_patch(db: sqlite3.Connection, patch: str):
+    """
+    Apply a patch file to an open snapshot database and commit, what the app
+    does with its Room database when it downloads patches.
+    """
+    db.execute("ATTACH DATABASE ? AS patch", (patch,))
+    columns = ", ".join(f"`{column}`" for column in PLACE_COLUMNS)
+    db.execute("DELETE FROM places WHERE id IN (SELECT id FROM patch.deleted_places)")
+    db.execute(f"INSERT OR REPLACE INTO places ({columns}) SELECT {columns} FROM patch.places")
+    db.execute("UPDATE snapshot_info SET value = (SELECT value FROM patch.snapshot_info WHERE key = 'version') "
+               "WHERE key = 'version'")
+    db.execute("UPDATE snapshot_info SET value = (SELECT count(*) FROM places) WHERE key = 'places'")
+    db.commit()
+    db.execute("DETACH DATABASE patch")
+
+
+def write_region_snapshot(
+    region: str,
+    rows: Iterable[tuple],
+    out_dir: str,
+    schema: str,
+    keep_patches: int = 4
+) -> SnapshotStats:
+    """
+    Write the snapshot of one region to out_dir/<region>.sqlite from rows of
+    select_room_places.sql, with schema creating the tables. The previous
+    snapshot is replaced only if a place changed, together with a patch from it
+    unless keep_patches is 0. Only the newest keep_patches patches are kept.
+    """
+    start = time.perf_counter()
+    os.makedirs(out_dir, exist_ok=True)
+    filename = os.path.join(out_dir, region + SNAPSHOT_SUFFIX)
+    index_filename = os.path.join(out_dir, region + ".json")
+    previous = read_snapshot_info(filename)
+    version = int(previous.get("version", 0)) + 1
+    # a snapshot of another format is replaced without a patch
+    diff = previous.get("format") == str(SNAPSHOT_FORMAT)
+    generated_at = time.time()
+    info = {
+        "format": SNAPSHOT_FORMAT,
+        "kind": "snapshot",
+        "region": region,
+        "version": version,
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(generated_at)),
+    }
+
+    tmp = filename + ".tmp"
+    patch_tmp = tmp + PATCH_SUFFIX
+    try:
+        db = _create(tmp, schema, info)
+        try:
+            timestamp = int(generated_at * 1000)
+            placeholders = ", ".join("?" * len(PLACE_COLUMNS))
+            cur = db.executemany(
+                f"INSERT INTO places VALUES ({placeholders})", (room_row(row, timestamp) for row in rows)
+            )
+            places = cur.rowcount
+            db.execute("INSERT INTO snapshot_info (key, value) VALUES ('places', ?)", (str(places),))
+            db.commit()
+        finally:
+            db.close()
+
+        counts = {"changed": places, "deleted": 0}
+        patch_size = None
+        if diff:
+            patch_info = dict(info, kind="patch", base_version=version - 1)
+            counts = _write_patch(patch_tmp, schema, patch_info, tmp, filename)
+            if not counts["changed"] and not counts["deleted"]:
+                return SnapshotStats(region, version - 1, places, 0, 0, os.path.getsize(filename), None,
+                                     time.perf_counter() - start)
+            if keep_patches:
+                patch_size = os.path.getsize(patch_tmp)
+                os.replace(patch_tmp, os.path.join(out_dir, f"{region}-{version - 1}-{version}{PATCH_SUFFIX}"))
+        os.replace(tmp, filename)
+    finally:
+        for leftover in (tmp, patch_tmp):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+
+    patches = _prune_patches(out_dir, region, keep_patches)
+    index = dict(info, places=places, file=os.path.basename(filename), size=os.path.getsize(filename),
+                 sha256=_file_hash(filename), patches=patches)
+    with open(index_filename + ".tmp", "w") as f:
+        json.dump(index, f, indent=2)
+    os.replace(index_filename + ".tmp", index_filename)
+    return SnapshotStats(region, version, places, counts["changed"], counts["deleted"], os.path.getsize(filename),
+                         patch_size, time.perf_counter() - start)
+
+
+def _prune_patches(out_dir: str, region: str, keep: int) -> List[Dict]:
+    """Remove all but the newest keep patches of region, return the kept ones oldest first."""
+    found = []
+    prefix = region + "-"
+    for entry in os.listdir(out_dir):
+        if not entry.startswith(prefix) or not entry.endswith(PATCH_SUFFIX):
+            continue
+        versions = entry[len(prefix):-len(PATCH_SUFFIX)].split("-")
+        if len(versions) == 2 and all(v.isdigit() for v in versions):
+            found.append((int(versions[1]), int(versions[0]), entry))
+    found.sort(reverse=True)
+    kept = []
+    for i, (to_version, from_version, entry) in enumerate(found):
+        path = os.path.join(out_dir, entry)
+        if i >= keep:
+            os.remove(path)
+            continue
+        kept.append({"from": from_version, "to": to_version, "file": entry,
+                     "size": os.path.getsize(path), "sha256": _file_hash(path)})
+    return kept[::-1]
@@ -0,0 +1,137 @@
+# Copyright © 2025 Aaro Koinsaari
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Static per-tile place files for the app. Tiles use the grid of the app's TileId
+(TILE_SIZE_DEGREES squares, named "<latIndex>:<lonIndex>" like TileId.toString()),
+and each file holds the place documents places_in_bbox returns, of the places
+TileId.fromLatLng puts in the tile, so a tile can be loaded from static hosting
+instead of the RPC. An index.json per region lists
+every tile with a content hash to use as ETag: tiles whose hash the app already
+has need not be fetched, and unchanged tiles are not rewritten here either.
+"""
+
+import os
+import json
+import time
+import hashlib
+from collections import defaultdict
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+from dump import atomic_output, compressed
+
+# same as TileId.TILE_SIZE_DEGREES in the app
+TILE_SIZE_DEGREES = 0.01
+TILE_EXTENSIONS = {"none": ".json", "gzip": ".json.gz", "zstd": ".json.zst"}
+INDEX_FILE = "index.json"
+
+
+class TileStats(NamedTuple):
+    region: str
+    tiles: int
+    written: int
+    unchanged: int
+    removed: int
+    places: int
+    seconds: float
+
+
+def tile_id(lat: float, lon: float, tile_size: float = TILE_SIZE_DEGREES) -> Tuple[int, int]:
+    """
+    Tile of a coordinate as TileId.fromLatLng gives it. That truncates toward
+    zero, so tile 0 spans both sides of the equator and of the prime meridian.
+    """
+    return int(lat / tile_size), int(lon / tile_size)
+
+
+def tile_name(tile: Tuple[int, int]) -> str:
+    """TileId.toString() of the app."""
+    return f"{tile[0]}:{tile[1]}"
+
+
+def encode_tile(places: List[Dict]) -> bytes:
+    # sorted by id so the same places always give the same bytes and hash
+    places = sorted(places, key=lambda place: place["id"])
+    return json.dumps(places, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def read_index(region_dir: str) -> Dict:
+    try:
+        with open(os.path.join(region_dir, INDEX_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_region_tiles(
+    region: str,
+    places: Iterable[Dict],
+    out_dir: str,
+    tile_size: float = TILE_SIZE_DEGREES,
+    compression: str = "gzip"
+) -> TileStats:
+    """
+    Write the tiles of one region to out_dir/<region>/ from place documents as
+    built by places_in_bbox. Tiles missing from places are removed. Tile files
+    are compressed as a whole, the hashes in the index are of the JSON itself.
+    """
+    start = time.perf_counter()
+    region_dir = os.path.join(out_dir, region)
+    os.makedirs(region_dir, exist_ok=True)
+    extension = TILE_EXTENSIONS[compression]
+
+    tiles = defaultdict(list)
+    count = 0
+    for place in places:
+        tiles[tile_id(place["lat"], place["lon"], tile_size)].append(place)
+        count += 1
+
+    previous = read_index(region_dir)
+    # a different grid or compression makes every earlier file stale
+    reuse = previous.get("tile_size") == tile_size and previous.get("compression") == compression
+    old_tiles = previous.get("tiles", {}) if reuse else {}
+
+    index = {}
+    written = unchanged = 0
+    for tile in sorted(tiles):
+        name = tile_name(tile)
+        data = encode_tile(tiles[tile])
+        etag = hashlib.sha256(data).hexdigest()[:32]
+        index[name] = {"etag": etag, "places": len(tiles[tile])}
+        filename = os.path.join(region_dir, name + extension)
+        if old_tiles.get(name, {}).get("etag") == etag and os.path.exists(filename):
+            unchanged += 1
+            continue
+        with atomic_output(filename) as f, compressed(f, compression) as out:
+            out.write(data)
+        written += 1
+
+    removed = 0
+    for entry in os.listdir(region_dir):
+        name, _, ext = entry.partition(".")
+        if entry != INDEX_FILE and (name not in index or "." + ext != extension):
+            os.remove(os.path.join(region_dir, entry))
+            removed += 1
+
+    with atomic_output(os.path.join(region_dir, INDEX_FILE)) as f:
+        f.write(json.dumps({
+            "region": region,
+            "tile_size": tile_size,
+            "compression": compression,
+            "extension": extension,
+            "generated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "tiles": index,
+        }, separators=(",", ":")).encode())
+
+    return TileStats(region, len(index), written, unchanged, removed, count, time.perf_counter() - start)
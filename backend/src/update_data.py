@@ -13,250 +13,855 @@
 # limitations under the License.
 
 import os
-import requests
-import subprocess
+import sys
 import psycopg
 import argparse
 import time
-from typing import List, Dict
+import cProfile
+import pstats
+import functools
+import tracemalloc
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from array import array
+from datetime import datetime
+from typing import Callable, List, Dict, Iterable, Iterator, NamedTuple, Optional, Tuple, Union
 from dotenv import load_dotenv
-from place import PlaceHandler, Place, TAGS
+from place import LOCATION_INDEXES, PlaceBatch, iter_place_batches
+from replication import iter_changes, read_replication_header
+from download import download, file_md5, read_meta, write_meta
+from pipeline import PIPELINE_MODES, PrefetchedBatches
+from dump import COMPRESSIONS, DUMP_FORMATS, DUMP_TABLES, dump_tables, record_dump
+from tiles import TILE_SIZE_DEGREES
+from exports import export_sqlite, export_tiles
+from cluster import SPATIAL_KEY_COLUMNS, SPATIAL_KEY_MIGRATION, cluster_places
+from queries import load_sql, require_columns
+from metrics import METRICS, Stage, max_rss
+from cache import read_cache_meta, read_place_cache, write_place_cache
 
 load_dotenv(override=True)
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 DATA_DIR = "data"
 os.makedirs(DATA_DIR, exist_ok=True)
+# parsed places per region, reused while the extract and parsing code are unchanged
+CACHE_DIR = os.path.join(DATA_DIR, "cache")
+
+# a local mirror such as benchmarks/serve_pbf.py can stand in for Geofabrik
+GEOFABRIK_URL = os.getenv("GEOFABRIK_URL", "https://download.geofabrik.de").rstrip("/")
 
 REGIONS = [
     {
         "name": "switzerland",
-        "url": "https://download.geofabrik.de/europe/switzerland-latest.osm.pbf"
+        "url": f"{GEOFABRIK_URL}/europe/switzerland-latest.osm.pbf",
+        "replication_url": f"{GEOFABRIK_URL}/europe/switzerland-updates"
     },
     {
         "name": "finland",
-        "url": "https://download.geofabrik.de/europe/finland-latest.osm.pbf"
+        "url": f"{GEOFABRIK_URL}/europe/finland-latest.osm.pbf",
+        "replication_url": f"{GEOFABRIK_URL}/europe/finland-updates"
     }
 ]
 
 
-def download_pbf(region: Dict):
-    """Download OSM PBF file for a region if not already present"""
+def download_pbf(region: Dict, connections: int = 4, force: bool = False) -> Optional[str]:
+    """
+    Download OSM PBF file for a region. A local copy is reused and the download
+    skipped while the extract is unchanged on the server. Returns None if the
+    extract has not changed since it was last imported completely.
+    """
     pbf_filename = os.path.join(DATA_DIR, f"{region['name']}-latest.osm.pbf")
-    
-    if os.path.exists(pbf_filename):
-        print(f"{pbf_filename} already exists, skipping download.")
-        return pbf_filename
+    meta = read_meta(pbf_filename)
+    # without a local copy, only an extract that was fully imported is worth skipping
+    conditional = not force and meta is not None and (os.path.exists(pbf_filename) or meta.get("imported"))
 
     print(f"Downloading {region['name']} PBF file...")
-    r = requests.get(region['url'], stream=True)
-    with open(pbf_filename, 'wb') as f:
-        for chunk in r.iter_content(chunk_size=8192):
-            f.write(chunk)
-    print(f"Download complete for {region['name']}.")
+    with METRICS.stage("download", region['name']) as stage:
+        result = download(region['url'], pbf_filename, connections=connections, conditional=conditional)
+        stage.bytes = result.transferred
+        stage.extra.update(status=result.status, size=result.size, connections=result.connections)
+    if result.status == "not_modified":
+        if os.path.exists(pbf_filename):
+            print(f"{region['name']} extract unchanged, reusing {pbf_filename}.")
+            return pbf_filename
+        print(f"{region['name']} extract unchanged since its last import, skipping.")
+        return None
+
+    print(f"{region['name']} PBF {result.status}: {result.transferred / 1024 / 1024:.1f} MB in "
+          f"{result.seconds:.1f}s ({result.throughput:.1f} MB/s, {result.connections} connections)")
     return pbf_filename
 
 
-def filter_pbf(pbf_filename: str):
-    """Filter PBF file to extract only places with relevant tags"""
-    filtered_filename = pbf_filename.replace('.osm.pbf', '-filtered.osm.pbf')
-    
-    if os.path.exists(filtered_filename):
-        print(f"{filtered_filename} already exists, skipping filtering.")
-        return filtered_filename
-    
-    tags_filter = []
-    for tag_type, vals in TAGS.items():
-        for val in vals:
-            tags_filter.append(f"n/{tag_type}={val}")
+def mark_imported(region: Dict):
+    """Record that the downloaded extract of a region was imported completely."""
+    pbf_filename = os.path.join(DATA_DIR, f"{region['name']}-latest.osm.pbf")
+    meta = read_meta(pbf_filename)
+    if meta is not None:
+        meta["imported"] = True
+        write_meta(pbf_filename, meta)
+
+
+def pbf_source(pbf_filename: str, read_options: Optional[Dict] = None) -> str:
+    """
+    Identify the input of an import: the extract and the options it is read with.
+    A checkpoint is only resumed and a parse cache only used for the same source.
+    The md5 stays the same when an unchanged extract is downloaded again, it is
+    computed here once when the server published none.
+    """
+    meta = read_meta(pbf_filename)
+    md5 = meta.get("md5") if meta else None
+    if not md5:
+        md5 = file_md5(pbf_filename)
+        if meta is not None:
+            meta["md5"] = md5
+            write_meta(pbf_filename, meta)
+    return f"{md5}:{'areas' if (read_options or {}).get('areas') else 'nodes'}"
 
-    filter_cmd = ["osmium", "tags-filter", pbf_filename] + tags_filter + ["-o", filtered_filename]
-    print("Running:", " ".join(filter_cmd))
-    subprocess.run(filter_cmd, check=True)
-    print(f"Filtering complete for {pbf_filename}.")
 
-    print(f"Deleting original PBF file {pbf_filename}")
+def stream_pbf(
+    pbf_filename: str,
+    region_name: str,
+    batch_size: int = 10000,
+    areas: bool = False,
+    location_index: str = "auto",
+    cache: Optional[Dict] = None
+) -> Iterator[PlaceBatch]:
+    """
+    Parse PBF file lazily in batches of at most batch_size places and delete it
+    once read. cache holds the source and replication of write_place_cache.
+    """
+    print(f"Streaming {pbf_filename} in batches of {batch_size}...")
+    batches = iter_place_batches(pbf_filename, region_name, batch_size, areas, location_index)
+    if cache is not None:
+        batches = write_place_cache(
+            batches, CACHE_DIR, region_name, options={"areas": areas, "location_index": location_index}, **cache
+        )
+    yield from batches
+
+    print(f"Deleting PBF file {pbf_filename}")
     os.remove(pbf_filename)
 
-    return filtered_filename
 
+# staging table -> (sql file suffix, postgres types for binary COPY, row generator)
+STAGING_TABLES = {
+    "staging_place": (
+        "place",
+        ["int8", "varchar", "varchar", "float8", "float8", "varchar", "int8"]
+        + ["varchar", "varchar", "text"]
+        + ["varchar"] * 7
+        + ["varchar"] * 7 + ["bool"]
+        + ["varchar"] * 4,
+        PlaceBatch.staging_rows
+    ),
+}
 
-def parse_filtered_pbf(filtered_filename: str, region_name: str) -> List[Place]:
-    """Parse filtered PBF file and extract places with additional region info"""
-    handler = PlaceHandler(region_name)
-    handler.apply_file(filtered_filename)
-    print(f"Parsing {filtered_filename}...")
 
-    for place in handler.places:
-        place.region = region_name
+def stage_places(
+    cur,
+    places: PlaceBatch,
+    method: str = "copy",
+    copy_format: str = "text",
+    stats: Dict[str, List[float]] = None
+) -> Dict[str, List[float]]:
+    """
+    Fill the staging tables from a batch of places. Rows are generated lazily
+    from the batch columns, so no intermediate lists are built. method is either "copy" (streamed
+    COPY FROM STDIN in copy_format) or "executemany" (parameterized INSERTs,
+    kept for comparison).
+    Returns stats as {table: [rows, seconds]}, added onto the given stats if any.
+    """
+    if stats is None:
+        stats = {table: [0, 0.0] for table in STAGING_TABLES}
+    for table, (suffix, types, rows) in STAGING_TABLES.items():
+        table_start = time.time()
+        count = 0
+        if method == "copy":
+            with cur.copy(load_sql(f"operations/staging/copy_staging_{suffix}.sql", format=copy_format)) as copy:
+                if copy_format == "binary":
+                    copy.set_types(types)
+                for row in rows(places):
+                    copy.write_row(row)
+                    count += 1
+        elif method == "executemany":
+            batch = list(rows(places))
+            cur.executemany(load_sql(f"operations/staging/insert_staging_{suffix}.sql"), batch)
+            count = len(batch)
+        else:
+            raise ValueError(f"Unknown staging method: {method}")
 
-    print(f"Deleting filtered PBF file {filtered_filename}")
-    os.remove(filtered_filename)
+        stats[table][0] += count
+        stats[table][1] += time.time() - table_start
+    return stats
 
-    return handler.places
 
+# merged table -> merge sql. The merges skip rows whose values did not change and
+# return (inserted, updated) counts. places goes first, the child tables then read
+# place_id from staging_resolved, built once by resolve_place_ids.sql in between
+PLACES_MERGE = "operations/insert_places.sql"
+CHILD_MERGES = {
+    "general_accessibility": "operations/insert_ga.sql",
+    "entrance_accessibility": "operations/insert_ea.sql",
+    "restroom_accessibility": "operations/insert_ra.sql",
+    "contact": "operations/insert_contact.sql",
+}
+# refreshed by merge_staging, added to older databases by PLACE_DOCUMENTS_MIGRATION
+PLACE_DOCUMENT_COLUMNS = {
+    "place_documents": ("place_id", "geom", "doc", "lat", "lon", "cell_x", "cell_y", "accessibility")
+}
+PLACE_DOCUMENTS_MIGRATION = "003_place_documents.sql"
+REPLICATION_COLUMNS = {"replication_state": ("region", "sequence", "timestamp")}
+REPLICATION_MIGRATION = "004_replication_state.sql"
+CHECKPOINT_COLUMNS = {"seed_checkpoint": ("region", "source", "places", "chunks")}
+CHECKPOINT_MIGRATION = "005_seed_checkpoint.sql"
 
-def load_sql(filepath, **kwargs):
-    """Load SQL from file and format with provided parameters"""
-    sql_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'sql')
-    with open(os.path.join(sql_dir, filepath), 'r') as f:
-        sql = f.read()
-    return sql.format(**kwargs)
 
+def print_staging_stats(stats: Dict[str, List[float]]):
+    for table, (count, seconds) in stats.items():
+        rate = count / seconds if seconds > 0 else float("inf")
+        print(f"  {table}: {count} rows in {seconds:.2f}s ({rate:.1f} rows/s)")
 
-def seed_places(places: List[Place], limit: int = None, overwrite: bool = False):
+
+def chunked(batches: Iterable[PlaceBatch], chunk_size: int = None, skip: int = 0) -> Iterator[Tuple[PlaceBatch, bool]]:
     """
-    Seed places to database using staging tables.
-    If overwrite is False, places with user_modified flag will not be updated.
-    Uses a single transaction for all operations.
+    Yield (batch, ends_chunk) pairs, with batches cut where a chunk of chunk_size
+    places ends, so chunks stay the same size whatever the parser's batch size.
+    The first skip places are left out. Without chunk_size no chunk ever ends.
     """
-    if limit:
-        places = places[:limit]
-    
-    if not places:
-        print("No places to insert.")
-        return
-    
-    total_places = len(places)
-    start_time = time.time()
-    
-    print(f"Preparing to insert {total_places} places for region {places[0].region}...")
-    
-    # using these as the last check to make sure the values are valid and seeding
-    # does not rollback because of one invalid value
-    valid_accessibility_values = {
-        "FULLY_ACCESSIBLE", "PARTIALLY_ACCESSIBLE", "NOT_ACCESSIBLE", None
+    in_chunk = 0
+    for batch in batches:
+        if skip:
+            skipped = min(skip, len(batch))
+            batch = batch.skip(skipped)
+            skip -= skipped
+        while len(batch):
+            if not chunk_size:
+                yield batch, False
+                break
+            piece = batch.head(chunk_size - in_chunk)
+            batch = batch.skip(len(piece))
+            in_chunk += len(piece)
+            ends_chunk = in_chunk == chunk_size
+            if ends_chunk:
+                in_chunk = 0
+            yield piece, ends_chunk
+
+
+def merge_staging(cur, staged: int, overwrite_clause: str, merge_counts: Dict[str, List[int]]) -> int:
+    """
+    Merge the staging tables into the main tables and rebuild the place_documents
+    of every place the merges wrote. The inserted, updated and skipped row counts
+    are added onto merge_counts. Returns the number of documents refreshed.
+    """
+    cur.execute(load_sql("operations/staging/analyze_staging.sql"))
+    cur.execute(load_sql("operations/documents/defer_document_refresh.sql"))
+
+    print("Updating places...")
+    cur.execute(load_sql(PLACES_MERGE))
+    counts = {"places": cur.fetchone()}
+    cur.execute(load_sql("operations/staging/resolve_place_ids.sql"))
+
+    for table, sql_file in CHILD_MERGES.items():
+        print(f"Updating {table}...")
+        cur.execute(load_sql(sql_file, overwrite=overwrite_clause))
+        counts[table] = cur.fetchone()
+
+    for table, (inserted, updated) in counts.items():
+        total = merge_counts.setdefault(table, [0, 0, 0])
+        total[0] += inserted
+        total[1] += updated
+        total[2] += staged - inserted - updated
+
+    print("Refreshing place documents...")
+    cur.execute(load_sql("operations/documents/refresh_place_documents.sql"))
+    return cur.rowcount
+
+
+class SeedProgress:
+    """Counts of one seed_places call, updated as batches are staged and merged."""
+    def __init__(self, resumed: int = 0, chunks: int = 0):
+        # places and chunks committed by an earlier run on the same input
+        self.resumed = resumed
+        self.chunks = chunks
+        self.places = 0
+        # places staged since the last commit
+        self.staged = 0
+        self.documents = 0
+        self.staging_stats: Optional[Dict[str, List[float]]] = None
+        self.merge_counts: Dict[str, List[int]] = {}
+        self.merge_seconds = 0.0
+
+
+def prepare_seed(cur, region_name: str, checkpoint: Optional[str]) -> SeedProgress:
+    """Check the schema, create the staging tables and resume from the checkpoint of the region if it is for checkpoint."""
+    require_columns(cur, SPATIAL_KEY_COLUMNS, SPATIAL_KEY_MIGRATION)
+    require_columns(cur, PLACE_DOCUMENT_COLUMNS, PLACE_DOCUMENTS_MIGRATION)
+
+    print("Creating staging tables...")
+    cur.execute(load_sql("operations/staging/create_staging_tables.sql"))
+    if not checkpoint:
+        return SeedProgress()
+    require_columns(cur, CHECKPOINT_COLUMNS, CHECKPOINT_MIGRATION)
+    cur.execute(load_sql("operations/checkpoint/select_seed_checkpoint.sql"), (region_name,))
+    row = cur.fetchone()
+    if not row or row[0] != checkpoint:
+        return SeedProgress()
+    _, resumed, chunks = row
+    print(f"Resuming after {chunks} committed chunks ({resumed} places)")
+    return SeedProgress(resumed, chunks)
+
+
+def copy_osm_ids(cur, sql_file: str, osm_ids: Iterable[int], copy_format: str = "text"):
+    """COPY osm_ids into the single column of the temp table that sql_file copies into."""
+    with cur.copy(load_sql(sql_file, format=copy_format)) as copy:
+        if copy_format == "binary":
+            copy.set_types(["int8"])
+        for osm_id in osm_ids:
+            copy.write_row((osm_id,))
+
+
+def merge_chunk(conn, cur, region_name: str, progress: SeedProgress, overwrite_clause: str,
+                checkpoint: Optional[str]):
+    """Merge the places staged since the last commit and commit them as one chunk."""
+    merge_start = time.time()
+    progress.documents += merge_staging(cur, progress.staged, overwrite_clause, progress.merge_counts)
+    progress.chunks += 1
+    if checkpoint:
+        cur.execute(load_sql("operations/checkpoint/upsert_seed_checkpoint.sql"),
+                    (region_name, checkpoint, progress.resumed + progress.places, progress.chunks))
+    conn.commit()
+    cur.execute(load_sql("operations/staging/clear_staging_tables.sql"))
+    progress.merge_seconds += time.time() - merge_start
+    print(f"Chunk {progress.chunks} committed, {progress.resumed + progress.places} places")
+    progress.staged = 0
+
+
+def store_replication_state(cur, region_name: str, replication_state: Tuple[int, Optional[datetime]]):
+    sequence, timestamp = replication_state
+    print(f"Storing replication state: sequence {sequence} ({timestamp})")
+    cur.execute(load_sql("operations/replication/upsert_replication_state.sql"), (region_name, sequence, timestamp))
+
+
+def print_merge_stats(progress: SeedProgress):
+    print(f"Merge completed in {progress.merge_seconds:.2f}s")
+    for table, (inserted, updated, skipped) in progress.merge_counts.items():
+        print(f"  {table}: {inserted} inserted, {updated} updated, {skipped} unchanged or skipped")
+    print(f"  place_documents: {progress.documents} refreshed")
+
+
+def record_seed_stage(
+    stage: Stage,
+    progress: SeedProgress,
+    staging_seconds: float,
+    chunk_size: Optional[int],
+    deleted: Optional[int]
+):
+    """Add the row counts and timings of a finished seed to its stage."""
+    stage.rows = {
+        table: {"inserted": inserted, "updated": updated, "skipped": skipped}
+        for table, (inserted, updated, skipped) in progress.merge_counts.items()
     }
-    
-    conn = psycopg.connect(DATABASE_URL)
-    try:
-        with conn.cursor() as cur:
-            print("Creating staging tables...")
-            cur.execute(load_sql("operations/staging/create_staging_tables.sql"))
-            
-            # Prepare data for bulk insert
-            print("Preparing data for bulk insert...")
-            places_data = []
-            general_data = []
-            entrance_data = []
-            restroom_data = []
-            contact_data = []
-            
-            for p in places:
-                places_data.append((
-                    p.osm_id,
-                    p.name,
-                    p.category,
-                    p.lat,
-                    p.lon,
-                    p.region
-                ))
-                
-                ga = p.general_accessibility
-                general_data.append((
-                    p.osm_id,
-                    ga.get("accessibility") if ga.get("accessibility") in valid_accessibility_values else None,
-                    ga.get("indoor_accessibility") if ga.get("indoor_accessibility") in valid_accessibility_values else None,
-                    ga.get("additional_info")[:1000] if ga.get("additional_info") else None
-                ))
-                
-                ea = p.entrance_accessibility
-                entrance_data.append((
-                    p.osm_id,
-                    ea.get("accessibility") if ea.get("accessibility") in valid_accessibility_values else None,
-                    ea.get("step_count") if ea.get("step_count") in valid_accessibility_values else None,
-                    ea.get("step_height")if ea.get("step_height") in valid_accessibility_values else None,
-                    ea.get("ramp") if ea.get("ramp") in valid_accessibility_values else None,
-                    ea.get("lift") if ea.get("lift") in valid_accessibility_values else None,
-                    ea.get("entrance_width") if ea.get("entrance_width") in valid_accessibility_values else None,
-                    ea.get("door_type")
-                ))
-                
-                ra = p.restroom_accessibility
-                restroom_data.append((
-                    p.osm_id,
-                    ra.get("accessibility") if ra.get("accessibility") in valid_accessibility_values else None,
-                    ra.get("door_width") if ra.get("door_width") in valid_accessibility_values else None,
-                    ra.get("room_maneuver") if ra.get("room_maneuver") in valid_accessibility_values else None,
-                    ra.get("grab_rails") if ra.get("grab_rails") in valid_accessibility_values else None,
-                    ra.get("sink") if ra.get("sink") in valid_accessibility_values else None,
-                    ra.get("toilet_seat") if ra.get("toilet_seat") in valid_accessibility_values else None,
-                    ra.get("emergency_alarm") if ra.get("emergency_alarm") in valid_accessibility_values else None,
-                    ra.get("euro_key")
-                ))
-                
-                contact_data.append((
-                    p.osm_id,
-                    p.contact.get("phone"),
-                    p.contact.get("website"),
-                    p.contact.get("email"),
-                    p.contact.get("address")
-                ))
-            
-            print("Bulk inserting into staging tables...")
-            stage_start = time.time()
-            
-            cur.executemany(load_sql("operations/staging/insert_staging_places.sql"), places_data)
-            cur.executemany(load_sql("operations/staging/insert_staging_ga.sql"), general_data)
-            cur.executemany(load_sql("operations/staging/insert_staging_ea.sql"), entrance_data)
-            cur.executemany(load_sql("operations/staging/insert_staging_ra.sql"), restroom_data)
-            cur.executemany(load_sql("operations/staging/insert_staging_contact.sql"), contact_data)
-            
-            stage_time = time.time() - stage_start
-            print(f"Staging tables populated in {stage_time:.2f}s")
-            
-            # Merge from staging tables to main tables
-            print("Merging data from staging tables to main tables...")
-            merge_start = time.time()
-            
-            print("Updating places...")
-            cur.execute(load_sql("operations/insert_places.sql"))
-            overwrite_clause = "TRUE" if overwrite else "FALSE"
-            
-            print("Updating general accessibility...")
-            cur.execute(load_sql("operations/insert_ga.sql", overwrite=overwrite_clause))
-            
-            print("Updating entrance accessibility...")
-            cur.execute(load_sql("operations/insert_ea.sql", overwrite=overwrite_clause))
-            
-            print("Updating restroom accessibility...")
-            cur.execute(load_sql("operations/insert_ra.sql", overwrite=overwrite_clause))
-            
-            print("Updating contact information...")
-            cur.execute(load_sql("operations/insert_contact.sql"))
-            
-            merge_time = time.time() - merge_start
-            print(f"Merge completed in {merge_time:.2f}s")
-            
+    stage.rows["place_documents"] = {"refreshed": progress.documents}
+    if deleted is not None:
+        stage.rows.setdefault("places", {})["deleted"] = deleted
+    stage.extra.update(staging_seconds=round(staging_seconds, 3), merge_seconds=round(progress.merge_seconds, 3))
+    if chunk_size:
+        stage.extra.update(chunks=progress.chunks + 1 if progress.staged else progress.chunks,
+                           resumed_places=progress.resumed)
+
+
+def stage_batches(
+    cur,
+    batches: Iterable[PlaceBatch],
+    progress: SeedProgress,
+    limit: Optional[int],
+    chunk_size: Optional[int],
+    staging_method: str,
+    copy_format: str,
+    merge_chunk: Callable[[], None]
+):
+    """Stage batches after the resumed places, calling merge_chunk whenever a chunk is complete."""
+    label = f"COPY ({copy_format})" if staging_method == "copy" else staging_method
+    print(f"Loading staging tables with {label}...")
+    for batch, ends_chunk in chunked(batches, chunk_size, progress.resumed):
+        if limit:
+            batch = batch.head(limit - progress.places)
+        progress.staging_stats = stage_places(cur, batch, staging_method, copy_format, progress.staging_stats)
+        progress.places += len(batch)
+        progress.staged += len(batch)
+        if limit and progress.places >= limit:
+            break
+        if ends_chunk:
+            merge_chunk()
+
+
+def finish_seed(
+    cur,
+    region_name: str,
+    progress: SeedProgress,
+    overwrite_clause: str,
+    deleted_osm_ids: Optional[array],
+    replication_state: Optional[Tuple[int, Optional[datetime]]],
+    checkpoint: Optional[str]
+) -> Optional[int]:
+    """
+    Merge what is still staged, delete the places in deleted_osm_ids and store
+    replication_state, all in the open transaction. Returns the places deleted.
+    """
+    if progress.staged or not progress.chunks:
+        progress.documents += merge_staging(cur, progress.staged, overwrite_clause, progress.merge_counts)
+    deleted = None
+    if deleted_osm_ids:
+        print(f"Deleting places among {len(deleted_osm_ids)} removed or retagged nodes...")
+        cur.execute(load_sql("operations/delete_places.sql", overwrite=overwrite_clause))
+        deleted = cur.rowcount
+        print(f"{deleted} places deleted")
+    if replication_state:
+        store_replication_state(cur, region_name, replication_state)
+    if checkpoint:
+        cur.execute(load_sql("operations/checkpoint/delete_seed_checkpoint.sql"), (region_name,))
+    return deleted
+
+
+def seed_places(
+    batches: Iterable[PlaceBatch],
+    region_name: str,
+    limit: int = None,
+    overwrite: bool = False,
+    staging_method: str = "copy",
+    copy_format: str = "text",
+    deleted_osm_ids: array = None,
+    replication_state: Tuple[int, Optional[datetime]] = None,
+    chunk_size: int = None,
+    checkpoint: str = None
+) -> int:
+    """
+    Seed places to database using staging tables, one batch in memory at a time.
+    If overwrite is False, places with user_modified flag will not be updated or deleted.
+    Places in deleted_osm_ids are removed and replication_state is stored with the
+    last merge. Uses a single transaction, or one per chunk_size places, resumable
+    with checkpoint identifying the input. Returns the number of places seeded.
+    """
+    with METRICS.stage("seed", region_name) as seed_stage:
+        start_time = time.time()
+        print(f"Preparing to insert places for region {region_name}...")
+        overwrite_clause = "TRUE" if overwrite else "FALSE"
+
+        conn = psycopg.connect(DATABASE_URL)
+        try:
+            with conn.cursor() as cur:
+                progress = prepare_seed(cur, region_name, checkpoint)
+                if replication_state:
+                    require_columns(cur, REPLICATION_COLUMNS, REPLICATION_MIGRATION)
+                stage_start = time.time()
+                stage_batches(
+                    cur, batches, progress, limit, chunk_size, staging_method, copy_format,
+                    lambda: merge_chunk(conn, cur, region_name, progress, overwrite_clause, checkpoint)
+                )
+                if deleted_osm_ids:
+                    copy_osm_ids(cur, "operations/staging/copy_staging_deleted.sql", deleted_osm_ids, copy_format)
+                if not progress.places and not deleted_osm_ids and not progress.resumed:
+                    print("No places to insert.")
+                    conn.rollback()
+                    return 0
+                stage_time = time.time() - stage_start - progress.merge_seconds
+                print(f"Staging tables populated with {progress.places} places in {stage_time:.2f}s")
+                if progress.staging_stats:
+                    print_staging_stats(progress.staging_stats)
+
+                print("Merging data from staging tables to main tables...")
+                merge_start = time.time()
+                deleted = finish_seed(cur, region_name, progress, overwrite_clause, deleted_osm_ids,
+                                      replication_state, checkpoint)
+                progress.merge_seconds += time.time() - merge_start
+                print_merge_stats(progress)
+                record_seed_stage(seed_stage, progress, stage_time, chunk_size, deleted)
+
+                conn.commit()
+                print("Committing all changes.")
+
+        except Exception as e:
+            conn.rollback()
+            if chunk_size:
+                print(f"Error occurred, rolling back the changes since the last committed chunk: {str(e)}")
+            else:
+                print(f"Error occurred, rolling back all changes: {str(e)}")
+            raise
+        finally:
+            conn.close()
+
+        total_time = time.time() - start_time
+        print(f"Seeding done. {progress.places} places seeded for region {region_name} in {total_time:.2f}s "
+              f"({progress.places / total_time:.1f} places/s)")
+        seed_stage.objects = progress.places
+    return progress.places
+
+
+class SeenPlaces:
+    """osm_ids of the batches of a full import, and whether all of them were read."""
+    def __init__(self, areas: bool = True):
+        self.osm_ids = array("q")
+        # with areas false the extract was read without ways and relations
+        self.areas = areas
+        self.complete = False
+
+    def track(self, batches: Iterable[PlaceBatch]) -> Iterator[PlaceBatch]:
+        for batch in batches:
+            self.osm_ids.extend(batch.osm_id)
+            yield batch
+        self.complete = True
+
+
+def sweep_missing_places(cur, region_name: str, areas: bool, overwrite_clause: str, max_share: float) -> Optional[int]:
+    """
+    Delete the places of a region that are not in seen_osm_ids. Nothing is deleted
+    if that would be more than max_share of the region's places, which points to
+    a truncated or wrong extract rather than deletions in OSM. Returns the number
+    of places deleted, or None if the sweep was skipped.
+    """
+    areas_clause = "TRUE" if areas else "FALSE"
+    cur.execute(load_sql("operations/sweep/analyze_seen_places.sql"))
+    cur.execute(load_sql("operations/sweep/find_missing_places.sql", areas=areas_clause, overwrite=overwrite_clause),
+                (region_name,))
+    missing = cur.rowcount
+    cur.execute(load_sql("operations/sweep/count_region_places.sql", areas=areas_clause), (region_name,))
+    existing = cur.fetchone()[0]
+    if existing and missing > max_share * existing:
+        print(f"WARNING: {missing} of {existing} places of {region_name} are missing from the extract, more than "
+              f"the sweep threshold of {max_share:.0%}. Skipping the sweep, check the extract or raise --sweep-max-share")
+        return None
+    cur.execute(load_sql("operations/sweep/delete_missing_places.sql"))
+    return cur.rowcount
+
+
+def sweep_region(
+    region_name: str,
+    seen: SeenPlaces,
+    max_share: float,
+    overwrite: bool = False,
+    copy_format: str = "text"
+) -> Optional[int]:
+    """
+    Delete the places of a region missing from a complete full import, whose
+    osm_ids are in seen. Returns the number deleted, or None if the sweep was skipped.
+    """
+    with METRICS.stage("sweep", region_name) as stage:
+        print(f"Sweeping places of {region_name} missing from the extract...")
+        overwrite_clause = "TRUE" if overwrite else "FALSE"
+        with psycopg.connect(DATABASE_URL) as conn:
+            with conn.cursor() as cur:
+                cur.execute(load_sql("operations/sweep/create_seen_places.sql"))
+                copy_osm_ids(cur, "operations/sweep/copy_seen_places.sql", seen.osm_ids, copy_format)
+                swept = sweep_missing_places(cur, region_name, seen.areas, overwrite_clause, max_share)
             conn.commit()
-            print("Committing all changes.")
-            
-    except Exception as e:
-        conn.rollback()
-        print(f"Error occurred, rolling back all changes: {str(e)}")
-        raise
+        stage.objects = len(seen.osm_ids)
+        if swept is None:
+            stage.extra["skipped"] = True
+        else:
+            stage.rows = {"places": {"deleted": swept}}
+            print(f"{swept} places deleted")
+    return swept
+
+
+def start_parse(
+    pbf_filename: str,
+    region_name: str,
+    batch_size: int,
+    read_options: Dict,
+    pipeline: str = "off",
+    queue_size: int = 4
+) -> Iterable[PlaceBatch]:
+    """Batches of stream_pbf, parsed ahead in a producer unless pipeline is "off"."""
+    if pipeline == "off":
+        return stream_pbf(pbf_filename, region_name, batch_size, **read_options)
+    batches = PrefetchedBatches(
+        functools.partial(stream_pbf, **read_options), (pbf_filename, region_name, batch_size), queue_size, pipeline
+    )
+    batches.start()
+    return batches
+
+
+def seed_parsed(
+    region_name: str,
+    batches: Iterable[PlaceBatch],
+    size: int,
+    seen: Optional[SeenPlaces] = None,
+    **seed_options
+) -> int:
+    """Seed the batches of start_parse, tracked in seen, and record the parse stage of the size bytes extract."""
+    # parsing interleaves with seeding, so its time is what the batches took to arrive
+    parse_stage = Stage("parse", region_name)
+    parse_stage.bytes = size
+    prefetched = isinstance(batches, PrefetchedBatches)
+    parse_stage.extra["pipeline"] = batches.mode if prefetched else "off"
+    timed = batches if prefetched else METRICS.timed(batches, parse_stage)
+    try:
+        seeded = seed_places(seen.track(timed) if seen else timed, region_name, **seed_options)
     finally:
-        conn.close()
-    
-    total_time = time.time() - start_time
-    print(f"Seeding done. {total_places} places seeded for region {places[0].region} in {total_time:.2f}s ({total_places/total_time:.1f} places/s)")
-
-
-def dump_tables():
-    tables = [
-        "places",
-        "general_accessibility",
-        "entrance_accessibility",
-        "restroom_accessibility",
-        "contact"
-    ]
-    for tbl in tables:
-        out_file = os.path.join(DATA_DIR, f"{tbl}.csv")
-        print(f"Dumping {tbl} → {out_file}")
-        subprocess.run([
-            "psql", DATABASE_URL,
-            "-c", f"\\COPY public.{tbl} TO STDOUT WITH CSV HEADER"
-        ], stdout=open(out_file, "w"), check=True)
+        if prefetched:
+            batches.close()
+            batches.print_report()
+            if batches.parse_times:
+                parse_stage.seconds = batches.parse_times.busy
+                parse_stage.extra["blocked_seconds"] = round(batches.parse_times.idle, 3)
+            if batches.mode == "process":
+                parse_stage.peak_rss = max_rss(children=True)
+    parse_stage.objects = seeded
+    METRICS.record(parse_stage)
+    return seeded
+
+
+def seed_cached_region(
+    region: Dict,
+    meta: Dict,
+    record_replication: bool = True,
+    seen: Optional[SeenPlaces] = None,
+    **seed_options
+) -> int:
+    """
+    Seed a region from its parse cache, described by meta, instead of parsing its
+    extract. The replication sequence and checkpoint are those of the cached extract.
+    """
+    print(f"Seeding {meta['places']} places of {region['name']} from the parse cache of {meta['created_at']}")
+    replication_state = None
+    if record_replication and meta.get("replication"):
+        sequence, timestamp = meta["replication"]
+        replication_state = (sequence, datetime.fromisoformat(timestamp) if timestamp else None)
+    if record_replication and seed_options.get("chunk_size"):
+        seed_options["checkpoint"] = meta["source"]
+    if seen:
+        # the cached parse may have been read with other options than this run
+        seen.areas = meta["options"].get("areas", False)
+    stage = Stage("cache", region['name'])
+    stage.bytes = meta["size"]
+    batches = METRICS.timed(read_place_cache(CACHE_DIR, region['name']), stage)
+    seeded = seed_places(
+        seen.track(batches) if seen else batches,
+        region['name'],
+        replication_state=replication_state,
+        **seed_options
+    )
+    stage.objects = seeded
+    METRICS.record(stage)
+    return seeded
+
+
+def import_region(
+    region: Dict,
+    batch_size: int,
+    record_replication: bool = True,
+    download_options: Optional[Dict] = None,
+    read_options: Optional[Dict] = None,
+    pipeline: str = "off",
+    queue_size: int = 4,
+    cache: bool = True,
+    from_cache: bool = False,
+    sweep_max_share: Optional[float] = None,
+    **seed_options
+) -> int:
+    """
+    Full import of one region: download, then seed parsed batches as they stream in.
+    If record_replication is set, the replication sequence from the PBF header is
+    stored for later incremental updates. With cache set, parses are cached in CACHE_DIR.
+    With sweep_max_share set, a complete import is followed by sweep_region.
+    """
+    read_options = read_options or {}
+    seen = SeenPlaces(read_options.get("areas", True)) if sweep_max_share is not None else None
+    seeded = seed_region(region, batch_size, record_replication, download_options, read_options, pipeline,
+                         queue_size, cache, from_cache, seen, **seed_options)
+    if seen and seen.complete:
+        sweep_region(region['name'], seen, sweep_max_share, seed_options.get("overwrite", False),
+                     seed_options.get("copy_format", "text"))
+    return seeded
+
+
+def seed_region(
+    region: Dict,
+    batch_size: int,
+    record_replication: bool,
+    download_options: Optional[Dict],
+    read_options: Dict,
+    pipeline: str,
+    queue_size: int,
+    cache: bool,
+    from_cache: bool,
+    seen: Optional[SeenPlaces],
+    **seed_options
+) -> int:
+    """Seed a region from its parse cache or its downloaded extract, for import_region."""
+    if from_cache:
+        meta = read_cache_meta(CACHE_DIR, region['name'])
+        if meta is not None:
+            return seed_cached_region(region, meta, record_replication, seen, **seed_options)
+        print(f"No parse cache of {region['name']}, importing the extract")
+    pbf_filename = download_pbf(region, **(download_options or {}))
+    if pbf_filename is None:
+        return 0
+    source = pbf_source(pbf_filename, read_options) if cache or seed_options.get("chunk_size") else None
+    meta = read_cache_meta(CACHE_DIR, region['name']) if cache else None
+    if meta is not None and meta["source"] == source:
+        print(f"{region['name']} was parsed from this extract before, deleting PBF file {pbf_filename}")
+        os.remove(pbf_filename)
+        seeded = seed_cached_region(region, meta, record_replication, seen, **seed_options)
+        if record_replication:
+            mark_imported(region)
+        return seeded
+    header = read_replication_header(pbf_filename)
+    replication_state = header if record_replication else None
+    if record_replication and seed_options.get("chunk_size"):
+        seed_options["checkpoint"] = source
+    if cache:
+        read_options = dict(read_options, cache={"source": source, "replication": header})
+    size = os.path.getsize(pbf_filename)
+    batches = start_parse(pbf_filename, region['name'], batch_size, read_options, pipeline, queue_size)
+    seeded = seed_parsed(region['name'], batches, size, seen, replication_state=replication_state, **seed_options)
+    if record_replication:
+        mark_imported(region)
+    return seeded
+
+
+def load_replication_state(region_name: str) -> Optional[int]:
+    """Return the last applied replication sequence of a region, or None if unknown."""
+    with psycopg.connect(DATABASE_URL) as conn:
+        require_columns(conn, REPLICATION_COLUMNS, REPLICATION_MIGRATION)
+        row = conn.execute(load_sql("operations/replication/select_replication_state.sql"), (region_name,)).fetchone()
+    return row[0] if row else None
+
+
+def update_region_incremental(region: Dict, replication_url: str, max_diff_size: int, **seed_options) -> Optional[int]:
+    """
+    Apply OSM change files published after the stored replication sequence of a region.
+    Returns the number of places seeded, or None if the region needs a full import first.
+    """
+    sequence = load_replication_state(region['name'])
+    if sequence is None:
+        return None
+
+    print(f"Applying changes for {region['name']} after sequence {sequence} from {replication_url}")
+    total_places = 0
+    for changes in iter_changes(replication_url, region['name'], sequence, max_diff_size):
+        print(f"Sequence {changes.sequence}/{changes.newest}: {len(changes.places)} created or modified places, "
+              f"{len(changes.deleted_osm_ids)} deleted or untagged nodes")
+        total_places += seed_places(
+            [changes.places],
+            region['name'],
+            deleted_osm_ids=changes.deleted_osm_ids,
+            replication_state=(changes.sequence, changes.timestamp),
+            **seed_options
+        )
+    print(f"Region {region['name']} is up to date.")
+    return total_places
+
+
+class ParseJob(NamedTuple):
+    """A region being parsed by run_pipeline."""
+    batches: Iterable[PlaceBatch]
+    size: int
+    source: Optional[str]
+    replication: Optional[tuple]
+
+
+def run_pipeline(
+    regions: List[Dict],
+    workers: int,
+    batch_size: int,
+    record_replication: bool = True,
+    download_options: Optional[Dict] = None,
+    read_options: Optional[Dict] = None,
+    pipeline: str = "process",
+    queue_size: int = 4,
+    cache: bool = True,
+    from_cache: bool = False,
+    sweep_max_share: Optional[float] = None,
+    **seed_options
+) -> int:
+    """
+    Download regions in a background thread and parse up to workers of them at a
+    time in producers of the pipeline mode, while this process seeds them in order.
+    With sweep_max_share set, each complete import is followed by sweep_region.
+    """
+    total_places = 0
+    read_options = read_options or {}
+    # a region holds a slot from the start of its parse until it is seeded
+    slots = threading.Semaphore(workers)
+    stopping = threading.Event()
+
+    def fetch(region: Dict) -> Union[None, Dict, ParseJob]:
+        """Download a region and start its parse, or return its cache metadata when it is cached."""
+        if from_cache:
+            meta = read_cache_meta(CACHE_DIR, region['name'])
+            if meta is not None:
+                return meta
+            print(f"No parse cache of {region['name']}, importing the extract")
+        pbf_filename = download_pbf(region, **(download_options or {}))
+        if pbf_filename is None:
+            return None
+        source = pbf_source(pbf_filename, read_options) if cache or seed_options.get("chunk_size") else None
+        meta = read_cache_meta(CACHE_DIR, region['name']) if cache else None
+        if meta is not None and meta["source"] == source:
+            print(f"{region['name']} was parsed from this extract before, deleting PBF file {pbf_filename}")
+            os.remove(pbf_filename)
+            # the downloaded extract gets marked as imported once seeded
+            return dict(meta, downloaded=True)
+        header = read_replication_header(pbf_filename)
+        options = dict(read_options, cache={"source": source, "replication": header}) if cache else read_options
+        slots.acquire()
+        if stopping.is_set():
+            return None
+        print(f"Download finished for {region['name']}, parsing")
+        size = os.path.getsize(pbf_filename)
+        batches = start_parse(pbf_filename, region['name'], batch_size, options, pipeline, queue_size)
+        return ParseJob(batches, size, source, header)
+
+    with ThreadPoolExecutor(max_workers=1) as downloader:
+        futures = [downloader.submit(fetch, region) for region in regions]
+        try:
+            for region, future in zip(regions, futures):
+                job = future.result()
+                if job is None:
+                    continue
+                seen = SeenPlaces(read_options.get("areas", True)) if sweep_max_share is not None else None
+                if isinstance(job, dict):
+                    total_places += seed_cached_region(region, job, record_replication, seen, **seed_options)
+                    if record_replication and job.get("downloaded"):
+                        mark_imported(region)
+                else:
+                    try:
+                        total_places += seed_parsed(
+                            region['name'],
+                            job.batches,
+                            job.size,
+                            seen,
+                            replication_state=job.replication if record_replication else None,
+                            checkpoint=job.source if record_replication and seed_options.get("chunk_size") else None,
+                            **seed_options
+                        )
+                    finally:
+                        slots.release()
+                    if record_replication:
+                        mark_imported(region)
+                if seen and seen.complete:
+                    sweep_region(region['name'], seen, sweep_max_share, seed_options.get("overwrite", False),
+                                 seed_options.get("copy_format", "text"))
+        except BaseException:
+            stopping.set()
+            for future in futures:
+                future.cancel()
+            # unblock a download waiting for a slot, then stop the parses already started
+            for _ in futures:
+                slots.release()
+            downloader.shutdown(wait=True)
+            for future in futures:
+                if future.done() and not future.cancelled() and future.exception() is None:
+                    job = future.result()
+                    if isinstance(job, ParseJob) and isinstance(job.batches, PrefetchedBatches):
+                        job.batches.close()
+            raise
+    return total_places
+
+
+# stack depth kept per allocation with --trace-memory, and functions listed with --profile
+TRACE_FRAMES = 10
+PROFILE_TOP = 30
 
 
 def main():
@@ -264,44 +869,223 @@ def main():
     parser.add_argument('--region', help='Process only specific region')
     parser.add_argument('--overwrite', action='store_true', help='Overwrite all places, even user-modified ones')
     parser.add_argument('--test', action='store_true', help='Test mode: only process 100 places')
+    parser.add_argument('--staging-method', choices=['copy', 'executemany'], default='copy',
+                        help='How staging tables are filled (default: copy)')
+    parser.add_argument('--copy-format', choices=['text', 'binary'], default='text',
+                        help='COPY format used with --staging-method copy (default: text)')
+    parser.add_argument('--chunk-size', type=int, default=0,
+                        help='Merge and commit every this many places in a transaction of their own instead of '
+                             'the whole region in one. A failed full import resumes after the last committed '
+                             'chunk (default: 0, one transaction)')
+    parser.add_argument('--sweep-max-share', type=float, default=0.1,
+                        help='After a full import, delete places of the region missing from the extract unless '
+                             'they are more than this share of its places, which rather means a bad extract '
+                             '(default: 0.1)')
+    parser.add_argument('--no-sweep', action='store_true',
+                        help='Keep places missing from the extract after a full import')
+    parser.add_argument('--batch-size', type=int, default=10000,
+                        help='Places parsed and staged per batch, bounds peak memory (default: 10000)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Regions parsed at the same time. With more than one, regions are downloaded, '
+                             'parsed and seeded in an overlapping pipeline, each parse in a producer of '
+                             '--pipeline mode holding at most --queue-size batches (default: 1)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Apply OSM change files since the last run instead of a full import. Only node '
+                             'places are updated, ways and relations and the sweep need a full import. '
+                             'Regions without a stored replication sequence get a full import')
+    parser.add_argument('--replication-url',
+                        help='Replication server URL or local directory of change files, '
+                             '{region} is replaced by the region name (default: Geofabrik updates URL of the region)')
+    parser.add_argument('--max-diff-size', type=int, default=102400,
+                        help='Unpacked change data in kB applied per transaction in incremental mode (default: 102400)')
+    parser.add_argument('--download-connections', type=int, default=4,
+                        help='Parallel range requests per PBF download (default: 4)')
+    parser.add_argument('--force-download', action='store_true',
+                        help='Download and import extracts even if they are unchanged since the last import')
+    parser.add_argument('--nodes-only', action='store_true',
+                        help='Only import places mapped as nodes, skipping ways and multipolygon relations')
+    parser.add_argument('--location-index', choices=LOCATION_INDEXES, default='auto',
+                        help='Node location index used to place ways and relations. auto keeps locations in '
+                             'memory for small extracts and in a file next to the PBF for large ones (default: auto)')
+    parser.add_argument('--pipeline', choices=PIPELINE_MODES, default='off',
+                        help='Where parsing runs while seeding loads earlier batches: in a process, a thread, '
+                             'or off to parse and load in turns (default: off)')
+    parser.add_argument('--queue-size', type=int, default=4,
+                        help='Parsed batches allowed to wait for seeding in pipeline mode (default: 4)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Neither cache parsed places in data/cache nor seed from a cache when the extract '
+                             'and parsing code are unchanged')
+    parser.add_argument('--from-cache', action='store_true',
+                        help='Seed regions from the places cached by an earlier full import without downloading '
+                             'their extracts, for example to re-seed after a schema change. Regions without a '
+                             'cache are imported from their extract')
+    parser.add_argument('--cluster', choices=['off', 'auto', 'always'], default='off',
+                        help='Rewrite places and its child tables in Hilbert key order after seeding, so bbox '
+                             'queries read fewer pages. auto clusters after large loads, see --cluster-min-share. '
+                             'Locks the tables while it runs (default: off)')
+    parser.add_argument('--cluster-min-share', type=float, default=0.2,
+                        help='With --cluster auto, the share of place documents a run must write to cluster '
+                             '(default: 0.2)')
+    parser.add_argument('--tiles', action='store_true',
+                        help='Write static per-tile place files of the processed regions after seeding')
+    parser.add_argument('--tiles-dir', default=os.path.join(DATA_DIR, 'tiles'),
+                        help='Directory of the tile files, one subdirectory per region (default: data/tiles)')
+    parser.add_argument('--tile-size', type=float, default=TILE_SIZE_DEGREES,
+                        help=f'Tile size in degrees, the app uses {TILE_SIZE_DEGREES} (default: {TILE_SIZE_DEGREES})')
+    parser.add_argument('--tile-compression', choices=COMPRESSIONS, default='gzip',
+                        help='Compression of the tile files (default: gzip)')
+    parser.add_argument('--sqlite', action='store_true',
+                        help='Write a SQLite snapshot per region for the app\'s Room cache after seeding, '
+                             'with a patch from the previous snapshot when places changed')
+    parser.add_argument('--sqlite-dir', default=os.path.join(DATA_DIR, 'sqlite'),
+                        help='Directory of the SQLite snapshots and patches (default: data/sqlite)')
+    parser.add_argument('--sqlite-patches', type=int, default=4,
+                        help='Patches kept per region, each from one snapshot version to the next, 0 for none '
+                             '(default: 4)')
+    parser.add_argument('--dump', choices=['full', 'incremental', 'off'], default='full',
+                        help='Dump all rows to data/ after seeding, only rows changed since the last '
+                             'dump, or nothing (default: full)')
+    parser.add_argument('--record-dump', action='store_true',
+                        help='Record the dump in data/dump.json as published and exit. Incremental dumps '
+                             'hold the rows changed since the last recorded dump, so run this only once '
+                             'the files are published')
+    parser.add_argument('--dump-format', choices=DUMP_FORMATS, default='csv',
+                        help='File format of the dump (default: csv)')
+    parser.add_argument('--dump-compression', choices=COMPRESSIONS, default='none',
+                        help='Compression of the dump files, zstd needs zstandard and parquet pyarrow (default: none)')
+    parser.add_argument('--dump-jobs', type=int, default=len(DUMP_TABLES),
+                        help=f'Tables dumped at the same time (default: {len(DUMP_TABLES)})')
+    parser.add_argument('--report',
+                        help='Write a JSON report of the run to this file: duration, bytes, objects/s, '
+                             'rows per table and peak memory of every stage')
+    parser.add_argument('--profile', nargs='?', const=os.path.join(DATA_DIR, 'update.prof'),
+                        help='Profile the main process with cProfile, write the stats to this file and print '
+                             'the top functions (default file: data/update.prof)')
+    parser.add_argument('--trace-memory', action='store_true',
+                        help='Trace Python allocations with tracemalloc, adding the peak and the largest '
+                             'allocation sites of every stage to the report. Slows the run down')
     args = parser.parse_args()
-    
-    total_places = 0
+    if args.workers > 1 and args.pipeline == "off":
+        parser.error("--workers above 1 parses regions in producers, use it with --pipeline thread or process")
+    if args.record_dump:
+        record_dump(DATABASE_URL, DATA_DIR)
+        return
+
+    if args.trace_memory:
+        tracemalloc.start(TRACE_FRAMES)
+    profiler = cProfile.Profile() if args.profile else None
+    report = {"argv": sys.argv[1:], "status": "failed"}
+    try:
+        if profiler:
+            profiler.enable()
+        report["total_places"] = run_update(args)
+        report["status"] = "ok"
+    except BaseException as e:
+        report["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+            print(f"Profile written to {args.profile}, top functions by cumulative time:")
+            pstats.Stats(profiler).sort_stats("cumulative").print_stats(PROFILE_TOP)
+            report["profile"] = args.profile
+        METRICS.print_summary()
+        if args.trace_memory:
+            tracemalloc.stop()
+        if args.report:
+            METRICS.write_report(args.report, **report)
+
+
+def run_update(args: argparse.Namespace) -> int:
+    """Import or update the regions selected by the command line, then export. Returns the places processed."""
+    read_options = {
+        "areas": not args.nodes_only,
+        "location_index": args.location_index,
+    }
+    download_options = {
+        "connections": args.download_connections,
+        # overwriting user modifications is worth a re-import of an unchanged extract
+        "force": args.force_download or args.overwrite,
+    }
+    seed_options = {
+        "overwrite": args.overwrite,
+        "staging_method": args.staging_method,
+        "copy_format": args.copy_format,
+        "chunk_size": args.chunk_size or None,
+    }
+    if args.test:
+        print("TEST MODE: Only processing 100 places per region")
+        seed_options["limit"] = 100
+    # full imports read the complete extract, so places missing from it can be swept
+    import_options = dict(seed_options, cache=not args.no_cache, from_cache=args.from_cache)
+    if not args.no_sweep and not args.test:
+        import_options["sweep_max_share"] = args.sweep_max_share
     
     if args.region:
-        # Process single region
-        for region in REGIONS:
-            if region['name'] == args.region:
-                print(f"Processing region: {region['name']}")
-                places = parse_filtered_pbf(filter_pbf(download_pbf(region)), region['name'])
-                if args.test:
-                    print("TEST MODE: Only processing 100 places")
-                    seed_places(places, limit=100, overwrite=args.overwrite)
-                    total_places += min(100, len(places))
-                else:
-                    seed_places(places, overwrite=args.overwrite)
-                    total_places += len(places)
-                break
-        else:
+        regions = [region for region in REGIONS if region['name'] == args.region]
+        if not regions:
             print(f"Region {args.region} not found")
     else:
-        # Process all regions
-        for region in REGIONS:
-            print(f"Processing region: {region['name']}")
-            places = parse_filtered_pbf(filter_pbf(download_pbf(region)), region['name'])
-            if args.test:
-                print("TEST MODE: Only processing 100 places")
-                seed_places(places, limit=100, overwrite=args.overwrite)
-                total_places += min(100, len(places))
+        regions = REGIONS
+    # incremental updates narrow regions down to the ones that need a full import
+    processed = regions
+    
+    # a partial test import must not record a replication sequence
+    record_replication = not args.test
+    
+    total_places = 0
+    if args.incremental:
+        full_import = []
+        for region in regions:
+            url = (args.replication_url or region['replication_url']).format(region=region['name'])
+            seeded = update_region_incremental(region, url, args.max_diff_size, **seed_options)
+            if seeded is None:
+                print(f"No replication state for {region['name']}, falling back to a full import")
+                full_import.append(region)
             else:
-                seed_places(places, overwrite=args.overwrite)
-                total_places += len(places)
+                total_places += seeded
+        regions = full_import
+    
+    if args.workers > 1:
+        print(f"Processing {len(regions)} regions with {args.workers} workers")
+        total_places += run_pipeline(
+            regions, args.workers, args.batch_size, record_replication, download_options, read_options,
+            args.pipeline, args.queue_size, **import_options
+        )
+    else:
+        for region in regions:
+            print(f"Processing region: {region['name']}")
+            total_places += import_region(
+                region, args.batch_size, record_replication, download_options, read_options,
+                args.pipeline, args.queue_size, **import_options
+            )
     
     print(f"Total places processed: {total_places}")
 
+    if args.cluster != "off" and not args.test:
+        cluster_places(DATABASE_URL, args.cluster_min_share if args.cluster == "auto" else 0.0)
+
+    region_names = [region['name'] for region in processed]
+    if args.tiles:
+        export_tiles(DATABASE_URL, region_names, args.tiles_dir, args.tile_size, args.tile_compression)
+
+    if args.sqlite:
+        export_sqlite(DATABASE_URL, region_names, args.sqlite_dir, args.sqlite_patches)
+
+    if args.dump == "off":
+        return total_places
     print("Starting database dump...")
-    dump_tables()
+    with METRICS.stage("dump") as stage:
+        results = dump_tables(
+            DATABASE_URL, DATA_DIR, args.dump_format, args.dump_compression, args.dump == "incremental", args.dump_jobs
+        )
+        stage.bytes = sum(result.size for result in results)
+        stage.objects = sum(result.rows for result in results)
+        stage.rows = {result.name: {"dumped": result.rows} for result in results}
+        stage.extra.update(format=args.dump_format, compression=args.dump_compression, mode=args.dump)
     print("Database dump completed.")
+    return total_places
 
 
 if __name__ == "__main__":